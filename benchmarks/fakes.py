@@ -0,0 +1,504 @@
+"""
+Benchmark Stand-ins
+
+Local stand-ins for the external services of the pipeline, so it can be driven end to end without credentials:
+a cryptonews-api.com compatible news feed, an OpenAI-compatible chat completions endpoint with configurable latency
+and error injection (plus the files and batches endpoints of the Batch API, which fill in the result file of a batch
+once its delay has passed), a Telegram Bot API endpoint, and an in-memory MongoDB (mongomock). The HTTP stand-ins run in
+their own process (`StandIns`).
+"""
+# Import libraries
+import re
+import json
+import time
+import uuid
+import email
+import random
+import hashlib
+import datetime
+import threading
+import multiprocessing
+from typing import Any, Dict, List
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "bitcoin ethereum solana etf inflows outflows regulator exchange hack rally slump whale treasury stablecoin "
+    "liquidity futures options miners halving upgrade mainnet airdrop lawsuit approval rejection volume record "
+    "price support resistance breakout selloff adoption custody bank fund staking yield token governance"
+).split()
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The pipeline opens many connections at once at large batch sizes
+    request_queue_size = 1024
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms to keep-alive requests
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Service:
+    """Runs a handler class on a local port in a background thread."""
+
+    def __init__(self, handler):
+        self.server = _QuietServer(("127.0.0.1", 0), handler)
+        self.server.service = self
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeNewsServer(_Service):
+    """
+    cryptonews-api.com compatible feed. `publish(n)` adds n new articles on top of the feed; every article is
+    one (virtual) second newer than the previous one, so paging and high-water marks behave as in production.
+    """
+
+    def __init__(self, seed: int = 0, text_words: int = 80):
+        self.items: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._text_words = text_words
+        self._clock = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+        super().__init__(_NewsHandler)
+
+    def publish(self, count: int) -> None:
+        new_items = []
+        for _ in range(count):
+            self._clock += datetime.timedelta(seconds=1)
+            n = len(self.items) + len(new_items)
+            words = [self._random.choice(_WORDS) for _ in range(self._text_words)]
+            new_items.append({
+                "title": f"Article {n}: {' '.join(words[:8])}",
+                "text": " ".join(words).capitalize() + ".",
+                "source_name": "Benchmark",
+                "news_url": f"https://news.example/{n}",
+                "image_url": f"https://news.example/{n}.jpg",
+                "date": self._clock.strftime("%a, %d %b %Y %H:%M:%S %z"),
+            })
+        with self._lock:
+            self.items[:0] = reversed(new_items)
+
+
+class _NewsHandler(_JSONHandler):
+    def do_GET(self):
+        service: FakeNewsServer = self.server.service
+        query = parse_qs(urlsplit(self.path).query)
+        items, page = int(query.get("items", ["50"])[0]), int(query.get("page", ["1"])[0])
+
+        with service._lock:
+            etag = f'"{len(service.items)}"'
+            data = service.items[(page - 1) * items:page * items]
+        if page == 1 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, {"data": data}, {"ETag": etag})
+
+
+class FakeOpenAIServer(_Service):
+    """
+    OpenAI-compatible `/v1/chat/completions` endpoint answering structured-output requests for the sentiment
+    schemas. Classifications are derived from a hash of the article, so repeated runs are deterministic.
+
+    Args:
+        latency_ms: Added latency of every request
+        error_rate: Share of requests answered with an injected error (alternating 429 and 500)
+        batch_delay_seconds: Time after which a submitted batch is completed
+        quota: Concurrent requests allowed; requests beyond it are answered with 429 and a retry-after-ms header,
+            like an exhausted rate limit. 0 disables the quota.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 batch_delay_seconds: float = 0.0, quota: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.batch_delay_seconds = batch_delay_seconds
+        self.quota = quota
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        super().__init__(_OpenAIHandler)
+
+    def add_file(self, content: bytes) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl",
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def run_batch(self, batch: Dict[str, Any]) -> None:
+        """Fills in the output and error files of a batch whose delay has passed."""
+        if batch["status"] != "in_progress" or time.time() < batch["_ready_at"]:
+            return
+        results, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode().splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            with self._lock:
+                fail = self._random.random() < self.error_rate
+            if fail:
+                errors.append({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 500, "body": {"error": {"message": "Injected error"}}},
+                    "error": None,
+                })
+            else:
+                results.append({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": _completion(self, request["body"])},
+                    "error": None,
+                })
+        batch["output_file_id"] = self.add_file("".join(json.dumps(r) + "\n" for r in results).encode())["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file("".join(json.dumps(r) + "\n" for r in errors).encode())["id"]
+        batch["request_counts"] = {"total": len(results) + len(errors), "completed": len(results), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+
+_ARTICLE_RE = re.compile(r"Article id: (\S+)\nTitle: (.*)")
+
+
+def _classify(key: str) -> Dict[str, Any]:
+    digest = hashlib.sha256(key.encode()).digest()
+    return {
+        "sentiment": ("POSITIVE", "NEGATIVE", "NEUTRAL")[digest[0] % 3],
+        "importance": ("LOW", "MEDIUM", "HIGH")[digest[1] % 3],
+        "is_market_relevant": digest[2] % 2 == 0,
+    }
+
+
+def _completion(service: FakeOpenAIServer, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the chat completion answering a structured-output request."""
+    prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+    schema_name = (request.get("response_format") or {}).get("json_schema", {}).get("name", "")
+    if schema_name.startswith("Batch"):
+        content = {"items": [{"id": news_id, **_classify(news_id)} for news_id, _ in _ARTICLE_RE.findall(prompt)]}
+    else:
+        content = _classify(prompt)
+
+    completion = json.dumps(content)
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(completion) // 4
+    return {
+        "id": f"chatcmpl-{service.requests}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "benchmark"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": completion, "refusal": None},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _public_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_GET(self):
+        service: FakeOpenAIServer = self.server.service
+        path = urlsplit(self.path).path
+        match = re.search(r"/batches/([^/]+)$", path)
+        if match and match.group(1) in service.batches:
+            batch = service.batches[match.group(1)]
+            service.run_batch(batch)
+            self._send_json(200, _public_batch(batch))
+            return
+        match = re.search(r"/files/([^/]+)/content$", path)
+        if match and match.group(1) in service.files:
+            content = service.files[match.group(1)]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/jsonl")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error", "code": None}})
+
+    def _upload_file(self, service: FakeOpenAIServer) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        content = next(
+            part.get_payload(decode=True) for part in message.get_payload()
+            if part.get_param("name", header="content-disposition") == "file"
+        )
+        self._send_json(200, service.add_file(content))
+
+    def _create_batch(self, service: FakeOpenAIServer) -> None:
+        request = self._read_json()
+        if request.get("input_file_id") not in service.files:
+            self._send_json(400, {"error": {"message": "Unknown input file", "type": "invalid_request_error"}})
+            return
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": request.get("endpoint"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "metadata": request.get("metadata"),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "_ready_at": time.time() + service.batch_delay_seconds,
+        }
+        with service._lock:
+            service.batches[batch["id"]] = batch
+        self._send_json(200, _public_batch(batch))
+
+    def do_POST(self):
+        service: FakeOpenAIServer = self.server.service
+        path = urlsplit(self.path).path
+        if path.endswith("/files"):
+            self._upload_file(service)
+            return
+        if path.endswith("/batches"):
+            self._create_batch(service)
+            return
+
+        request = self._read_json()
+        with service._lock:
+            service.requests += 1
+            over_quota = bool(service.quota) and service.in_flight >= service.quota
+            if over_quota:
+                service.rate_limited += 1
+            else:
+                service.in_flight += 1
+            fail = not over_quota and service._random.random() < service.error_rate
+            if fail:
+                service.errors += 1
+        if over_quota:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after-ms": str(int(service.latency_ms) or 100)},
+            )
+            return
+
+        try:
+            if service.latency_ms:
+                time.sleep(service.latency_ms / 1000)
+        finally:
+            with service._lock:
+                service.in_flight -= 1
+        if fail:
+            status = 429 if service.errors % 2 else 500
+            self._send_json(status, {"error": {"message": "Injected error", "type": "benchmark", "code": None}})
+            return
+
+        self._send_json(200, _completion(service, request))
+
+
+class FakeTelegramServer(_Service):
+    """Telegram Bot API `sendMessage` endpoint that accepts every message after `latency_ms`."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.messages = 0
+        self._lock = threading.Lock()
+        super().__init__(_TelegramHandler)
+
+
+class _TelegramHandler(_JSONHandler):
+    def do_POST(self):
+        service: FakeTelegramServer = self.server.service
+        self._read_json()
+        if service.latency_ms:
+            time.sleep(service.latency_ms / 1000)
+        with service._lock:
+            service.messages += 1
+            message_id = service.messages
+        self._send_json(200, {"ok": True, "result": {"message_id": message_id}})
+
+
+def _serve_stand_ins(connection, seed: int, llm_latency_ms: float, llm_error_rate: float, telegram_latency_ms: float,
+                     batch_delay_seconds: float, llm_quota: int):
+    """Child process main: runs the HTTP stand-ins and answers commands from the parent until told to stop."""
+    news = FakeNewsServer(seed=seed)
+    openai = FakeOpenAIServer(
+        latency_ms=llm_latency_ms,
+        error_rate=llm_error_rate,
+        seed=seed,
+        batch_delay_seconds=batch_delay_seconds,
+        quota=llm_quota,
+    )
+    telegram = FakeTelegramServer(latency_ms=telegram_latency_ms)
+    connection.send({"news": news.url, "openai": openai.url, "telegram": telegram.url})
+
+    while True:
+        command, argument = connection.recv()
+        if command == "publish":
+            news.publish(argument)
+            connection.send(None)
+        elif command == "stats":
+            connection.send({
+                "llm_requests": openai.requests,
+                "llm_injected_errors": openai.errors,
+                "llm_rate_limited": openai.rate_limited,
+                "telegram_messages": telegram.messages,
+            })
+        else:
+            break
+
+    for service in (news, openai, telegram):
+        service.close()
+
+
+class StandIns:
+    """
+    Runs the HTTP stand-ins in a separate process, so serving them does not compete with the pipeline for the GIL.
+
+    Args:
+        seed: Seed of the generated articles and of the error injection
+        llm_latency_ms: Added latency of every LLM request
+        llm_error_rate: Share of LLM requests answered with an injected error
+        telegram_latency_ms: Added latency of every Telegram request
+        batch_delay_seconds: Time after which a submitted Batch API job is completed
+        llm_quota: Concurrent LLM requests allowed before the endpoint answers 429 (0 disables the quota)
+    """
+
+    def __init__(self, seed: int = 0, llm_latency_ms: float = 0.0, llm_error_rate: float = 0.0,
+                 telegram_latency_ms: float = 0.0, batch_delay_seconds: float = 0.0, llm_quota: int = 0):
+        context = multiprocessing.get_context("spawn")
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(
+            target=_serve_stand_ins,
+            args=(
+                child_connection, seed, llm_latency_ms, llm_error_rate, telegram_latency_ms, batch_delay_seconds,
+                llm_quota,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        urls = self._connection.recv()
+        self.news_url, self.openai_url, self.telegram_url = urls["news"], urls["openai"], urls["telegram"]
+
+    def publish(self, count: int) -> None:
+        """Adds `count` new articles on top of the news feed."""
+        self._connection.send(("publish", count))
+        self._connection.recv()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of LLM requests, injected LLM errors, quota 429s and Telegram messages served so far."""
+        self._connection.send(("stats", None))
+        return self._connection.recv()
+
+    def close(self) -> None:
+        self._connection.send(("stop", None))
+        self._process.join(timeout=5)
+
+
+def install_mongomock(db_name: str):
+    """
+    Points the pipeline's database module at an in-memory mongomock database.
+
+    Returns:
+        The mongomock database.
+    """
+    import mongomock
+    from mongomock import collection as mongomock_collection
+    from pymongo.errors import BulkWriteError
+    import src.utils.db_utils as db_utils
+
+    builder = mongomock_collection.BulkOperationBuilder
+    if not getattr(builder, "_patched_for_pipeline", False):
+        builder._patched_for_pipeline = True
+
+        # pymongo 4.x passes `sort` to the bulk builder for UpdateOne, which mongomock does not accept yet
+        add_update = builder.add_update
+
+        def add_update_without_sort(self, *args, sort=None, **kwargs):
+            return add_update(self, *args, **kwargs)
+
+        # mongomock numbers the upserts of a bulk write by their count instead of their operation index
+        execute = builder.execute
+
+        def execute_with_upsert_indexes(self, *args, **kwargs):
+            upserted_at = []
+
+            def track(index, operation):
+                def tracked():
+                    result = operation()
+                    if result.get("upserted"):
+                        upserted_at.append(index)
+                    return result
+                # The builder tells updates from inserts by the executor's name
+                tracked.__name__ = operation.__name__
+                return tracked
+
+            def renumber(result):
+                for entry, index in zip(result.get("upserted", []), upserted_at):
+                    entry["index"] = index
+                return result
+
+            self.executors = [track(index, operation) for index, operation in enumerate(self.executors)]
+            try:
+                return renumber(execute(self, *args, **kwargs))
+            except BulkWriteError as e:
+                renumber(e.details)
+                raise
+
+        builder.add_update = add_update_without_sort
+        builder.execute = execute_with_upsert_indexes
+
+    db_utils._client = mongomock.MongoClient()
+    db_utils._db = db_utils._client[db_name]
+    db_utils.ensure_indexes(db_utils._db)
+    return db_utils._db
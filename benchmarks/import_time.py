@@ -0,0 +1,182 @@
+"""
+Cold-Start Benchmark
+
+Measures what a cron or serverless tick pays before the first node runs. Every scenario is executed in fresh
+interpreters with `python -X importtime`; the report gives the wall time of the process, the total import time and
+the packages that dominate it (self time aggregated per top-level package). Medians over several runs are compared
+against, or saved as, the baseline in benchmarks/import_baseline.json.
+
+Scenarios:
+    import  `import src.main`, the cost of starting any entry point
+    graph   importing src.main and compiling the graph without checkpoints, i.e. everything a tick loads before
+            it fetches news; the LLM client, pymongo and the prompt templates are only loaded once there is news
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 10 --top 15
+    python -m benchmarks.import_time --compare           # exit 1 on a regression against the baseline
+    python -m benchmarks.import_time --update-baseline
+"""
+# Import libraries
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "import_baseline.json")
+
+SCENARIOS = {
+    "import": "import src.main",
+    "graph": "import src.main; src.main.compile_graph()",
+}
+
+# Packages kept per scenario, by self time
+_MAX_PACKAGES = 25
+
+# Placeholders for the required settings, so the benchmark runs without a .env; values already set are kept
+_PLACEHOLDER_ENVIRONMENT = {
+    "DB_URI": "mongodb://127.0.0.1:1",
+    "MODEL_API_KEY": "benchmark",
+    "BOT_TOKEN": "benchmark",
+    "GROUP_ID": "-100",
+    "NEWS_API_KEY": "benchmark",
+    "LANGSMITH_API_KEY": "benchmark",
+}
+
+
+def parse_importtime(report: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Parses the stderr of `python -X importtime`.
+
+    Returns:
+        Total import time in milliseconds (sum of the top-level imports) and the self time per top-level package.
+    """
+    total_us = 0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total_us += int(cumulative_us)
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+    return total_us / 1000, dict(packages)
+
+
+def measure(code: str) -> Dict[str, Any]:
+    """Runs `code` in a fresh interpreter and returns its wall time, import time and per-package import time."""
+    environment = {**_PLACEHOLDER_ENVIRONMENT, **os.environ, "CHECKPOINT_MODE": "none", "LANGCHAIN_TRACING_V2": "false"}
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=environment,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario failed ({code}):\n{completed.stderr[-2000:]}")
+    import_ms, packages = parse_importtime(completed.stderr)
+    return {"wall_ms": wall_ms, "import_ms": import_ms, "packages": packages}
+
+
+def run_scenario(code: str, runs: int) -> Dict[str, Any]:
+    """Measures a scenario `runs` times (after one warm-up run that fills the bytecode cache) and keeps the medians."""
+    measure(code)
+    samples = [measure(code) for _ in range(runs)]
+    package_names = {name for sample in samples for name in sample["packages"]}
+    packages = {
+        name: round(statistics.median(sample["packages"].get(name, 0.0) for sample in samples), 1)
+        for name in package_names
+    }
+    return {
+        "runs": runs,
+        "wall_ms": round(statistics.median(sample["wall_ms"] for sample in samples), 1),
+        "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+        "packages": dict(sorted(packages.items(), key=lambda entry: entry[1], reverse=True)[:_MAX_PACKAGES]),
+    }
+
+
+def _print_result(name: str, result: Dict[str, Any], top: int) -> None:
+    print(
+        f"\n{name}: wall {result['wall_ms']:.0f} ms, imports {result['import_ms']:.0f} ms "
+        f"(median of {result['runs']})"
+    )
+    print(f"  {'package':<28}{'self ms':>10}")
+    for package, self_ms in list(result["packages"].items())[:top]:
+        print(f"  {package:<28}{self_ms:>10.1f}")
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares results with the baseline.
+
+    Returns:
+        One message per scenario whose wall or import time grew by more than `tolerance` (relative).
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ("wall_ms", "import_ms"):
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {reference[metric]} -> {result[metric]}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of the pipeline")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per scenario")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative regression for --compare")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = run_scenario(SCENARIOS[name], args.runs)
+        _print_result(name, results[name], args.top)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    exit_code = 0
+    if args.compare:
+        regressions = compare_to_baseline(results, baseline.get("results", {}), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        exit_code = 1 if regressions else 0
+        if not regressions:
+            print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}.")
+
+    sys.exit(exit_code)
@@ -0,0 +1,94 @@
+"""
+Near-Duplicate Benchmark
+
+Measures the per-item cost of the near-duplicate check (src/nodes/near_duplicate.py): shingling an article, computing
+its MinHash signature and querying the LSH index, against an index already holding a window of recent articles. Half
+of the looked-up articles are lightly edited copies of indexed ones, so the recall of the index is reported as well.
+The articles are synthetic and generated from a fixed seed, so runs are comparable. Exits with status 1 if the median
+time per item exceeds the target.
+
+Usage:
+    python -m benchmarks.near_duplicate                       # 1000 lookups against 5000 indexed articles, 1 ms target
+    python -m benchmarks.near_duplicate --index-size 20000 --target-ms 0.5
+"""
+# Import libraries
+import sys
+import time
+import random
+import argparse
+import statistics
+from typing import List
+
+from src.utils.minhash import MinHasher, MinHashLSH, shingle
+
+# Parameters of the index, the defaults of config.near_duplicate_*
+_NUM_PERM = 64
+_BANDS = 16
+_THRESHOLD = 0.7
+# Words replaced in an edited copy; keeps the Jaccard similarity of its shingles around 0.9
+_EDITS = 2
+
+
+def _articles(count: int, words: int, rng: random.Random) -> List[str]:
+    vocabulary = [f"word{i}" for i in range(5000)]
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def _edited(article: str, rng: random.Random) -> str:
+    words = article.split()
+    for position in rng.sample(range(len(words)), _EDITS):
+        words[position] = f"edit{rng.randrange(1_000_000)}"
+    return " ".join(words)
+
+
+def run(args) -> dict:
+    """Indexes the articles, then times the lookups; returns the median time per item and the recall."""
+    rng = random.Random(args.seed)
+    hasher = MinHasher(num_perm=_NUM_PERM)
+    index = MinHashLSH(num_perm=_NUM_PERM, bands=_BANDS, threshold=_THRESHOLD, window_seconds=float("inf"))
+
+    indexed = _articles(args.index_size, args.words, rng)
+    now = time.time()
+    for i, article in enumerate(indexed):
+        index.insert(str(i), hasher.signature(shingle(article)), now)
+
+    copies = rng.sample(range(args.index_size), args.items // 2)
+    lookups = [(str(i), _edited(indexed[i], rng)) for i in copies]
+    lookups += [(None, article) for article in _articles(args.items - len(copies), args.words, rng)]
+
+    per_item_ms = []
+    found = 0
+    for _ in range(args.repeats):
+        found = 0
+        started = time.perf_counter()
+        for expected, article in lookups:
+            match = index.query(hasher.signature(shingle(article)))
+            if expected is not None and match is not None and match[0] == expected:
+                found += 1
+        per_item_ms.append((time.perf_counter() - started) * 1000 / len(lookups))
+
+    return {
+        "per_item_ms": round(statistics.median(per_item_ms), 4),
+        "recall": round(found / len(copies), 3) if copies else None,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the per-item cost of the near-duplicate check")
+    parser.add_argument("--items", type=int, default=1000, help="Articles looked up per repeat")
+    parser.add_argument("--index-size", type=int, default=5000, help="Articles in the index before the lookups")
+    parser.add_argument("--words", type=int, default=150, help="Words per synthetic article")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeats of the lookups; the median is reported")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic articles")
+    parser.add_argument("--target-ms", type=float, default=1.0, help="Maximum median time per item")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run(args)
+    print(
+        f"Near-duplicate check: {result['per_item_ms']:.3f} ms per item (target {args.target_ms} ms), "
+        f"recall of edited copies {result['recall']}."
+    )
+    sys.exit(0 if result["per_item_ms"] <= args.target_ms else 1)
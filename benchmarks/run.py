@@ -0,0 +1,373 @@
+"""
+Pipeline Benchmark
+
+Drives the compiled graph end to end against local stand-ins (see benchmarks/fakes.py) at several news volumes per
+tick and reports per-stage throughput and latency, LLM request latency and peak RSS. Every size runs in its own
+process, so peak RSS and module-level clients do not leak between sizes. Results can be compared against, or saved
+as, the baseline in benchmarks/baseline.json.
+
+Usage:
+    python -m benchmarks.run                                  # 10, 100, 1000 and 10000 items per tick
+    python -m benchmarks.run --sizes 10 100 --ticks 5
+    python -m benchmarks.run --llm-latency-ms 300 --llm-error-rate 0.05
+    python -m benchmarks.run --sizes 1000 --llm-quota 4        # 429 beyond 4 concurrent LLM requests
+    python -m benchmarks.run --compare                        # exit 1 on a regression against the baseline
+    python -m benchmarks.run --update-baseline
+"""
+# Import libraries
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import functools
+import resource
+import tempfile
+import platform
+import subprocess
+from typing import Any, Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Number of items a node works on, used for its throughput
+_STAGE_ITEMS = {
+    "fetch_news": lambda state, update: len(update.get("raw_ids", [])),
+    "check_cache": lambda state, update: len(state.raw_ids),
+    "near_duplicate": lambda state, update: len(state.unseen_ids),
+    "analyze_sentiment": lambda state, update: len(state.unseen_ids) + len(state.duplicate_ids),
+    "write_to_database": lambda state, update: len(state.classifications),
+    "telegram_notifier": lambda state, update: len(state.classifications),
+    "process_item": lambda state, update: 1,
+    "collect_results": lambda state, update: len(state.classifications),
+}
+
+# Node functions imported by src.main, keyed by node name
+_NODE_FUNCTIONS = {
+    "fetch_news": "fetch_news_node",
+    "check_cache": "check_cache_node",
+    "near_duplicate": "near_duplicate_node",
+    "analyze_sentiment": "sentiment_analysis_node",
+    "write_to_database": "write_to_database_node",
+    "telegram_notifier": "notification_node",
+    "process_item": "process_item_node",
+    "collect_results": "collect_results_node",
+}
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+
+def _configure_environment(args, workdir: str, news_url: str, openai_url: str, telegram_url: str) -> None:
+    """Points the pipeline configuration at the stand-ins. Must run before anything from src is imported."""
+    page_size = 100
+    os.environ.update({
+        "ENVIRONMENT": "development",
+        "DB_URI": args.mongo_uri or "mongodb://127.0.0.1:1",
+        "DB_NAME": f"benchmark_{args.size}_{os.getpid()}",
+        "MODEL_API_KEY": "benchmark",
+        "MODEL_BASE_URL": f"{openai_url}/v1",
+        "BOT_TOKEN": "benchmark",
+        "GROUP_ID": "-100",
+        "NEWS_API_KEY": "benchmark",
+        "NEWS_URL": f"{news_url}/api/v1/category?section=general",
+        "NEWS_SOURCES": json.dumps([{
+            "name": "benchmark",
+            "url": f"{news_url}/api/v1/category?section=general",
+            "requests_per_second": 1000,
+            "burst": 1000,
+        }]),
+        "LANGSMITH_API_KEY": "benchmark",
+        "LANGCHAIN_TRACING_V2": "false",
+        "TELEGRAM_API_URL": telegram_url,
+        "TELEGRAM_GLOBAL_RATE": "100000",
+        "TELEGRAM_CHAT_RATE_PER_MINUTE": "6000000",
+        "FETCH_PAGE_SIZE": str(page_size),
+        "FETCH_MAX_PAGES": str(args.size // page_size + 2),
+        "FETCH_LATENCY_BUDGET_SECONDS": "600",
+        "FETCH_STATE_PATH": os.path.join(workdir, "fetch_state.json"),
+        "PENDING_QUEUE_PATH": os.path.join(workdir, "pending_news.json"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "LLM_BATCH_SIZE": str(args.llm_batch_size),
+        "SEEN_INDEX_PATH": os.path.join(workdir, "seen_ids.bloom"),
+        "CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        "METRICS_SINK": "none",
+        "PROMETHEUS_TEXTFILE_PATH": "",
+        # Features that are off by default, enabled so the benchmark covers the whole pipeline
+        "CHECKPOINT_MODE": "sqlite",
+        "TEXT_COMPACTION_ENABLED": "true",
+        "NEAR_DUPLICATE_ENABLED": "true",
+    })
+
+
+def run_worker(args) -> Dict[str, Any]:
+    """Runs the ticks of one size in this process and returns its measurements."""
+    from benchmarks.fakes import StandIns, install_mongomock
+
+    stand_ins = StandIns(
+        seed=args.size,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_error_rate=args.llm_error_rate,
+        telegram_latency_ms=args.telegram_latency_ms,
+        llm_quota=args.llm_quota,
+    )
+    workdir = tempfile.mkdtemp(prefix="crypto-news-benchmark-")
+    _configure_environment(args, workdir, stand_ins.news_url, stand_ins.openai_url, stand_ins.telegram_url)
+
+    import logging
+    import src.main as pipeline
+    from src import prompts
+    from src.config.config import config, get_config
+    from src.state import GraphState, StreamingGraphState
+    from src.utils.llm import get_chat_model
+
+    # Loading the configuration sets up logging, so it must happen before the log level is lowered
+    get_config()
+    logging.getLogger().setLevel(args.log_level)
+    if not args.mongo_uri:
+        install_mongomock(config.db_name)
+
+    # Dependencies the pipeline imports on first use are loaded here, so the ticks measure the steady state
+    get_chat_model()
+    prompts.sentiment_analysis_prompt
+
+    # Time every node; the wrappers are installed before the graph is built so they sit inside the instrumentation
+    samples: Dict[str, List[Dict[str, float]]] = {name: [] for name in _NODE_FUNCTIONS}
+
+    def timed(name, node):
+        @functools.wraps(node)
+        def wrapper(state):
+            started = time.perf_counter()
+            update = node(state)
+            samples[name].append({
+                "seconds": time.perf_counter() - started,
+                "items": _STAGE_ITEMS[name](state, update or {}),
+            })
+            return update
+        return wrapper
+
+    for name, attribute in _NODE_FUNCTIONS.items():
+        setattr(pipeline, attribute, timed(name, getattr(pipeline, attribute)))
+
+    graph = pipeline.compile_graph(streaming=args.streaming)
+    state_schema = StreamingGraphState if args.streaming else GraphState
+
+    ticks = []
+    llm_latencies = {"p50": [], "p99": []}
+    for tick in range(args.ticks):
+        stand_ins.publish(args.size)
+        started = time.perf_counter()
+        result = graph.invoke(
+            state_schema(),
+            {"configurable": {"thread_id": f"benchmark-{tick}"}, "max_concurrency": config.llm_max_concurrency},
+        )
+        seconds = time.perf_counter() - started
+        ticks.append({
+            "seconds": seconds,
+            "raw_news": len(result.get("raw_ids", [])),
+            "processed": len(result.get("classifications", {})),
+            "sent": sum(1 for delivery in result.get("telegram_deliveries", []) if delivery.success),
+        })
+        usage = result.get("llm_usage") or {}
+        if usage.get("calls"):
+            llm_latencies["p50"].append(usage["latency_ms_p50"])
+            llm_latencies["p99"].append(usage["latency_ms_p99"])
+
+    from src.utils.telegram import close_telegram_sender
+    close_telegram_sender()
+    served = stand_ins.stats()
+    stand_ins.close()
+
+    stages = {}
+    for name, stage_samples in samples.items():
+        if not stage_samples:
+            continue
+        total_seconds = sum(sample["seconds"] for sample in stage_samples)
+        total_items = sum(sample["items"] for sample in stage_samples)
+        durations_ms = [sample["seconds"] * 1000 for sample in stage_samples]
+        stages[name] = {
+            "calls": len(stage_samples),
+            "items_per_second": round(total_items / total_seconds, 1) if total_seconds else 0.0,
+            "p50_ms": round(_percentile(durations_ms, 50), 2),
+            "p99_ms": round(_percentile(durations_ms, 99), 2),
+        }
+
+    tick_ms = [tick["seconds"] * 1000 for tick in ticks]
+    processed = sum(tick["processed"] for tick in ticks)
+    return {
+        "size": args.size,
+        "ticks": args.ticks,
+        "streaming": args.streaming,
+        "processed": processed,
+        "sent": sum(tick["sent"] for tick in ticks),
+        "tick_p50_ms": round(_percentile(tick_ms, 50), 2),
+        "tick_p99_ms": round(_percentile(tick_ms, 99), 2),
+        "items_per_second": round(processed / (sum(tick_ms) / 1000), 1) if processed else 0.0,
+        "llm_p50_ms": round(_percentile(llm_latencies["p50"], 50), 2),
+        "llm_p99_ms": round(max(llm_latencies["p99"], default=0.0), 2),
+        "llm_requests": served["llm_requests"],
+        "llm_injected_errors": served["llm_injected_errors"],
+        "llm_rate_limited": served["llm_rate_limited"],
+        # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+        ),
+        "stages": stages,
+    }
+
+
+def _scenario(args) -> Dict[str, Any]:
+    """Parameters that must match for two results to be comparable."""
+    return {
+        "ticks": args.ticks,
+        "streaming": args.streaming,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_error_rate": args.llm_error_rate,
+        "llm_quota": args.llm_quota,
+        "llm_batch_size": args.llm_batch_size,
+        "telegram_latency_ms": args.telegram_latency_ms,
+        "mongo": "mongod" if args.mongo_uri else "mongomock",
+    }
+
+
+def _run_size(args, size: int) -> Dict[str, Any]:
+    """Runs one size in a child process."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        command = [
+            sys.executable, "-m", "benchmarks.run", "--worker",
+            "--size", str(size),
+            "--ticks", str(args.ticks),
+            "--llm-latency-ms", str(args.llm_latency_ms),
+            "--llm-error-rate", str(args.llm_error_rate),
+            "--llm-quota", str(args.llm_quota),
+            "--llm-batch-size", str(args.llm_batch_size),
+            "--telegram-latency-ms", str(args.telegram_latency_ms),
+            "--log-level", args.log_level,
+            "--output", output.name,
+        ]
+        if args.streaming:
+            command.append("--streaming")
+        if args.mongo_uri:
+            command.extend(["--mongo-uri", args.mongo_uri])
+
+        subprocess.run(command, check=True, cwd=os.path.dirname(os.path.dirname(BASELINE_PATH)))
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    print(
+        f"\n{result['size']} items/tick x {result['ticks']} ticks: "
+        f"tick p50 {result['tick_p50_ms']:.0f} ms, p99 {result['tick_p99_ms']:.0f} ms, "
+        f"{result['items_per_second']:.1f} items/s, LLM p50 {result['llm_p50_ms']:.0f} ms, "
+        f"p99 {result['llm_p99_ms']:.0f} ms, peak RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    if result["llm_rate_limited"]:
+        print(f"  {result['llm_rate_limited']} of {result['llm_requests']} LLM requests rate limited by the quota")
+    print(f"  {'stage':<20}{'calls':>8}{'items/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, stage in result["stages"].items():
+        print(
+            f"  {name:<20}{stage['calls']:>8}{stage['items_per_second']:>12.1f}"
+            f"{stage['p50_ms']:>12.2f}{stage['p99_ms']:>12.2f}"
+        )
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares results with the baseline.
+
+    Returns:
+        One message per metric that regressed by more than `tolerance` (relative).
+    """
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get(size)
+        if reference is None:
+            continue
+        # Lower is better for latencies and memory, higher is better for throughput
+        for metric in ("tick_p50_ms", "tick_p99_ms", "peak_rss_mb"):
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{size} items: {metric} {reference[metric]} -> {result[metric]}")
+        if reference["items_per_second"] and \
+                result["items_per_second"] < reference["items_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{size} items: items_per_second {reference['items_per_second']} -> {result['items_per_second']}"
+            )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline end to end against local stand-ins")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="News items per tick")
+    parser.add_argument("--ticks", type=int, default=3, help="Ticks per size")
+    parser.add_argument("--streaming", action="store_true", help="Benchmark the streaming graph")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Latency of the fake OpenAI endpoint")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of LLM requests that fail")
+    parser.add_argument(
+        "--llm-quota",
+        type=int,
+        default=0,
+        help="Concurrent LLM requests the fake endpoint accepts before answering 429 (0 disables the quota)",
+    )
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="LLM_BATCH_SIZE of the pipeline")
+    parser.add_argument("--telegram-latency-ms", type=float, default=5.0, help="Latency of the fake Telegram API")
+    parser.add_argument("--mongo-uri", help="Use a local mongod instead of mongomock, e.g. mongodb://127.0.0.1:27017")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the pipeline during the benchmark")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    # Internal: run a single size and write its result to --output
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = _run_size(args, size)
+        _print_result(results[str(size)])
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    exit_code = 0
+    if args.compare:
+        if baseline.get("scenario") != _scenario(args):
+            print(f"\nBaseline scenario {baseline.get('scenario')} does not match {_scenario(args)}, not comparing.")
+        else:
+            regressions = compare_to_baseline(results, baseline.get("results", {}), args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            exit_code = 1 if regressions else 0
+            if not regressions:
+                print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "scenario": _scenario(args),
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}.")
+
+    sys.exit(exit_code)
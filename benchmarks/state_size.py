@@ -0,0 +1,235 @@
+"""
+State Benchmark
+
+Measures what the graph state costs per tick: the memory allocated while a tick runs (peak traced by tracemalloc
+above the level before the tick), the time the checkpointer spends serializing and deserializing the state, the bytes
+it writes, and the size of the final state of the tick. The graph runs end to end against the local stand-ins of
+benchmarks/run.py with SQLite checkpoints, so every step is serialized as in production. Every size runs in its own
+process. Results can be compared against, or saved as, the baseline in benchmarks/state_baseline.json.
+
+tracemalloc slows the pipeline down, so tick times of this benchmark are not comparable with benchmarks/run.py.
+
+Usage:
+    python -m benchmarks.state_size                           # 100 and 1000 items per tick
+    python -m benchmarks.state_size --sizes 100 --ticks 5 --streaming
+    python -m benchmarks.state_size --checkpoint-mode memory
+    python -m benchmarks.state_size --compare                 # exit 1 on a regression against the baseline
+    python -m benchmarks.state_size --update-baseline
+"""
+# Import libraries
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.run import _configure_environment
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state_baseline.json")
+
+# Metrics compared against the baseline; lower is better for all of them
+_METRICS = ("alloc_peak_mb", "serialize_ms", "deserialize_ms", "checkpoint_kb", "state_kb")
+
+
+def run_worker(args) -> Dict[str, Any]:
+    """Runs the ticks of one size in this process and returns the median of each metric over the ticks."""
+    from benchmarks.fakes import StandIns, install_mongomock
+
+    stand_ins = StandIns(seed=args.size, llm_latency_ms=args.llm_latency_ms, telegram_latency_ms=0.0)
+    workdir = tempfile.mkdtemp(prefix="crypto-news-state-benchmark-")
+    _configure_environment(args, workdir, stand_ins.news_url, stand_ins.openai_url, stand_ins.telegram_url)
+    os.environ["CHECKPOINT_MODE"] = args.checkpoint_mode
+
+    import logging
+    import src.main as pipeline
+    from src import prompts
+    from src.config.config import config, get_config
+    from src.state import GraphState, StreamingGraphState
+    from src.utils.checkpoints import get_checkpoint_store
+    from src.utils.llm import get_chat_model
+
+    get_config()
+    logging.getLogger().setLevel(args.log_level)
+    install_mongomock(config.db_name)
+    get_chat_model()
+    prompts.sentiment_analysis_prompt
+
+    # Time every serialization of the checkpointer
+    serde = get_checkpoint_store().checkpointer.serde
+    counters = {"serialize_seconds": 0.0, "deserialize_seconds": 0.0, "checkpoint_bytes": 0}
+    dumps_typed, loads_typed = serde.dumps_typed, serde.loads_typed
+
+    def timed_dumps(obj):
+        started = time.perf_counter()
+        typed = dumps_typed(obj)
+        counters["serialize_seconds"] += time.perf_counter() - started
+        counters["checkpoint_bytes"] += len(typed[1])
+        return typed
+
+    def timed_loads(typed):
+        started = time.perf_counter()
+        obj = loads_typed(typed)
+        counters["deserialize_seconds"] += time.perf_counter() - started
+        return obj
+
+    serde.dumps_typed, serde.loads_typed = timed_dumps, timed_loads
+
+    graph = pipeline.compile_graph(streaming=args.streaming)
+    state_schema = StreamingGraphState if args.streaming else GraphState
+
+    ticks: List[Dict[str, float]] = []
+    tracemalloc.start()
+    for tick in range(args.ticks):
+        stand_ins.publish(args.size)
+        counters.update(serialize_seconds=0.0, deserialize_seconds=0.0, checkpoint_bytes=0)
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        thread = {"configurable": {"thread_id": f"state-benchmark-{tick}"}}
+        graph.invoke(state_schema(), {**thread, "max_concurrency": config.llm_max_concurrency})
+        _, peak_bytes = tracemalloc.get_traced_memory()
+
+        # The final state as the checkpointer stores it, measured outside the counters of the tick
+        values = graph.get_state(thread).values
+        state_bytes = sum(len(dumps_typed(value)[1]) for value in values.values())
+        ticks.append({
+            "alloc_peak_mb": (peak_bytes - baseline_bytes) / (1024 * 1024),
+            "serialize_ms": counters["serialize_seconds"] * 1000,
+            "deserialize_ms": counters["deserialize_seconds"] * 1000,
+            "checkpoint_kb": counters["checkpoint_bytes"] / 1024,
+            "state_kb": state_bytes / 1024,
+        })
+    tracemalloc.stop()
+
+    from src.utils.telegram import close_telegram_sender
+    close_telegram_sender()
+    stand_ins.close()
+
+    result: Dict[str, Any] = {"size": args.size, "ticks": args.ticks}
+    for metric in _METRICS:
+        result[metric] = round(statistics.median(tick[metric] for tick in ticks), 2)
+    return result
+
+
+def _scenario(args) -> Dict[str, Any]:
+    """Parameters that must match for two results to be comparable."""
+    return {"ticks": args.ticks, "streaming": args.streaming, "checkpoint_mode": args.checkpoint_mode}
+
+
+def _run_size(args, size: int) -> Dict[str, Any]:
+    """Runs one size in a child process."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        command = [
+            sys.executable, "-m", "benchmarks.state_size", "--worker",
+            "--size", str(size),
+            "--ticks", str(args.ticks),
+            "--checkpoint-mode", args.checkpoint_mode,
+            "--llm-latency-ms", str(args.llm_latency_ms),
+            "--log-level", args.log_level,
+            "--output", output.name,
+        ]
+        if args.streaming:
+            command.append("--streaming")
+
+        subprocess.run(command, check=True, cwd=os.path.dirname(os.path.dirname(BASELINE_PATH)))
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    print(
+        f"\n{result['size']} items/tick (median of {result['ticks']} ticks): "
+        f"allocated peak {result['alloc_peak_mb']:.1f} MB, "
+        f"serialize {result['serialize_ms']:.1f} ms, deserialize {result['deserialize_ms']:.1f} ms, "
+        f"checkpoints {result['checkpoint_kb']:.0f} KB, final state {result['state_kb']:.0f} KB"
+    )
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares results with the baseline.
+
+    Returns:
+        One message per metric that grew by more than `tolerance` (relative).
+    """
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get(size)
+        if reference is None:
+            continue
+        for metric in _METRICS:
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{size} items: {metric} {reference[metric]} -> {result[metric]}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure per-tick allocation and checkpoint serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="News items per tick")
+    parser.add_argument("--ticks", type=int, default=3, help="Ticks per size")
+    parser.add_argument("--streaming", action="store_true", help="Benchmark the streaming graph")
+    parser.add_argument(
+        "--checkpoint-mode", choices=["memory", "sqlite"], default="sqlite", help="CHECKPOINT_MODE of the pipeline"
+    )
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latency of the fake OpenAI endpoint")
+    parser.add_argument("--log-level", default="ERROR", help="Log level of the pipeline during the benchmark")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    # Internal: run a single size and write its result to --output
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    # Settings of benchmarks/run.py the stand-in environment reads
+    parser.set_defaults(mongo_uri=None, llm_batch_size=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = _run_size(args, size)
+        _print_result(results[str(size)])
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    exit_code = 0
+    if args.compare:
+        if baseline.get("scenario") != _scenario(args):
+            print(f"\nBaseline scenario {baseline.get('scenario')} does not match {_scenario(args)}, not comparing.")
+        else:
+            regressions = compare_to_baseline(results, baseline.get("results", {}), args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            exit_code = 1 if regressions else 0
+            if not regressions:
+                print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "scenario": _scenario(args),
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}.")
+
+    sys.exit(exit_code)
@@ -0,0 +1,306 @@
+"""
+Backfill / Reclassification
+
+Reclassifies the stored news with the current model and prompt, e.g. after `MODEL_NAME` or `src/prompts.py` changed.
+Documents are streamed from the `news` collection in (timestamp, _id) order through a server-side cursor, classified
+concurrently (LLM_MAX_CONCURRENCY requests in flight, LLM_BATCH_SIZE articles per request) under a requests-per-second
+limit, and written back in unordered bulk updates. Every document is stamped with the model and prompt version it was
+classified with (`classified_with`), so documents already up to date are skipped.
+
+After every chunk the sort key of its last document and the running totals are saved to BACKFILL_STATE_PATH; an
+interrupted backfill resumes after the last written chunk. Items that could not be classified (`unclassified`) or
+written (`failed`) keep their previous classification and are picked up again by a later run with --restart.
+
+Usage:
+    python -m src.backfill --rate 10 --chunk-size 500
+    python -m src.backfill --dry-run            # count documents and estimate tokens and cost, no LLM calls or writes
+"""
+# Import libraries
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from src.config.config import config
+from src.prompts import sentiment_analysis_prompt
+from src.state import LLMCallRecord, NewsItem
+from src.nodes.sentiment_analysis import classification_version, classify_news, compact_news
+from src.utils.db_utils import (
+    close_database,
+    count_news_for_backfill,
+    stream_news_for_backfill,
+    update_bulk_classifications,
+)
+from src.utils.llm_metrics import (
+    LLMUsageTracker,
+    estimate_prompt_tokens,
+    summarize_llm_calls,
+    write_metrics_record,
+)
+from src.utils.rate_limit import TokenBucket
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Typical structured answer, used to estimate completion tokens in a dry run
+_EXAMPLE_COMPLETION = json.dumps({"sentiment": "NEUTRAL", "importance": "MEDIUM", "is_market_relevant": True})
+# Reopening the cursor after a dropped connection or an expired cursor
+_MAX_STREAM_RESTARTS = 5
+
+
+def _load_backfill_state(path: str) -> Dict[str, Any]:
+    """Loads the checkpoint of a previous backfill."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Failed to load backfill state, starting from scratch: {e}")
+        return {}
+
+
+def _save_backfill_state(path: str, backfill_state: Dict[str, Any]) -> None:
+    """Persists the checkpoint of the backfill, replacing the file atomically."""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(backfill_state, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Failed to save backfill state: {e}")
+
+
+def _resume_key(backfill_state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Sort key of the last written document, converted back to the types stored in MongoDB."""
+    after = backfill_state.get("after")
+    if not after:
+        return None
+    return {"timestamp": datetime.datetime.fromisoformat(after["timestamp"]), "_id": after["_id"]}
+
+
+def _document_to_news_item(document: Dict[str, Any]) -> NewsItem:
+    """Builds a news item from a stored document; only the id, title and text are used for classification."""
+    return NewsItem(
+        id=str(document["_id"]),
+        title=document.get("title") or "",
+        text=document.get("text") or "",
+        source_name="",
+        news_url="",
+        image_url="",
+        timestamp=document["timestamp"],
+    )
+
+
+def _chunks(documents: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stream(version: str, backfill_state: Dict[str, Any], batch_size: int) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the documents to reclassify, resuming after the checkpoint. A cursor lost to a dropped connection or
+    a cursor timeout is reopened after the last document it yielded, so documents are neither skipped nor repeated.
+    """
+    after = _resume_key(backfill_state)
+    restarts = 0
+    while True:
+        streamed = 0
+        try:
+            for document in stream_news_for_backfill(version, after, batch_size):
+                streamed += 1
+                after = {"timestamp": document["timestamp"], "_id": document["_id"]}
+                yield document
+            return
+        except PyMongoError as e:
+            restarts += 1
+            if restarts > _MAX_STREAM_RESTARTS:
+                raise
+            logger.warning(f"News stream interrupted after {streamed} documents, reopening the cursor: {e}")
+            time.sleep(min(30, 2 ** restarts))
+
+
+def _classification_changed(document: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+    return any(document.get(field) != fields[field] for field in ("sentiment", "importance", "is_market_relevant"))
+
+
+def _estimate_chunk(items: List[NewsItem], prompt_texts: Dict[str, str], tracker: LLMUsageTracker) -> None:
+    """Records estimated single-item calls for a chunk instead of calling the LLM (dry run)."""
+    completion_tokens = count_tokens(_EXAMPLE_COMPLETION, config.model_name)
+    for item in items:
+        prompt = sentiment_analysis_prompt.invoke({"title": item.title, "text": prompt_texts.get(item.id, item.text)})
+        tracker.record(LLMCallRecord(
+            model=config.model_name,
+            prompt_tokens=estimate_prompt_tokens(prompt, config.model_name),
+            completion_tokens=completion_tokens,
+            estimated=True,
+        ))
+
+
+def _add_usage(totals: Dict[str, Any], usage: Dict[str, Any]) -> None:
+    """Adds the summable fields of a chunk's LLM usage summary to the running totals."""
+    for key in ("calls", "failed_calls", "prompt_tokens", "completion_tokens", "total_tokens", "text_tokens_saved"):
+        totals[key] = totals.get(key, 0) + usage.get(key, 0)
+    if usage.get("cost_usd") is not None:
+        totals["cost_usd"] = round(totals.get("cost_usd", 0.0) + usage["cost_usd"], 6)
+
+
+def run_backfill(args) -> Dict[str, Any]:
+    """
+    Reclassifies the stored news not yet classified with the current model and prompt.
+
+    Returns:
+        Report with the documents processed, updated, changed, unclassified and failed (classified but not written),
+        the throughput and the LLM usage.
+    """
+    version = classification_version()
+    backfill_state = {} if args.restart or args.dry_run else _load_backfill_state(args.state)
+    if backfill_state and backfill_state.get("classified_with") != version:
+        logger.warning(
+            f"Backfill state is for {backfill_state.get('classified_with')}, not {version}; starting from scratch."
+        )
+        backfill_state = {}
+    if backfill_state:
+        logger.info(f"Resuming backfill after {backfill_state['after']} ({backfill_state['processed']} done).")
+    else:
+        backfill_state = {
+            "classified_with": version,
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "after": None,
+            "processed": 0,
+            "updated": 0,
+            "changed": 0,
+            "unclassified": 0,
+            "failed": 0,
+            "llm_usage": {},
+        }
+    # State files of earlier versions counted unclassified items as failed
+    backfill_state.setdefault("unclassified", 0)
+
+    remaining = count_news_for_backfill(version)
+    if args.limit:
+        remaining = min(remaining, args.limit)
+    logger.info(f"Backfilling {remaining} news items with {version}{' (dry run)' if args.dry_run else ''}.")
+
+    rate_limiter = TokenBucket(rate=args.rate, capacity=max(1.0, args.rate))
+    started = time.monotonic()
+    session_processed = 0
+
+    documents = _stream(version, backfill_state, args.cursor_batch_size)
+    for chunk in _chunks(documents, args.chunk_size):
+        if args.limit:
+            chunk = chunk[:args.limit - session_processed]
+        items = [_document_to_news_item(document) for document in chunk]
+        tracker = LLMUsageTracker(config.model_name)
+
+        prompt_texts: Dict[str, str] = {}
+        tokens_saved: Dict[str, int] = {}
+        if config.text_compaction_enabled:
+            prompt_texts, tokens_saved = compact_news(items)
+
+        if args.dry_run:
+            _estimate_chunk(items, prompt_texts, tracker)
+            updated = changed = unclassified = failed = 0
+        else:
+            processed = classify_news(items, tracker, prompt_texts, rate_limiter)
+            updates = {
+                news_id: {
+                    "sentiment": classification.sentiment.value,
+                    "importance": classification.importance.value,
+                    "is_market_relevant": classification.is_market_relevant,
+                    "classified_with": version,
+                    "prefilter_confidence": None,
+                }
+                for news_id, classification in processed.items()
+            }
+            updated_ids = update_bulk_classifications(updates) if updates else set()
+            by_id = {str(document["_id"]): document for document in chunk}
+            changed = sum(_classification_changed(by_id[news_id], updates[news_id]) for news_id in updated_ids)
+            updated = len(updated_ids)
+            unclassified = len(items) - len(updates)
+            failed = len(updates) - updated
+
+        usage = summarize_llm_calls(tracker.calls, config.model_name, tokens_saved)
+        _add_usage(backfill_state["llm_usage"], usage)
+        session_processed += len(chunk)
+        backfill_state["processed"] += len(chunk)
+        backfill_state["updated"] += updated
+        backfill_state["changed"] += changed
+        backfill_state["unclassified"] += unclassified
+        backfill_state["failed"] += failed
+        last = chunk[-1]
+        backfill_state["after"] = {"timestamp": last["timestamp"].isoformat(), "_id": str(last["_id"])}
+        if not args.dry_run:
+            _save_backfill_state(args.state, backfill_state)
+
+        elapsed = time.monotonic() - started
+        throughput = session_processed / elapsed if elapsed > 0 else 0.0
+        eta = (remaining - session_processed) / throughput if throughput > 0 else 0.0
+        logger.info(
+            f"Backfill: {session_processed}/{remaining} items, {throughput:.1f} items/s, ETA {eta / 60:.1f} min; "
+            f"chunk updated {updated}, changed {changed}, unclassified {unclassified}, failed {failed}, "
+            f"LLM latency p50 {usage['latency_ms_p50']:.0f} ms / p99 {usage['latency_ms_p99']:.0f} ms."
+        )
+
+        if args.limit and session_processed >= args.limit:
+            break
+
+    elapsed = time.monotonic() - started
+    return {
+        **backfill_state,
+        "dry_run": args.dry_run,
+        "session_items": session_processed,
+        "session_seconds": round(elapsed, 1),
+        "items_per_second": round(session_processed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reclassify stored news with the current model and prompt")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=config.backfill_requests_per_second,
+        help="Maximum LLM requests per second (defaults to BACKFILL_REQUESTS_PER_SECOND)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=500, help="Documents classified and written per checkpoint")
+    parser.add_argument("--cursor-batch-size", type=int, default=1_000, help="Documents fetched per round-trip")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N documents (0 processes everything)")
+    parser.add_argument("--state", default=config.backfill_state_path, help="Defaults to BACKFILL_STATE_PATH")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the top")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Count the documents and estimate tokens and cost without calling the LLM or writing anything",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        report = run_backfill(args)
+    except KeyboardInterrupt:
+        logger.warning("Backfill interrupted; rerun the same command to resume after the last written chunk.")
+        sys.exit(130)
+    finally:
+        close_database()
+
+    print(json.dumps(report, indent=2, default=str))
+    if not args.dry_run:
+        write_metrics_record({"graph": "backfill", "news_items": report["session_items"], **report["llm_usage"]})
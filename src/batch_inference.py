@@ -0,0 +1,454 @@
+"""
+Offline Batch Inference
+
+Classifies non-urgent news through the OpenAI Batch API, which is billed at half the price of synchronous requests
+and completes within the completion window (24h). Pending news items are serialized together with the sentiment
+analysis prompt into Batch-API-compatible JSONL files (one `/v1/chat/completions` request per article, with the same
+structured-output schema as the synchronous path), uploaded and submitted. Submitted jobs are tracked in
+BATCH_JOBS_DIR/jobs.json; once a batch has completed, its result file is downloaded and ingested. A job is only
+marked completed once its result files are on disk, so a failed download is retried by the next refresh:
+
+- `news` jobs (articles from a JSONL file) are written as new ProcessedNewsItems with `add_bulk_news`;
+- `reclassify` jobs (stored news not yet classified with the current model and prompt) update the stored
+  classification, like `python -m src.backfill`.
+
+Items of batch jobs are not sent to Telegram.
+
+Usage:
+    python -m src.batch_inference submit --input news.jsonl
+    python -m src.batch_inference submit --backfill --limit 100000
+    python -m src.batch_inference status
+    python -m src.batch_inference ingest --wait
+"""
+# Import libraries
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.config.config import config
+from src.prompts import sentiment_analysis_prompt
+from src.state import Classification, LLMCallRecord, NewsItem, ProcessedNewsItem, processed_news_item
+from src.nodes.sentiment_analysis import ResponseOutputSchema, classification_version, compact_news
+from src.utils.db_utils import (
+    add_bulk_news,
+    close_database,
+    fetch_cache,
+    stream_news_for_backfill,
+    update_bulk_classifications,
+)
+from src.utils.llm_metrics import summarize_llm_calls, write_metrics_record
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Batch API requests are billed at half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+# Job kinds
+JOB_NEWS = "news"
+JOB_RECLASSIFY = "reclassify"
+
+# Batch statuses after which no result file will appear
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Job statuses of the registry in addition to the Batch API statuses
+_INGESTED = "ingested"
+# Jobs in these statuses have nothing left to ingest
+_CLOSED_STATUSES = {_INGESTED, "failed", "expired", "cancelled"}
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def _response_format() -> Dict[str, Any]:
+    """Structured-output response format of the single-item classification, as sent by the synchronous path."""
+    function = convert_to_openai_tool(ResponseOutputSchema, strict=True)["function"]
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True},
+    }
+
+
+def build_batch_request(item: NewsItem, text: str, response_format: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Serializes the classification request of a news item as one line of a Batch API input file.
+
+    Args:
+        item: News item to classify; its id is used as the request's custom_id
+        text: Article text to put in the prompt
+        response_format: Structured-output response format
+
+    Returns:
+        Batch API request line.
+    """
+    prompt = sentiment_analysis_prompt.invoke({"title": item.title, "text": text})
+    return {
+        "custom_id": item.id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": config.model_name,
+            "messages": [
+                {"role": _ROLES[message.type], "content": message.content}
+                for message in prompt.to_messages()
+            ],
+            "response_format": response_format,
+        },
+    }
+
+
+def parse_batch_result(line: Dict[str, Any]) -> Tuple[str, Optional[ResponseOutputSchema], Optional[LLMCallRecord]]:
+    """
+    Parses one line of a Batch API output file.
+
+    Returns:
+        Tuple of the news id, the classification (None if the request failed or returned no valid output) and the
+        token usage of the request (None if it failed).
+    """
+    news_id = line["custom_id"]
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        logger.warning(f"Batch request for news item {news_id} failed: {line.get('error') or response.get('body')}")
+        return news_id, None, None
+
+    body = response["body"]
+    usage = body.get("usage") or {}
+    call = LLMCallRecord(
+        model=config.model_name,
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+    )
+    try:
+        content = body["choices"][0]["message"]["content"]
+        return news_id, ResponseOutputSchema.model_validate_json(content), call
+    except Exception as e:
+        logger.warning(f"Batch result for news item {news_id} could not be parsed: {e}")
+        return news_id, None, call.model_copy(update={"success": False})
+
+
+class JobRegistry:
+    """Batch jobs and their files, tracked in a JSON file in `directory`."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.json")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.path, "r") as f:
+                self.jobs: List[Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.jobs = []
+
+    def file(self, job_id: str, name: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{name}.jsonl")
+
+    def save(self) -> None:
+        """Persists the registry, replacing the file atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.jobs, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def open_jobs(self) -> List[Dict[str, Any]]:
+        """Jobs whose results have not been ingested yet."""
+        return [job for job in self.jobs if job["status"] not in _CLOSED_STATUSES]
+
+    def pending_ids(self) -> set:
+        """Ids of the news items in open jobs, so they are not submitted twice."""
+        ids = set()
+        for job in self.open_jobs():
+            with open(self.file(job["id"], "items")) as f:
+                ids.update(json.loads(line)["id"] for line in f)
+        return ids
+
+
+def _client() -> OpenAI:
+    return OpenAI(
+        api_key=config.model_api_key.get_secret_value(),
+        base_url=config.model_base_url,
+        timeout=config.llm_timeout,
+    )
+
+
+def _load_input_news(path: str) -> List[NewsItem]:
+    """Loads news items from a JSONL file, skipping the ones already stored."""
+    with open(path) as f:
+        news = [NewsItem.model_validate(json.loads(line)) for line in f if line.strip()]
+    stored = fetch_cache(item.id for item in news)
+    if stored:
+        logger.info(f"Skipping {len(stored)} news items that are already stored.")
+    return [item for item in news if item.id not in stored]
+
+
+def _load_backfill_news(limit: int, exclude: set) -> List[NewsItem]:
+    """Loads stored news not yet classified with the current model and prompt."""
+    news = []
+    for document in stream_news_for_backfill(classification_version()):
+        if str(document["_id"]) in exclude:
+            continue
+        news.append(NewsItem(
+            id=str(document["_id"]),
+            title=document.get("title") or "",
+            text=document.get("text") or "",
+            source_name="",
+            news_url="",
+            image_url="",
+            timestamp=document["timestamp"],
+        ))
+        if limit and len(news) >= limit:
+            break
+    return news
+
+
+def submit(registry: JobRegistry, news: List[NewsItem], kind: str, max_requests: int) -> List[Dict[str, Any]]:
+    """
+    Serializes news items into Batch API input files of at most `max_requests` requests, uploads and submits them.
+
+    Returns:
+        The registered jobs.
+    """
+    client = _client()
+    response_format = _response_format()
+    prompt_texts: Dict[str, str] = {}
+    if config.text_compaction_enabled:
+        prompt_texts, _ = compact_news(news)
+
+    jobs = []
+    for i in range(0, len(news), max_requests):
+        chunk = news[i:i + max_requests]
+        job = {
+            "id": f"{kind}-{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+            "kind": kind,
+            "classified_with": classification_version(),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "items": len(chunk),
+            "status": "prepared",
+            "batch_id": None,
+        }
+        with open(registry.file(job["id"], "requests"), "w") as requests_file, \
+                open(registry.file(job["id"], "items"), "w") as items_file:
+            for item in chunk:
+                request = build_batch_request(item, prompt_texts.get(item.id, item.text), response_format)
+                requests_file.write(json.dumps(request) + "\n")
+                items_file.write(item.model_dump_json() + "\n")
+        registry.jobs.append(job)
+        registry.save()
+        _submit_job(client, registry, job)
+        jobs.append(job)
+
+    return jobs
+
+
+def _submit_job(client: OpenAI, registry: JobRegistry, job: Dict[str, Any]) -> None:
+    """Uploads the input file of a prepared job and creates its batch."""
+    try:
+        with open(registry.file(job["id"], "requests"), "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=config.batch_completion_window,
+            metadata={"job_id": job["id"], "kind": job["kind"]},
+        )
+        job.update(status=batch.status, batch_id=batch.id)
+        logger.info(f"Submitted batch job {job['id']} ({job['items']} requests) as {batch.id}.")
+    except Exception as e:
+        # The prepared files are kept; the job is submitted again by `submit --retry`
+        logger.error(f"Failed to submit batch job {job['id']}: {e}")
+    registry.save()
+
+
+def resubmit_prepared(registry: JobRegistry) -> None:
+    """Submits the jobs whose input file was prepared but could not be submitted."""
+    client = _client()
+    for job in registry.jobs:
+        if job["status"] == "prepared":
+            _submit_job(client, registry, job)
+
+
+def _download_results(client: OpenAI, registry: JobRegistry, job: Dict[str, Any], batch) -> List[str]:
+    """
+    Downloads the output and error files of a completed batch that are not on disk yet. Each file is written
+    atomically, so a file on disk is always complete.
+
+    Returns:
+        Names of the result files of the job ("results", "errors").
+    """
+    names = []
+    for file_id, name in ((batch.output_file_id, "results"), (batch.error_file_id, "errors")):
+        if not file_id:
+            continue
+        path = registry.file(job["id"], name)
+        if not os.path.exists(path):
+            content = client.files.content(file_id).content
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+        names.append(name)
+    return names
+
+
+def refresh(registry: JobRegistry) -> None:
+    """Updates the status of the submitted jobs and downloads the result files of the completed ones."""
+    client = _client()
+    for job in registry.open_jobs():
+        if not job.get("batch_id"):
+            continue
+        try:
+            batch = client.batches.retrieve(job["batch_id"])
+            if batch.request_counts is not None:
+                job["request_counts"] = batch.request_counts.model_dump()
+            if batch.status == "completed":
+                # Raises before the status is updated, so the job is not ingested without its results
+                job["result_files"] = _download_results(client, registry, job, batch)
+            job["status"] = batch.status
+        except Exception as e:
+            logger.error(f"Failed to refresh batch job {job['id']}: {e}")
+        registry.save()
+
+
+def ingest(registry: JobRegistry, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Ingests the result file of a completed job. A job whose result files are not all on disk is not ingested; it
+    stays completed, and the next refresh downloads them again.
+
+    Returns:
+        Ingestion report with the items classified, stored and failed and the LLM usage at batch prices, or None if
+        the result files are missing.
+    """
+    result_files = job.get("result_files")
+    missing = [name for name in result_files or [] if not os.path.exists(registry.file(job["id"], name))]
+    if result_files is None or missing:
+        logger.error(f"Result files of batch job {job['id']} are missing: {missing or 'never downloaded'}.")
+        return None
+
+    with open(registry.file(job["id"], "items")) as f:
+        items = {item.id: item for item in (NewsItem.model_validate_json(line) for line in f)}
+
+    responses: Dict[str, ResponseOutputSchema] = {}
+    calls: List[LLMCallRecord] = []
+    for name in result_files:
+        with open(registry.file(job["id"], name)) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                news_id, response, call = parse_batch_result(json.loads(line))
+                if call is not None:
+                    calls.append(call)
+                if response is not None and news_id in items:
+                    responses[news_id] = response
+
+    processed: List[ProcessedNewsItem] = [
+        processed_news_item(
+            items[news_id], Classification(**response.model_dump(), classified_with=job["classified_with"])
+        )
+        for news_id, response in responses.items()
+    ]
+    if not processed:
+        stored = 0
+    elif job["kind"] == JOB_NEWS:
+        stored = len(add_bulk_news(processed))
+    else:
+        stored = len(update_bulk_classifications({
+            item.id: {
+                "sentiment": item.sentiment.value,
+                "importance": item.importance.value,
+                "is_market_relevant": item.is_market_relevant,
+                "classified_with": item.classified_with,
+                "prefilter_confidence": None,
+            }
+            for item in processed
+        }))
+
+    usage = summarize_llm_calls(calls, config.model_name)
+    if usage.get("cost_usd") is not None:
+        usage["cost_usd"] = round(usage["cost_usd"] * BATCH_PRICE_FACTOR, 6)
+    report = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "items": len(items),
+        "classified": len(processed),
+        "stored": stored,
+        "failed": len(items) - len(processed),
+        **usage,
+    }
+    job.update(status=_INGESTED, ingested_at=datetime.datetime.now(datetime.timezone.utc).isoformat(), report=report)
+    registry.save()
+    write_metrics_record({"graph": "batch_inference", "news_items": len(processed), **usage})
+    logger.info(f"Ingested batch job {job['id']}: {len(processed)}/{len(items)} classified, {stored} stored.")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Classify news offline through the OpenAI Batch API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = subparsers.add_parser("submit", help="Serialize pending news into batch jobs and submit them")
+    source = submit_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="JSONL file of news items to classify and store")
+    source.add_argument("--backfill", action="store_true", help="Reclassify stored news with the current prompt")
+    source.add_argument("--retry", action="store_true", help="Submit jobs that were prepared but not submitted")
+    submit_parser.add_argument("--limit", type=int, default=0, help="Maximum number of news items (0 for all)")
+    submit_parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=config.batch_max_requests,
+        help="Maximum requests per batch job (defaults to BATCH_MAX_REQUESTS)",
+    )
+
+    subparsers.add_parser("status", help="Refresh and print the status of the tracked jobs")
+
+    ingest_parser = subparsers.add_parser("ingest", help="Download and ingest the results of completed jobs")
+    ingest_parser.add_argument("--wait", action="store_true", help="Poll until every open job is finished")
+    ingest_parser.add_argument("--poll-interval", type=float, default=60, help="Seconds between polls with --wait")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    registry = JobRegistry(config.batch_jobs_dir)
+
+    try:
+        if args.command == "submit":
+            if args.retry:
+                resubmit_prepared(registry)
+            else:
+                if args.input:
+                    pending_ids = registry.pending_ids()
+                    kind, news = JOB_NEWS, [item for item in _load_input_news(args.input) if item.id not in pending_ids]
+                else:
+                    kind, news = JOB_RECLASSIFY, _load_backfill_news(args.limit, registry.pending_ids())
+                news = news[:args.limit] if args.limit else news
+                if not news:
+                    logger.info("No pending news items to submit.")
+                    sys.exit(0)
+                submit(registry, news, kind, args.max_requests)
+
+        elif args.command == "status":
+            refresh(registry)
+
+        else:
+            while True:
+                refresh(registry)
+                for job in registry.open_jobs():
+                    if job["status"] == "completed":
+                        report = ingest(registry, job)
+                        if report is not None:
+                            print(json.dumps(report, indent=2))
+                waiting = [job for job in registry.open_jobs() if job["status"] not in _FINAL_STATUSES]
+                if not args.wait or not waiting:
+                    break
+                logger.info(f"Waiting for {len(waiting)} batch jobs...")
+                time.sleep(args.poll_interval)
+    finally:
+        close_database()
+
+    for job in registry.jobs[-20:]:
+        print(f"{job['id']:<48} {job['status']:<12} {job['items']:>7} items  batch {job.get('batch_id')}")
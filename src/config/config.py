@@ -8,10 +8,12 @@ for local .env files and cloud deployment with GCP Secret Manager integration.
 import os
 import sys
 import logging
+import threading
 from enum import Enum
 from pathlib import Path
+from typing import List, Optional
 from pydantic_settings import BaseSettings
-from pydantic import SecretStr, Field, ValidationError
+from pydantic import BaseModel, SecretStr, Field, ValidationError, model_validator
 
 
 class LogLevel(str, Enum):
@@ -23,6 +25,55 @@ class LogLevel(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class MetricsSink(str, Enum):
+    """Destinations of the per-run metrics record."""
+    NONE = "none"
+    FILE = "file"
+    MONGO = "mongo"
+
+
+class CheckpointMode(str, Enum):
+    """Storage of the LangGraph checkpoints."""
+    NONE = "none"
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+
+
+class NewsSourceConfig(BaseModel):
+    """A news endpoint watched by the pipeline. See NEWS_SOURCES in .env.example."""
+    name: str = Field(
+        ...,
+        description="Unique source name, used in logs and to keep the fetch high-water mark"
+    )
+    provider: str = Field(
+        default="cryptonews",
+        description="Registered provider implementation used to fetch and parse the source"
+    )
+    url: str = Field(
+        ...,
+        description="Endpoint URL without the API token"
+    )
+    timeout: float = Field(
+        default=10.0,
+        gt=0,
+        description="Timeout of a single request to the source in seconds"
+    )
+    requests_per_second: float = Field(
+        default=2.0,
+        gt=0,
+        description="Sustained request rate allowed for the source"
+    )
+    burst: int = Field(
+        default=5,
+        ge=1,
+        description="Number of requests the source allows in a burst"
+    )
+    enabled: bool = Field(
+        default=True,
+        description="Whether the source is fetched"
+    )
+
+
 class SystemConfig(BaseSettings):
     """
     Main application configuration with environment-based loading.
@@ -63,6 +114,54 @@ class SystemConfig(BaseSettings):
         ...,
         description="Database name"
     )
+    db_write_chunk_size: int = Field(
+        default=500,
+        ge=1,
+        description="Number of news items per bulk write request"
+    )
+    db_write_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Maximum number of attempts of a bulk write on transient errors"
+    )
+    db_write_backoff_seconds: float = Field(
+        default=0.5,
+        ge=0,
+        description="Initial backoff between bulk write attempts, doubled on every retry"
+    )
+
+    # Work queue configurations (several pipeline instances sharing one database)
+    work_queue_enabled: bool = Field(
+        default=False,
+        description="Process unseen news through the MongoDB work queue, so concurrent instances never process "
+                    "or notify the same item twice"
+    )
+    work_queue_lease_seconds: float = Field(
+        default=120.0,
+        gt=0,
+        description="Lease of a claimed item, renewed while the worker runs; an expired lease is taken over by "
+                    "another worker"
+    )
+    work_queue_max_attempts: int = Field(
+        default=5,
+        ge=1,
+        description="Attempts per item before it is moved to the dead letters"
+    )
+    work_queue_claim_limit: int = Field(
+        default=500,
+        gt=0,
+        description="Maximum number of items claimed per run"
+    )
+    work_queue_retry_backoff_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description="Delay before a failed item is retried, doubled on every attempt"
+    )
+    work_queue_retention_seconds: float = Field(
+        default=604800.0,
+        gt=0,
+        description="Time finished (done or dead) items are kept in the queue"
+    )
 
     # LLM configurations
     model_name: str = Field(
@@ -73,6 +172,222 @@ class SystemConfig(BaseSettings):
         ...,
         description="Large Language Model API key"
     )
+    model_base_url: Optional[str] = Field(
+        default=None,
+        description="Base URL of an OpenAI-compatible API (proxy, gateway or local stand-in); defaults to OpenAI"
+    )
+    llm_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of in-flight LLM requests during sentiment analysis (upper bound of the AIMD limit)"
+    )
+    llm_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        description="Per-item LLM request timeout in seconds"
+    )
+    llm_adaptive_concurrency: bool = Field(
+        default=True,
+        description="Adjust the number of in-flight LLM requests with AIMD; false keeps it at LLM_MAX_CONCURRENCY"
+    )
+    llm_initial_concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Starting number of in-flight LLM requests of the adaptive limit"
+    )
+    llm_min_concurrency: int = Field(
+        default=1,
+        ge=1,
+        description="Lower bound of the adaptive limit"
+    )
+    llm_latency_target_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        description="LLM response time above which the adaptive limit is reduced, like on a rate limit"
+    )
+    llm_max_attempts: int = Field(
+        default=4,
+        ge=1,
+        description="Attempts per LLM request on rate limits, timeouts, connection and server errors"
+    )
+    llm_retry_backoff_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="Base delay of the exponential backoff between LLM attempts; rate-limit headers take precedence"
+    )
+    llm_retry_max_backoff_seconds: float = Field(
+        default=30.0,
+        gt=0,
+        description="Longest wait between two LLM attempts"
+    )
+    llm_circuit_failure_threshold: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive provider failures (timeouts, connection and server errors) that open the circuit"
+    )
+    llm_circuit_recovery_seconds: float = Field(
+        default=30.0,
+        gt=0,
+        description="Time the open circuit fails LLM requests immediately before a probe request is let through"
+    )
+    llm_batch_size: int = Field(
+        default=1,
+        ge=1,
+        description="Number of news items classified per LLM request (1 disables batching)"
+    )
+
+    # Article text compaction configurations
+    text_compaction_enabled: bool = Field(
+        default=False,
+        description="Strip markup and boilerplate from article text and cut it to text_max_tokens before classification"
+    )
+    text_max_tokens: int = Field(
+        default=400,
+        gt=0,
+        description="Token budget of the article text sent to the LLM; the headline is not counted"
+    )
+
+    # Local pre-filter classifier configurations
+    prefilter_enabled: bool = Field(
+        default=False,
+        description="Answer confidently classified items with the local pre-filter model instead of the LLM"
+    )
+    prefilter_model_path: str = Field(
+        default="cache/prefilter_model.json",
+        description="Path of the pre-filter model written by python -m src.train_prefilter"
+    )
+    prefilter_confidence_threshold: float = Field(
+        default=0.9,
+        gt=0,
+        le=1,
+        description="Minimum probability of every predicted field for an item to be answered locally"
+    )
+    prefilter_shadow_rate: float = Field(
+        default=0.05,
+        ge=0,
+        le=1,
+        description="Share of confidently classified items still sent to the LLM to measure the agreement rate"
+    )
+
+    # Backfill configurations
+    backfill_state_path: str = Field(
+        default="cache/backfill_state.json",
+        description="Path of the checkpoint file a backfill resumes from after a crash"
+    )
+    backfill_requests_per_second: float = Field(
+        default=5.0,
+        gt=0,
+        description="Maximum LLM requests per second during a backfill"
+    )
+
+    # Offline batch inference configurations
+    batch_jobs_dir: str = Field(
+        default="cache/batch_jobs",
+        description="Directory of the Batch API input, item and result files and of the job registry"
+    )
+    batch_completion_window: str = Field(
+        default="24h",
+        description="Completion window of submitted Batch API jobs"
+    )
+    batch_max_requests: int = Field(
+        default=50_000,
+        ge=1,
+        le=50_000,
+        description="Maximum number of requests per Batch API job"
+    )
+
+    # LLM result cache configurations
+    llm_cache_enabled: bool = Field(
+        default=True,
+        description="Reuse previous LLM classifications of identical content"
+    )
+    llm_cache_path: str = Field(
+        default="cache/llm_cache.sqlite3",
+        description="Path of the SQLite file backing the LLM result cache"
+    )
+    llm_cache_max_entries: int = Field(
+        default=100_000,
+        ge=1,
+        description="Maximum number of cached LLM results before least recently used entries are evicted"
+    )
+    llm_cache_ttl_seconds: int = Field(
+        default=30 * 24 * 60 * 60,
+        gt=0,
+        description="Time to live of a cached LLM result in seconds"
+    )
+
+    # LLM usage metrics
+    metrics_sink: MetricsSink = Field(
+        default=MetricsSink.NONE,
+        description="Where to write the per-run LLM usage record: none, file (JSONL) or mongo (metrics collection)"
+    )
+    metrics_path: str = Field(
+        default="cache/metrics.jsonl",
+        description="JSONL file the per-run LLM usage records are appended to when metrics_sink is file"
+    )
+    llm_price_per_million_input: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="USD per million prompt tokens, overrides the built-in price of model_name"
+    )
+    llm_price_per_million_output: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="USD per million completion tokens, overrides the built-in price of model_name"
+    )
+
+    # Seen-id index configurations
+    seen_index_enabled: bool = Field(
+        default=True,
+        description="Skip the database for ids a local Bloom filter reports as never seen"
+    )
+    seen_index_path: str = Field(
+        default="cache/seen_ids.bloom",
+        description="Path of the memory-mapped seen-id Bloom filter file"
+    )
+    seen_index_capacity: int = Field(
+        default=100_000,
+        ge=1,
+        description="Number of ids held by the first Bloom filter slice before a larger one is added"
+    )
+    seen_index_error_rate: float = Field(
+        default=0.001,
+        gt=0,
+        lt=1,
+        description="Target false-positive rate of the seen-id Bloom filter"
+    )
+    seen_index_sync_interval_seconds: int = Field(
+        default=60,
+        ge=0,
+        description="Minimum time between syncs of the open seen-id index with the database (0: before every lookup)"
+    )
+
+    # Near-duplicate detection configurations
+    near_duplicate_enabled: bool = Field(
+        default=False,
+        description="Link syndicated copies of a story to a canonical item and reuse its classification"
+    )
+    near_duplicate_threshold: float = Field(
+        default=0.7,
+        gt=0,
+        le=1,
+        description="Minimum estimated Jaccard similarity for two items to be considered near-duplicates"
+    )
+    near_duplicate_window_minutes: int = Field(
+        default=180,
+        gt=0,
+        description="Sliding time window of items kept in the near-duplicate index"
+    )
+    near_duplicate_num_perm: int = Field(
+        default=64,
+        gt=0,
+        description="Number of MinHash permutations per signature"
+    )
+    near_duplicate_bands: int = Field(
+        default=16,
+        gt=0,
+        description="Number of LSH bands, must divide near_duplicate_num_perm"
+    )
 
     # Telegram configurations
     bot_token: SecretStr = Field(
@@ -83,6 +398,30 @@ class SystemConfig(BaseSettings):
         ...,
         description="Private group id"
     )
+    telegram_api_url: str = Field(
+        default="https://api.telegram.org",
+        description="Telegram Bot API base URL"
+    )
+    telegram_max_concurrency: int = Field(
+        default=5,
+        ge=1,
+        description="Maximum number of in-flight Telegram requests"
+    )
+    telegram_global_rate: float = Field(
+        default=30.0,
+        gt=0,
+        description="Maximum number of messages per second across all chats"
+    )
+    telegram_chat_rate_per_minute: float = Field(
+        default=20.0,
+        gt=0,
+        description="Maximum number of messages per minute to the group"
+    )
+    telegram_max_attempts: int = Field(
+        default=5,
+        ge=1,
+        description="Maximum number of attempts per message, including retries after HTTP 429"
+    )
 
     # Crypto news configurations
     news_api_key: SecretStr = Field(
@@ -93,6 +432,126 @@ class SystemConfig(BaseSettings):
         ...,
         description="News API URL"
     )
+    news_sources: List[NewsSourceConfig] = Field(
+        default_factory=list,
+        description="News endpoints fetched concurrently on every run (JSON list), defaults to news_url only"
+    )
+    fetch_latency_budget_seconds: float = Field(
+        default=20.0,
+        gt=0,
+        description="Time after which the fetch node returns the results of the sources that finished"
+    )
+    fetch_page_size: int = Field(
+        default=10,
+        ge=1,
+        description="Number of news items requested per page"
+    )
+    fetch_max_pages: int = Field(
+        default=5,
+        ge=1,
+        description="Maximum number of pages walked per run to reach already-seen news"
+    )
+    fetch_page_concurrency: int = Field(
+        default=3,
+        ge=1,
+        description="Number of pages fetched concurrently while walking back to already-seen news"
+    )
+    fetch_state_path: str = Field(
+        default="cache/fetch_state.json",
+        description="Path of the file holding the fetch high-water mark and HTTP validators between runs"
+    )
+
+    # Checkpoint configurations
+    checkpoint_mode: CheckpointMode = Field(
+        default=CheckpointMode.MEMORY,
+        description="Where graph checkpoints are kept: none (fastest), memory or sqlite (persistent)"
+    )
+    checkpoint_path: str = Field(
+        default="cache/checkpoints.sqlite3",
+        description="SQLite file of the checkpoints when checkpoint_mode is sqlite"
+    )
+    checkpoint_retention_runs: int = Field(
+        default=100,
+        ge=1,
+        description="Number of most recent runs whose checkpoints are kept"
+    )
+    checkpoint_retention_seconds: float = Field(
+        default=24 * 60 * 60,
+        ge=0,
+        description="Checkpoints of runs older than this are deleted (0 keeps them up to checkpoint_retention_runs)"
+    )
+    checkpoint_compaction_interval: int = Field(
+        default=100,
+        ge=1,
+        description="Number of runs between compactions (VACUUM) of the SQLite checkpoint store"
+    )
+
+    # Prometheus metrics configurations
+    prometheus_port: int = Field(
+        default=9464,
+        ge=0,
+        le=65535,
+        description="Port of the /metrics endpoint in daemon mode (0 disables it)"
+    )
+    prometheus_addr: str = Field(
+        default="127.0.0.1",
+        description="Address the /metrics endpoint binds to in daemon mode"
+    )
+    prometheus_textfile_path: str = Field(
+        default="",
+        description="File the metrics are written to after a one-shot run (empty disables it)"
+    )
+
+    # Runtime configurations
+    tick_interval_seconds: float = Field(
+        default=60.0,
+        gt=0,
+        description="Interval between pipeline runs in daemon mode"
+    )
+    tick_deadline_seconds: float = Field(
+        default=50.0,
+        ge=0,
+        description="Time budget of a run; items not finished by then are carried over to the next run. 0 disables"
+    )
+    deadline_reserve_seconds: float = Field(
+        default=10.0,
+        ge=0,
+        description="Part of the run budget kept for storing and notifying; no LLM request is started within it"
+    )
+    item_deadline_seconds: float = Field(
+        default=40.0,
+        ge=0,
+        description="Time budget of the classification of a single item, including LLM retries. 0 disables"
+    )
+    pending_queue_path: str = Field(
+        default="cache/pending_news.json",
+        description="Path of the file holding the unfinished items carried over to the next run"
+    )
+    pending_max_attempts: int = Field(
+        default=5,
+        ge=1,
+        description="Failed runs after which a carried-over item is dropped"
+    )
+    http_timeout: float = Field(
+        default=15.0,
+        gt=0,
+        description="Timeout in seconds for outgoing HTTP requests"
+    )
+    http_pool_size: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of pooled HTTP connections per host"
+    )
+    http_max_retries: int = Field(
+        default=3,
+        ge=0,
+        description="Maximum number of retries of idempotent HTTP requests on transient errors"
+    )
+    http_backoff_factor: float = Field(
+        default=0.5,
+        ge=0,
+        description="Exponential backoff factor in seconds between HTTP retries"
+    )
 
     # LangSmith configurations
     langchain_tracing_v2: bool = Field(
@@ -108,6 +567,21 @@ class SystemConfig(BaseSettings):
         description="LangSmith project name"
     )
 
+    @model_validator(mode="after")
+    def check_llm_concurrency_bounds(self) -> "SystemConfig":
+        """Rejects an adaptive concurrency range whose lower bound is above its upper bound."""
+        if self.llm_min_concurrency > self.llm_max_concurrency:
+            raise ValueError(
+                f"llm_min_concurrency ({self.llm_min_concurrency}) must not exceed "
+                f"llm_max_concurrency ({self.llm_max_concurrency})"
+            )
+        return self
+
+    def get_news_sources(self) -> List[NewsSourceConfig]:
+        """Returns the enabled news sources, falling back to a single source built from news_url."""
+        if not self.news_sources:
+            return [NewsSourceConfig(name="cryptonews", url=self.news_url)]
+        return [source for source in self.news_sources if source.enabled]
 
     def is_production(self) -> bool:
         """Check if running in a production environment."""
@@ -127,21 +601,52 @@ class SystemConfig(BaseSettings):
         validate_default = True
 
 
-# Initialize logging with basic configuration
-from src.config.logging_config import setup_logging
-setup_logging()
+# The configuration is built and validated on first access instead of on import, so importing a module (or running
+# `--help`) does not pay for reading the environment, and logging is set up once, together with the configuration.
+_config: Optional[SystemConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> SystemConfig:
+    """
+    Returns the process-wide configuration, loading and validating it on first use.
+
+    An invalid or incomplete configuration is logged and exits the process with status 1.
+    """
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                from src.config.logging_config import setup_logging
+                setup_logging()
+                try:
+                    _config = SystemConfig()
+                    logging.info(f"Configuration loaded for {_config.environment.upper()} environment.")
+                except ValidationError as e:
+                    logging.error(f"Configuration validation failed: {e}")
+                    sys.exit(1)
+                except Exception as e:
+                    logging.error(f"Failed to load configuration: {e}")
+                    sys.exit(1)
+    return _config
+
+
+class _LazyConfig:
+    """Module-level `config` object; attribute access is forwarded to the configuration built by `get_config`."""
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(get_config(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_config(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_config()) if _config is not None else "<SystemConfig (not loaded yet)>"
+
 
-# Load and validate configuration on module import
-try:
-    config = SystemConfig()
-    logging.info(f"Configuration loaded for {config.environment.upper()} environment.")
-except ValidationError as e:
-    logging.error(f"Configuration validation failed: {e}")
-    sys.exit(1)
-except Exception as e:
-    logging.error(f"Failed to load configuration: {e}")
-    sys.exit(1)
+config = _LazyConfig()
 
 
 # Public API
-__all__ = ['config', 'SystemConfig']
+__all__ = ['config', 'get_config', 'SystemConfig', 'NewsSourceConfig', 'MetricsSink', 'CheckpointMode']
@@ -8,19 +8,32 @@ Supports console and rotating file logging with customizable levels and formats.
 import os
 import logging
 import logging.config
-import yaml
+import threading
 
 DEFAULT_YAML_PATH = os.path.join(os.path.dirname(__file__), "logging_config.yaml")
 
-def setup_logging(yaml_path: str = DEFAULT_YAML_PATH):
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def setup_logging(yaml_path: str = DEFAULT_YAML_PATH, force: bool = False):
     """
     Set up a logging configuration using a YAML file.
+
+    Logging is configured once per process; later calls are no-ops unless `force` is set.
     """
-    if not os.path.exists(os.path.dirname(DEFAULT_YAML_PATH)):
-        os.makedirs(os.path.dirname(DEFAULT_YAML_PATH), exist_ok=True)
-    if not os.path.exists("logs"):
-        os.makedirs("logs", exist_ok=True)
-    with open(yaml_path, "r") as f:
-        config = yaml.safe_load(f)
-    logging.config.dictConfig(config)
-    logging.getLogger(__name__).info("Logging initialized successfully.")
\ No newline at end of file
+    global _configured
+    with _configure_lock:
+        if _configured and not force:
+            return
+        import yaml
+
+        if not os.path.exists(os.path.dirname(DEFAULT_YAML_PATH)):
+            os.makedirs(os.path.dirname(DEFAULT_YAML_PATH), exist_ok=True)
+        if not os.path.exists("logs"):
+            os.makedirs("logs", exist_ok=True)
+        with open(yaml_path, "r") as f:
+            config = yaml.safe_load(f)
+        logging.config.dictConfig(config)
+        _configured = True
+    logging.getLogger(__name__).info("Logging initialized successfully.")
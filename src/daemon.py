@@ -0,0 +1,138 @@
+"""
+Daemon Scheduler
+
+This module runs the pipeline as a long-lived process. The graph is compiled once and the pooled HTTP session, the LLM
+client and the MongoDB client stay warm across runs, removing the per-run cold start of cron invocations. Runs are
+scheduled on a fixed grid of `config.tick_interval_seconds` (no drift), never overlap, and the process shuts down
+gracefully on SIGINT/SIGTERM after the current run finishes. Every run gets a deadline of
+`config.tick_deadline_seconds`, at most the interval, so a slow run hands its unfinished items to the next one
+instead of overrunning it.
+"""
+# Import libraries
+import math
+import time
+import signal
+import logging
+import threading
+from typing import Optional, Type
+
+from src.state import GraphState
+from src.config.config import config
+from src.utils.http import close_http_session
+from src.utils.telegram import close_telegram_sender
+from src.utils.llm_cache import close_llm_cache
+from src.utils.bloom_filter import close_seen_index
+from src.utils.db_utils import get_database, close_database
+from src.utils.instrumentation import record_run, start_metrics_server
+from src.utils.work_queue import release_unsettled_work, close_work_queue
+from src.utils.deadline import run_deadline
+from src.utils.checkpoints import get_checkpoint_store, close_checkpoint_store, new_thread_id
+
+logger = logging.getLogger(__name__)
+
+
+class Daemon:
+    """Runs a compiled graph at a fixed interval until stopped."""
+
+    def __init__(self, graph, interval: float, state_schema: Type[GraphState] = GraphState):
+        self.graph = graph
+        self.interval = interval
+        self.state_schema = state_schema
+        self.tick_count = 0
+        self.deadline_budget = min(config.tick_deadline_seconds, interval) if config.tick_deadline_seconds else 0.0
+        self._stop_event = threading.Event()
+        self._tick_lock = threading.Lock()
+
+    def stop(self, *_) -> None:
+        """Requests a graceful shutdown. The current run, if any, is allowed to finish."""
+        if not self._stop_event.is_set():
+            logger.info("Shutdown requested, finishing current run...")
+        self._stop_event.set()
+
+    def run_tick(self) -> Optional[dict]:
+        """
+        Runs the graph once.
+
+        Returns:
+            The final graph state, or None if another run is still in progress or the run failed.
+        """
+        # Overlap protection: never start a run while the previous one is still going
+        if not self._tick_lock.acquire(blocking=False):
+            logger.warning("Previous run still in progress, skipping tick.")
+            return None
+
+        self.tick_count += 1
+        started = time.monotonic()
+        result = None
+        try:
+            # Every tick runs on its own thread so state (and reducer-collected lists) never carries over
+            thread_id = new_thread_id("tick")
+            thread = {
+                "configurable": {"thread_id": thread_id},
+                "max_concurrency": config.llm_max_concurrency,
+            }
+            get_checkpoint_store().register_run(thread_id)
+            result = self.graph.invoke(self.state_schema(deadline=run_deadline(self.deadline_budget)), thread)
+            logger.info(f"Tick {self.tick_count} finished in {time.monotonic() - started:.2f}s.")
+            return result
+        except Exception as e:
+            logger.exception(f"Tick {self.tick_count} failed: {e}")
+            return None
+        finally:
+            release_unsettled_work()
+            record_run(time.monotonic() - started, result)
+            get_checkpoint_store().prune()
+            self._tick_lock.release()
+
+    def run(self) -> None:
+        """Runs ticks on a fixed schedule until `stop` is called."""
+        logger.info(f"Daemon started with a {self.interval:.1f}s interval.")
+        start = time.monotonic()
+        slot = 0
+
+        while not self._stop_event.is_set():
+            self.run_tick()
+
+            # Drift correction: schedule against the fixed grid start + n * interval, skipping missed slots
+            elapsed = time.monotonic() - start
+            next_slot = max(slot + 1, math.ceil(elapsed / self.interval))
+            if next_slot > slot + 1:
+                logger.warning(f"Run overran the interval, skipping {next_slot - slot - 1} tick(s).")
+            slot = next_slot
+
+            delay = start + slot * self.interval - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+
+        logger.info("Daemon stopped.")
+
+
+def run_daemon(graph, interval: Optional[float] = None, state_schema: Type[GraphState] = GraphState) -> None:
+    """
+    Runs the pipeline as a resident process until SIGINT/SIGTERM.
+
+    Args:
+        graph: Compiled graph to invoke on every tick
+        interval: Seconds between ticks, defaults to `config.tick_interval_seconds`
+        state_schema: State schema of the graph, used to build the initial state of every tick
+    """
+    daemon = Daemon(graph, interval or config.tick_interval_seconds, state_schema)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+
+    # Open the database connection up front so the first tick does not pay for it
+    get_database()
+
+    if config.prometheus_port:
+        start_metrics_server(config.prometheus_port, config.prometheus_addr)
+
+    try:
+        daemon.run()
+    finally:
+        close_http_session()
+        close_telegram_sender()
+        close_llm_cache()
+        close_seen_index()
+        close_checkpoint_store()
+        close_work_queue()
+        close_database()
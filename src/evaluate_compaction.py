@@ -0,0 +1,157 @@
+"""
+Text Compaction Evaluation
+
+Offline check that text compaction does not change classifications. Recent articles are classified twice with the
+configured model, once with the full text and once with the compacted text, and the agreement of the two runs is
+reported together with the prompt tokens, latency and cost of each. The LLM result cache is bypassed and nothing is
+written to the database or sent to Telegram.
+
+Usage:
+    python -m src.evaluate_compaction --days 7 --limit 200 --max-tokens 400 --tolerance 0.05
+    python -m src.evaluate_compaction --input news.jsonl
+
+Exits with status 1 if the share of items whose classification changed exceeds the tolerance.
+"""
+# Import libraries
+import sys
+import json
+import logging
+import argparse
+import datetime
+from typing import Any, Dict, List
+
+from src.config.config import config
+from src.state import Classification, NewsItem
+from src.nodes.sentiment_analysis import classify_news
+from src.utils.llm_metrics import LLMUsageTracker, summarize_llm_calls
+from src.utils.text_compaction import compact_text
+
+logger = logging.getLogger(__name__)
+
+_FIELDS = ("sentiment", "importance", "is_market_relevant")
+
+
+def _document_to_news_item(document: Dict[str, Any]) -> NewsItem:
+    """Builds a news item from a stored or exported document; only the id, title and text are used here."""
+    return NewsItem(
+        id=str(document.get("id", document.get("_id"))),
+        title=document.get("title", ""),
+        text=document.get("text", ""),
+        source_name=document.get("source_name", ""),
+        news_url=document.get("news_url", ""),
+        image_url=document.get("image_url", ""),
+        timestamp=document.get("timestamp") or datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+def load_news(args) -> List[NewsItem]:
+    """Loads the evaluation articles from a JSONL file or from the most recent stored news."""
+    if args.input:
+        with open(args.input) as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+    else:
+        # Imported here so evaluating a file does not require a database connection
+        from src.utils.db_utils import fetch_recent_news
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=args.days)
+        documents = fetch_recent_news(since)[-args.limit:]
+
+    return [_document_to_news_item(document) for document in documents[:args.limit]]
+
+
+def compare_classifications(
+        full: Dict[str, Classification],
+        compacted: Dict[str, Classification],
+) -> Dict[str, Any]:
+    """
+    Compares the classifications of the items classified in both runs.
+
+    Returns:
+        Dict with the number of compared items, the overall agreement (all fields equal), the agreement per field
+        and the ids of the items whose classification changed.
+    """
+    common = [news_id for news_id in full if news_id in compacted]
+    changed = [
+        news_id for news_id in common
+        if any(getattr(full[news_id], field) != getattr(compacted[news_id], field) for field in _FIELDS)
+    ]
+    return {
+        "compared": len(common),
+        "agreement": 1 - len(changed) / len(common) if common else 1.0,
+        "field_agreement": {
+            field: (
+                sum(getattr(full[i], field) == getattr(compacted[i], field) for i in common) / len(common)
+                if common else 1.0
+            )
+            for field in _FIELDS
+        },
+        "changed_ids": changed,
+    }
+
+
+def evaluate(news: List[NewsItem], max_tokens: int) -> Dict[str, Any]:
+    """
+    Classifies the news with full and with compacted text and compares the results.
+
+    Args:
+        news: Articles to evaluate
+        max_tokens: Token budget of the compacted text
+
+    Returns:
+        Evaluation report with the agreement and the LLM usage of both runs.
+    """
+    compacted_texts = {}
+    tokens_saved = {}
+    for item in news:
+        compacted = compact_text(item.text, item.title, config.model_name, max_tokens)
+        compacted_texts[item.id] = compacted.text
+        tokens_saved[item.id] = compacted.tokens_saved
+
+    full_tracker = LLMUsageTracker(config.model_name)
+    full = classify_news(news, full_tracker, {item.id: item.text for item in news})
+    compact_tracker = LLMUsageTracker(config.model_name)
+    compact = classify_news(news, compact_tracker, compacted_texts)
+
+    return {
+        "items": len(news),
+        "max_tokens": max_tokens,
+        **compare_classifications(full, compact),
+        "full_text": summarize_llm_calls(full_tracker.calls, config.model_name),
+        "compacted_text": summarize_llm_calls(compact_tracker.calls, config.model_name, tokens_saved),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the effect of text compaction on classifications")
+    parser.add_argument("--input", help="JSONL file of news items (id, title, text); defaults to stored news")
+    parser.add_argument("--days", type=float, default=7, help="Evaluate stored news of the last N days")
+    parser.add_argument("--limit", type=int, default=200, help="Maximum number of news items to evaluate")
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=config.text_max_tokens,
+        help="Token budget to evaluate (defaults to TEXT_MAX_TOKENS)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.05,
+        help="Maximum share of items whose classification may change",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    news = load_news(args)
+    if not news:
+        logger.error("No news items to evaluate.")
+        sys.exit(1)
+
+    report = evaluate(news, args.max_tokens)
+    print(json.dumps(report, indent=2, default=str))
+
+    disagreement = 1 - report["agreement"]
+    if disagreement > args.tolerance:
+        logger.error(f"Compaction changed {disagreement:.1%} of classifications (tolerance {args.tolerance:.1%}).")
+        sys.exit(1)
+    logger.info(f"Compaction changed {disagreement:.1%} of classifications, within tolerance {args.tolerance:.1%}.")
@@ -1,49 +1,159 @@
 
 # Import libraries
+import time
+import argparse
 import logging
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
 
-from src.state import GraphState
-from src.config.logging_config import setup_logging
+from src.config.config import config
+from src.state import GraphState, StreamingGraphState
 from src.nodes.fetch_news import fetch_news_node
 from src.nodes.check_cache import check_cache_node
+from src.nodes.near_duplicate import near_duplicate_node
 from src.nodes.sentiment_analysis import sentiment_analysis_node
 from src.nodes.write_to_database import write_to_database_node
 from src.nodes.telegram_notifier import notification_node
+from src.nodes.process_item import route_unseen_news, process_item_node, collect_results_node
+from src.nodes.work_queue import claim_work_node, complete_work_node
+from src.nodes.carry_over import drain_pending_node, carry_over_node
+from src.utils.instrumentation import instrument_node, record_run, write_metrics_textfile
+from src.utils.checkpoints import get_checkpoint_store, close_checkpoint_store, new_thread_id
+from src.utils.work_queue import release_unsettled_work, close_work_queue
+from src.utils.deadline import run_deadline
 
-# Initialize logging
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
 def create_graph():
+    """
+    Builds the batch graph. With `config.work_queue_enabled`, unseen items go through the work queue: they are
+    claimed after the near-duplicate check and completed once written and notified. Otherwise the unfinished items
+    of earlier runs are drained in front of the unseen items and those of this run are carried over at the end.
+    """
+    from langgraph.graph import StateGraph, START, END
+
     # Build graph
     builder = StateGraph(GraphState)
-    builder.add_node("fetch_news", fetch_news_node)
-    builder.add_node("check_cache", check_cache_node)
-    builder.add_node("analyze_sentiment", sentiment_analysis_node)
-    builder.add_node("write_to_database", write_to_database_node)
-    builder.add_node("telegram_notifier", notification_node)
+    builder.add_node("fetch_news", instrument_node("fetch_news", fetch_news_node))
+    builder.add_node("check_cache", instrument_node("check_cache", check_cache_node))
+    builder.add_node("near_duplicate", instrument_node("near_duplicate", near_duplicate_node))
+    builder.add_node("analyze_sentiment", instrument_node("analyze_sentiment", sentiment_analysis_node))
+    builder.add_node("write_to_database", instrument_node("write_to_database", write_to_database_node))
+    builder.add_node("telegram_notifier", instrument_node("telegram_notifier", notification_node))
 
     builder.add_edge(START, "fetch_news")
     builder.add_edge("fetch_news", "check_cache")
-    builder.add_edge("check_cache", "analyze_sentiment")
     builder.add_edge("analyze_sentiment", "write_to_database")
     builder.add_edge("analyze_sentiment", "telegram_notifier")
-    builder.add_edge("write_to_database", END)
-    builder.add_edge("telegram_notifier", END)
+
+    if config.work_queue_enabled:
+        builder.add_node("claim_work", instrument_node("claim_work", claim_work_node))
+        builder.add_node("complete_work", instrument_node("complete_work", complete_work_node))
+        builder.add_edge("check_cache", "near_duplicate")
+        builder.add_edge("near_duplicate", "claim_work")
+        builder.add_edge("claim_work", "analyze_sentiment")
+        builder.add_edge(["write_to_database", "telegram_notifier"], "complete_work")
+        builder.add_edge("complete_work", END)
+    else:
+        builder.add_node("drain_pending", instrument_node("drain_pending", drain_pending_node))
+        builder.add_node("carry_over", instrument_node("carry_over", carry_over_node))
+        builder.add_edge("check_cache", "drain_pending")
+        builder.add_edge("drain_pending", "near_duplicate")
+        builder.add_edge("near_duplicate", "analyze_sentiment")
+        builder.add_edge(["write_to_database", "telegram_notifier"], "carry_over")
+        builder.add_edge("carry_over", END)
 
     return builder
 
 
-if __name__ == "__main__":
-    graph_builder = create_graph()
+def create_streaming_graph():
+    """
+    Builds the streaming variant of the graph.
+
+    Instead of waiting for every item at each stage, every unseen item is sent (LangGraph `Send`) to its own
+    `process_item` branch that classifies, persists and notifies it independently. The branch results are reduced
+    into the StreamingGraphState and summarized by `collect_results`. With `config.work_queue_enabled`, the branches
+    are fanned out over the items claimed from the work queue and every branch settles its own item; otherwise the
+    unfinished items of earlier runs are drained in front of the unseen items.
+    """
+    from langgraph.graph import StateGraph, START, END
+
+    builder = StateGraph(StreamingGraphState)
+    builder.add_node("fetch_news", instrument_node("fetch_news", fetch_news_node))
+    builder.add_node("check_cache", instrument_node("check_cache", check_cache_node))
+    builder.add_node("near_duplicate", instrument_node("near_duplicate", near_duplicate_node))
+    builder.add_node("process_item", instrument_node("process_item", process_item_node))
+    builder.add_node("collect_results", instrument_node("collect_results", collect_results_node))
 
-    memory = InMemorySaver()
-    graph = graph_builder.compile(checkpointer=memory)
+    builder.add_edge(START, "fetch_news")
+    builder.add_edge("fetch_news", "check_cache")
+    if config.work_queue_enabled:
+        builder.add_node("claim_work", instrument_node("claim_work", claim_work_node))
+        builder.add_edge("check_cache", "near_duplicate")
+        builder.add_edge("near_duplicate", "claim_work")
+        builder.add_conditional_edges("claim_work", route_unseen_news, ["process_item", "collect_results"])
+    else:
+        builder.add_node("drain_pending", instrument_node("drain_pending", drain_pending_node))
+        builder.add_edge("check_cache", "drain_pending")
+        builder.add_edge("drain_pending", "near_duplicate")
+        builder.add_conditional_edges("near_duplicate", route_unseen_news, ["process_item", "collect_results"])
+    builder.add_edge("process_item", "collect_results")
+    builder.add_edge("collect_results", END)
+
+    return builder
+
+
+def compile_graph(streaming: bool = False):
+    """Builds and compiles the graph with the checkpointer selected by `config.checkpoint_mode`."""
+    graph_builder = create_streaming_graph() if streaming else create_graph()
+
+    return graph_builder.compile(checkpointer=get_checkpoint_store().checkpointer)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crypto news monitoring pipeline")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run as a resident process that invokes the pipeline every TICK_INTERVAL_SECONDS",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Process every unseen news item through its own classify -> persist -> notify branch",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="Override TICK_INTERVAL_SECONDS in daemon mode",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    graph = compile_graph(streaming=args.streaming)
+    state_schema = StreamingGraphState if args.streaming else GraphState
 
-    thread = {"configurable": {"thread_id": "test"}}
-    initial_state = GraphState()
+    if args.daemon:
+        from src.daemon import run_daemon
+        run_daemon(graph, args.interval, state_schema)
+    else:
+        thread_id = new_thread_id("run")
+        thread = {"configurable": {"thread_id": thread_id}, "max_concurrency": config.llm_max_concurrency}
+        initial_state = state_schema(deadline=run_deadline())
+        checkpoint_store = get_checkpoint_store()
+        checkpoint_store.register_run(thread_id)
 
-    result = graph.invoke(initial_state, thread)
+        started = time.monotonic()
+        result = None
+        try:
+            result = graph.invoke(initial_state, thread)
+        finally:
+            release_unsettled_work()
+            record_run(time.monotonic() - started, result)
+            if config.prometheus_textfile_path:
+                write_metrics_textfile(config.prometheus_textfile_path)
+            checkpoint_store.prune()
+            close_work_queue()
+            close_checkpoint_store()
@@ -0,0 +1,127 @@
+"""
+Carry-Over Nodes
+
+This module carries unfinished news items over to the next run when the MongoDB work queue is not used (the work queue
+retries items itself, see src/nodes/work_queue.py). `drain_pending` puts the items left by earlier runs in front of
+the unseen items, so they are processed first; near-duplicates go back to the near-duplicates with their canonical
+item, and items an earlier run already sent to Telegram are not sent again. `carry_over` saves the items this run did
+not finish to the pending queue (src/utils/pending.py): deferred by the deadline, not classified, not stored or not
+notified.
+"""
+# Import libraries
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from src.state import GraphState, TelegramDelivery
+from src.nodes.fetch_news import save_run_fetch_state
+from src.utils.db_utils import WRITE_FAILED
+from src.utils.pending import get_pending_queue
+
+logger = logging.getLogger(__name__)
+
+
+def run_outcomes(
+    news_ids: List[str],
+    classified_ids: Iterable[str],
+    write_results: Dict[str, str],
+    deliveries: List[TelegramDelivery],
+    deferred_ids: List[str],
+) -> Tuple[List[str], Dict[str, str], List[str]]:
+    """
+    Sorts the items of a run by outcome.
+
+    An item is finished once it is stored and, unless it is a near-duplicate or its notification was already
+    claimed or sent by an earlier attempt, notified. A notification whose outcome is unknown (it may have been
+    posted) counts as sent. An item that was notified but not stored is retried without sending it again (see
+    `record_carry_over`).
+
+    Returns:
+        Ids of the finished items, the error per failed item and the ids of the deferred items.
+    """
+    processed = set(classified_ids)
+    deferred = set(deferred_ids)
+    failed_deliveries = {
+        delivery.id: delivery.error
+        for delivery in deliveries
+        if not delivery.success and not delivery.outcome_unknown
+    }
+
+    finished: List[str] = []
+    errors: Dict[str, str] = {}
+    deferred_list: List[str] = []
+    for news_id in news_ids:
+        if news_id not in processed:
+            if news_id in deferred:
+                deferred_list.append(news_id)
+            else:
+                errors[news_id] = "not classified"
+        elif write_results.get(news_id, WRITE_FAILED) == WRITE_FAILED:
+            errors[news_id] = "database write failed"
+        elif news_id in failed_deliveries:
+            errors[news_id] = f"telegram delivery failed: {failed_deliveries[news_id]}"
+        else:
+            finished.append(news_id)
+    return finished, errors, deferred_list
+
+
+def drain_pending_node(state: GraphState):
+    """
+    This node puts the unfinished items of earlier runs in front of the unseen news items.
+    """
+    queue = get_pending_queue()
+    pending = queue.items()
+    if not pending:
+        return {}
+
+    pending_ids = [entry.item.id for entry in pending]
+    carried = set(pending_ids)
+    duplicate_of = {entry.item.id: entry.duplicate_of for entry in pending if entry.duplicate_of}
+    unseen_ids = [news_id for news_id in pending_ids if news_id not in duplicate_of]
+    unseen_ids += [news_id for news_id in state.unseen_ids if news_id not in carried]
+    logger.info(f"Carried over {len(pending)} unfinished news items from earlier runs.")
+
+    # Update state
+    return {
+        "news": {**state.news, **{entry.item.id: entry.item for entry in pending}},
+        "unseen_ids": unseen_ids,
+        "duplicate_ids": list(duplicate_of),
+        "duplicate_of": duplicate_of,
+        "carried_over_ids": pending_ids,
+        "notified_ids": [entry.item.id for entry in pending if entry.notified],
+    }
+
+
+def record_carry_over(state: GraphState) -> None:
+    """Saves the items of a run that were not finished to the pending queue and removes the finished ones."""
+    news_ids = state.unseen_ids + state.duplicate_ids
+    if not news_ids:
+        return
+
+    finished, errors, deferred = run_outcomes(
+        news_ids,
+        state.classifications,
+        state.database_write_results,
+        state.telegram_deliveries,
+        state.deferred_ids,
+    )
+    notified = {
+        delivery.id for delivery in state.telegram_deliveries if delivery.success or delivery.outcome_unknown
+    }
+    get_pending_queue().record(
+        finished,
+        {news_id: (state.news[news_id], error) for news_id, error in errors.items()},
+        [state.news[news_id] for news_id in deferred],
+        duplicate_of=state.duplicate_of,
+        notified=notified.union(state.notified_ids),
+    )
+    if errors or deferred:
+        logger.warning(f"Carrying over {len(errors)} failed and {len(deferred)} deferred news items to the next run.")
+
+
+def carry_over_node(state: GraphState):
+    """
+    This node saves the items the batch run did not finish for the next run, then the fetch state of the run.
+    """
+    record_carry_over(state)
+    save_run_fetch_state(state)
+    return {}
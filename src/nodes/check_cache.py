@@ -9,49 +9,88 @@ Author: Peyman Kh
 Date: 2023-03-20
 """
 # Import libraries
+import time
 import logging
+from typing import List, Set
 
+from src.config.config import config
 from src.state import GraphState
 from src.utils.db_utils import fetch_cache
+from src.utils.bloom_filter import get_seen_index, sync_seen_index
 
 logger = logging.getLogger(__name__)
 
 
+def _lookup_seen_ids(news_ids: List[str]) -> Set[str]:
+    """
+    Returns the ids that are already stored.
+
+    With the local seen-id index enabled, only the ids the Bloom filter reports as "maybe seen" are confirmed against
+    the database; ids it reports as unseen are new without a database round-trip. Once
+    `config.seen_index_sync_interval_seconds` have passed since its last sync, the index is first synced with the ids
+    stored since, by other processes as well. If the index is unavailable or cannot be synced, all ids are looked up
+    in the database.
+    """
+    if not config.seen_index_enabled:
+        return fetch_cache(news_ids)
+
+    try:
+        index = get_seen_index()
+        if time.time() - index.synced_at >= config.seen_index_sync_interval_seconds:
+            sync_seen_index(index)
+    except Exception as e:
+        logger.error(f"Seen-id index unavailable, falling back to database lookup: {e}")
+        return fetch_cache(news_ids)
+
+    maybe_seen = index.filter_maybe_seen(news_ids)
+    cache = fetch_cache(maybe_seen) if maybe_seen else set()
+    index.record_false_positives(len(set(maybe_seen) - cache))
+    logger.info(
+        f"Seen-id index skipped the database for {len(news_ids) - len(maybe_seen)}/{len(news_ids)} ids. "
+        f"Stats: {index.stats()}"
+    )
+    return cache
+
+
 def check_cache_node(state: GraphState):
     """
     This node is used to check if the news items are already in the cache. The reason is to avoid processing the same
-    news multiple times with LLM.
+    news multiple times with LLM. Items found in the cache are dropped from the state, so later steps do not carry
+    (and checkpoint) them.
     """
     # Check if raw news is empty
-    raw_news = state.raw_news
+    raw_ids = state.raw_ids
 
-    if not raw_news:
+    if not raw_ids:
         logger.error("No raw news found in the state. Aborting.")
         return {}
 
     try:
-        cache = fetch_cache()
-        logger.info(f"Cache loaded successfully with {len(cache)} items.")
+        news_ids = [news_id for news_id in raw_ids if news_id]
+        cache = _lookup_seen_ids(news_ids)
+        logger.info(f"Cache lookup found {len(cache)}/{len(raw_ids)} items.")
 
         # Filter unseen news
-        unseen_news = []
+        unseen_ids = []
         cache_hit = 0
 
-        for news in raw_news:
-            if not news.id:
-                logger.error(f"News item {news} has no ID. Aborting.")
-            elif news.id in cache:
+        for news_id in raw_ids:
+            if not news_id:
+                logger.error(f"News item {state.news.get(news_id)} has no ID. Aborting.")
+            elif news_id in cache:
                 cache_hit += 1
             else:
-                unseen_news.append(news)
+                unseen_ids.append(news_id)
 
         # Update state
         return {
+            "news": {news_id: state.news[news_id] for news_id in unseen_ids},
             "cache": cache,
             "cache_hit": cache_hit,
-            "unseen_news": unseen_news,
+            "unseen_ids": unseen_ids,
         }
 
     except Exception as e:
         logger.error(f"Failed to check cache: {e}")
-        return {}
\ No newline at end of file
+        # Keep the fetch state of the previous run, so the next run fetches these items again
+        return {"fetch_state": {}}
\ No newline at end of file
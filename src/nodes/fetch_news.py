@@ -2,70 +2,157 @@
 News Fetcher Node
 
 This module is responsible for retrieving the latest cryptocurrency news from
-the cryptonews-api.com. It fetches news articles, parses them into structured
-NewsItem objects, and updates the GraphState with the retrieved data.
+the configured news sources (cryptonews-api.com sections, ticker feeds, other
+providers). It fetches all sources concurrently, parses them into structured
+NewsItem objects, and updates the GraphState with the merged, deduplicated data.
+
+Fetching is incremental: each source keeps a high-water mark (newest timestamp
+and ids seen) between runs and walks pages until already-seen content is reached.
+The new fetch state is carried in the graph state and only saved by
+`save_run_fetch_state` at the end of the run, once the fetched items were stored,
+carried over or enqueued; a run that fails before fetches the same items again.
+A slow source never stalls the run: after the latency budget the results of the
+sources that finished are returned.
 
 Author: Peyman Kh
 Date: 2023-03-20
 """
 # Import libraries
+import os
+import json
+import time
 import logging
-import requests
-from typing import List
-from datetime import datetime
+import threading
+from typing import Any, Dict, List, Set
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from src.config.config import config
+from src.config.config import config, NewsSourceConfig
 from src.state import NewsItem, GraphState
-from src.utils.helpers import generate_unique_id
+from src.utils.news_sources import SourceFetchResult, get_provider
+from src.utils.deadline import remaining
 
 logger = logging.getLogger(__name__)
 
+# Sources are fetched on a long-lived pool so that a source exceeding the latency budget can finish in the background
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="source")
+_in_flight: Set[str] = set()
+_in_flight_lock = threading.Lock()
+
+
+def _load_fetch_state() -> Dict[str, Any]:
+    """Loads the per-source high-water marks and HTTP validators of the previous run."""
+    try:
+        with open(config.fetch_state_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Failed to load fetch state, starting from scratch: {e}")
+        return {}
+
+
+def _save_fetch_state(fetch_state: Dict[str, Any]) -> None:
+    """Persists the per-source high-water marks and HTTP validators for the next run."""
+    try:
+        directory = os.path.dirname(config.fetch_state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{config.fetch_state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(fetch_state, f)
+        os.replace(tmp_path, config.fetch_state_path)
+    except Exception as e:
+        logger.error(f"Failed to save fetch state: {e}")
+
+
+def save_run_fetch_state(state: GraphState) -> None:
+    """
+    Saves the fetch state of a run for the next run. Called at the end of the run, once the fetched items were
+    stored, carried over or enqueued; does nothing if the run has no fetch state to save.
+    """
+    if state.fetch_state:
+        _save_fetch_state(state.fetch_state)
+
+
+def _fetch_source(source: NewsSourceConfig, state: Dict[str, Any], deadline: float) -> SourceFetchResult:
+    """Fetches one source with its registered provider and logs its throughput."""
+    started = time.monotonic()
+    try:
+        result = get_provider(source.provider)(source, state, deadline)
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(source.name)
+
+    elapsed = time.monotonic() - started
+    missed = "0" if result.complete else ">= 1"
+    logger.info(
+        f"Source {source.name}: fetched {len(result.news)} news items ({result.new_items} new) from "
+        f"{result.pages} pages in {elapsed:.2f}s ({len(result.news) / elapsed if elapsed else 0:.1f} items/s), "
+        f"missed: {missed}."
+    )
+    return result
+
 
 def fetch_news_node(state: GraphState):
     """
-    This node fetches the latest cryptocurrency news from https://cryptonews-api.com.
+    This node fetches the latest cryptocurrency news from all configured news sources concurrently.
+
+    Each source is fetched by its provider within its own timeout and rate limit. Results are merged into a single
+    list deduplicated by news id. Sources still running after `config.fetch_latency_budget_seconds`, or at the
+    deadline of the run, are left to finish in the background and skipped for this run (partial result).
 
     Returns:
-        A list of NewsItem objects or an empty list if an error occurs.
+        The fetched news items by id, newest first, their ids and the fetch state to save at the end of the run.
     """
     logger.info("Fetching latest cryptocurrency news...")
+    started = time.monotonic()
+    budget = config.fetch_latency_budget_seconds
+    run_remaining = remaining(state.deadline)
+    if run_remaining is not None:
+        budget = min(budget, run_remaining)
+    deadline = started + budget
 
-    try:
-        # Get the latest news from api
-        url = f"{config.news_url}&token={config.news_api_key.get_secret_value()}"
-        response = requests.get(url)
-        response.raise_for_status()
-        logger.info("Successfully fetched latest cryptocurrency news.")
-
-        news_list: List[NewsItem] = []
-
-        # Parse news items to create a list of NewsItem objects
-        for item in response.json()["data"]:
-            try:
-                # 1. Converting time string to a datetime object
-                timestamp_str = item.get("date")
-                timestamp = datetime.strptime(timestamp_str, "%a, %d %b %Y %H:%M:%S %z")
-
-                # 2. Generating a unique ID for each news item
-                news_id = generate_unique_id(item.get("title"), timestamp)
-
-                news = NewsItem(
-                    id=news_id,
-                    title=item.get("title"),
-                    text=item.get("text"),
-                    source_name=item.get("source_name"),
-                    news_url = item.get("news_url"),
-                    image_url=item.get("image_url"),
-                    timestamp=timestamp,
-                )
-                news_list.append(news)
-            except Exception as e:
-                logger.error(f"Failed to parse news item: {e}")
+    fetch_state = _load_fetch_state()
+    futures = {}
+    for source in config.get_news_sources():
+        with _in_flight_lock:
+            if source.name in _in_flight:
+                logger.warning(f"Source {source.name} is still running from a previous run, skipping it.")
                 continue
+            _in_flight.add(source.name)
+        futures[_executor.submit(_fetch_source, source, fetch_state.get(source.name, {}), deadline)] = source
+
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+    for future in not_done:
+        logger.warning(f"Source {futures[future].name} exceeded the latency budget, returning partial results.")
+
+    # Merge sources into a single stream deduplicated by id
+    merged: Dict[str, NewsItem] = {}
+    failed_sources = 0
+    for future in done:
+        source = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Failed to fetch news from source {source.name}: {e}")
+            failed_sources += 1
+            continue
+
+        failed_sources += int(result.failed)
+        fetch_state[source.name] = result.state
+        for news in result.news:
+            merged.setdefault(news.id, news)
 
-        # Add news items to the graph state
-        return {"raw_news": news_list}
+    news_list: List[NewsItem] = sorted(merged.values(), key=lambda news: news.timestamp, reverse=True)
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Fetched {len(news_list)} unique news items from {len(done) - failed_sources}/{len(futures)} sources "
+        f"in {elapsed:.2f}s ({len(not_done)} timed out, {failed_sources} failed)."
+    )
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to fetch latest cryptocurrency news: {e}")
-        return {"raw_news": []}
+    # Add news items to the graph state
+    return {
+        "news": {news.id: news for news in news_list},
+        "raw_ids": [news.id for news in news_list],
+        "fetch_state": fetch_state,
+    }
@@ -0,0 +1,65 @@
+"""
+Near-Duplicate Detector Node
+
+This module is responsible for detecting syndicated copies of the same story among unseen news items. Each item is
+compared against a MinHash LSH index of recent items; near-duplicates are linked to their canonical item so they can
+reuse its classification instead of costing another LLM call and Telegram message.
+"""
+# Import libraries
+import logging
+from typing import Dict, List
+
+from src.config.config import config
+from src.state import GraphState
+from src.utils.minhash import get_minhasher, get_near_duplicate_index, shingle, to_epoch
+
+logger = logging.getLogger(__name__)
+
+
+def near_duplicate_node(state: GraphState):
+    """
+    This node splits unseen news items into canonical items and near-duplicates of already known items.
+    """
+    unseen_news = state.unseen_news
+
+    if not unseen_news or not config.near_duplicate_enabled:
+        return {}
+
+    try:
+        hasher = get_minhasher()
+        index = get_near_duplicate_index()
+
+        canonical_ids: List[str] = []
+        # Near-duplicates carried over from earlier runs keep their canonical item
+        duplicate_ids: List[str] = list(state.duplicate_ids)
+        duplicate_of: Dict[str, str] = dict(state.duplicate_of)
+
+        for news in unseen_news:
+            signature = hasher.signature(shingle(f"{news.title} {news.text}"))
+            match = index.query(signature)
+
+            if match is not None and match[0] != news.id:
+                canonical_id, similarity = match
+                duplicate_ids.append(news.id)
+                duplicate_of[news.id] = canonical_id
+                logger.info(f"News item {news.id} is a near-duplicate of {canonical_id} (similarity {similarity:.2f}).")
+            else:
+                # Index canonical items right away so later copies in the same batch are linked to them
+                index.insert(news.id, signature, to_epoch(news.timestamp))
+                canonical_ids.append(news.id)
+
+        logger.info(
+            f"Near-duplicate check found {len(duplicate_ids) - len(state.duplicate_ids)} duplicates among "
+            f"{len(unseen_news)} unseen items ({len(index)} items in index)."
+        )
+
+        # Update state
+        return {
+            "unseen_ids": canonical_ids,
+            "duplicate_ids": duplicate_ids,
+            "duplicate_of": duplicate_of,
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to check near-duplicates: {e}")
+        return {}
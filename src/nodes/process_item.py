@@ -0,0 +1,158 @@
+"""
+Item Processor Node
+
+This module is responsible for processing a single news item end to end in the streaming graph: it classifies the
+item, writes it to the database and sends it to Telegram, independently of the other items of the run. It reuses the
+batch nodes on a one-item state, so caching, near-duplicate handling, idempotent writes and rate-limited delivery
+behave exactly as in the batch graph. Every branch respects the deadline of the run: a branch that starts after the
+classification deadline defers its item. With the work queue enabled, every branch settles its own claimed item;
+otherwise `collect_results` carries the unfinished items over to the next run.
+"""
+# Import libraries
+import time
+import logging
+from typing import List
+
+from src.state import GraphState, StreamingGraphState, ItemTaskState
+from src.config.config import config
+from src.nodes.sentiment_analysis import analyze_news_state
+from src.nodes.write_to_database import write_to_database_node
+from src.nodes.telegram_notifier import notification_node
+from src.nodes.work_queue import settle_work_items
+from src.nodes.carry_over import record_carry_over
+from src.nodes.fetch_news import save_run_fetch_state
+from src.utils.db_utils import WRITE_FAILED
+from src.utils.llm_metrics import summarize_llm_calls, write_metrics_record
+from src.utils.prefilter import summarize_prefilter
+from src.utils.deadline import classification_deadline, expired
+
+logger = logging.getLogger(__name__)
+
+
+def route_unseen_news(state: StreamingGraphState):
+    """
+    Fans out one `process_item` branch per unseen news item (map step).
+
+    Returns:
+        A list of Send objects, or the name of the collecting node if there is nothing to process.
+    """
+    from langgraph.types import Send
+
+    notified = set(state.notified_ids)
+    sends: List[Send] = [
+        Send("process_item", ItemTaskState(item=item, notified=item.id in notified, deadline=state.deadline))
+        for item in state.unseen_news
+    ]
+    sends.extend(
+        Send(
+            "process_item",
+            ItemTaskState(item=item, duplicate_of=state.duplicate_of.get(item.id), deadline=state.deadline),
+        )
+        for item in state.duplicate_news
+    )
+    if not sends:
+        return "collect_results"
+
+    logger.info(f"Streaming {len(sends)} news items through independent branches.")
+    return sends
+
+
+def process_item_node(state: ItemTaskState):
+    """
+    This node classifies, persists and notifies a single news item.
+
+    A near-duplicate reuses the classification of its canonical item when it is already known (from an earlier run);
+    otherwise it is classified on its own so it never waits for another branch.
+    """
+    started = time.monotonic()
+    item = state.item
+
+    # Branches waiting for a free slot past the classification deadline leave their item for the next run
+    if expired(classification_deadline(state.deadline)):
+        logger.warning(f"Deadline reached, deferred news item {item.id} to the next run.")
+        update = {"deferred_ids": [item.id]}
+        if config.work_queue_enabled:
+            update["work_queue_results"] = settle_work_items([item.id], [], {}, [], [item.id])
+        return update
+
+    if state.duplicate_of:
+        item_state = GraphState(
+            news={item.id: item},
+            duplicate_ids=[item.id],
+            duplicate_of={item.id: state.duplicate_of},
+            deadline=state.deadline,
+        )
+    else:
+        item_state = GraphState(
+            news={item.id: item},
+            unseen_ids=[item.id],
+            notified_ids=[item.id] if state.notified else [],
+            deadline=state.deadline,
+        )
+
+    analysis = analyze_news_state(item_state)
+    classifications = analysis["classifications"]
+    if not classifications:
+        update = {
+            "llm_calls": analysis["llm_calls"],
+            "text_tokens_saved": analysis["text_tokens_saved"],
+            "prefilter_results": analysis["prefilter_results"],
+            "deferred_ids": analysis["deferred_ids"],
+        }
+        if config.work_queue_enabled:
+            update["work_queue_results"] = settle_work_items([item.id], [], {}, [], analysis["deferred_ids"])
+        return update
+
+    item_state = item_state.model_copy(update={"classifications": classifications})
+    write_update = write_to_database_node(item_state)
+    notify_update = notification_node(item_state)
+    write_results = write_update.get("database_write_results", {})
+    deliveries = notify_update.get("telegram_deliveries", [])
+
+    logger.info(f"News item {item.id} processed end to end in {time.monotonic() - started:.2f}s.")
+
+    # Reduced into the StreamingGraphState by its reducers
+    update = {
+        "classifications": classifications,
+        "database_write_results": write_results,
+        "telegram_deliveries": deliveries,
+        "llm_calls": analysis["llm_calls"],
+        "text_tokens_saved": analysis["text_tokens_saved"],
+        "prefilter_results": analysis["prefilter_results"],
+    }
+    if config.work_queue_enabled:
+        update["work_queue_results"] = settle_work_items([item.id], classifications, write_results, deliveries, [])
+    return update
+
+
+def collect_results_node(state: StreamingGraphState):
+    """
+    This node summarizes the results collected from all item branches (reduce step), writes the metrics record of
+    the run and, without the work queue, carries the unfinished items over to the next run. The fetch state of the run
+    is saved last.
+    """
+    write_results = state.database_write_results
+    deliveries = state.telegram_deliveries
+
+    logger.info(
+        f"Streaming run processed {len(state.classifications)} news items, stored "
+        f"{sum(1 for outcome in write_results.values() if outcome != WRITE_FAILED)}, "
+        f"sent {sum(1 for delivery in deliveries if delivery.success)} notifications."
+    )
+
+    llm_usage = summarize_llm_calls(state.llm_calls, config.model_name, state.text_tokens_saved)
+    if config.prefilter_enabled:
+        llm_usage.update(summarize_prefilter(state.prefilter_results))
+    logger.info(f"LLM usage: {llm_usage}")
+    if state.llm_calls or state.prefilter_results:
+        write_metrics_record({"graph": "streaming", "news_items": len(state.classifications), **llm_usage})
+
+    if not config.work_queue_enabled:
+        record_carry_over(state)
+    save_run_fetch_state(state)
+
+    return {
+        "llm_usage": llm_usage,
+        "database_write_success": bool(write_results) and WRITE_FAILED not in write_results.values(),
+        "telegram_notification_success": any(delivery.success for delivery in deliveries),
+    }
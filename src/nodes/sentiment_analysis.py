@@ -9,13 +9,32 @@ Author: Peyman Kh
 Date: 2023-03-20
 """
 # Import libraries
+import time
 import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 
 from src.config.config import config
-from src.prompts import sentiment_analysis_prompt
-from src.state import GraphState, ProcessedNewsItem, Sentiment, Importance
+from src.utils.llm import get_chat_model
+from src.utils.llm_calls import CircuitOpenError, invoke_llm
+from src.utils.deadline import DeadlineExceeded, classification_deadline, item_deadline
+from src.utils.llm_cache import get_llm_cache, make_cache_key
+from src.utils.llm_metrics import LLMUsageTracker, summarize_llm_calls, write_metrics_record
+from src.utils.minhash import get_near_duplicate_index
+from src.utils.prefilter import (
+    PREFILTER_AGREE,
+    PREFILTER_DISAGREE,
+    PREFILTER_LOCAL,
+    PREFILTER_UNCERTAIN,
+    get_prefilter,
+    in_shadow_sample,
+    summarize_prefilter,
+)
+from src.utils.rate_limit import TokenBucket
+from src.utils.text_compaction import compact_text
+from src import prompts
+from src.state import Classification, GraphState, NewsItem, Sentiment, Importance
 
 logger = logging.getLogger(__name__)
 
@@ -35,47 +54,494 @@ class ResponseOutputSchema(BaseModel):
     )
 
 
-def sentiment_analysis_node(state: GraphState):
+class BatchResponseItemSchema(ResponseOutputSchema):
+    id: str = Field(
+        ...,
+        description="Id of the news article this classification belongs to, copied unchanged from the input"
+    )
+
+
+class BatchResponseOutputSchema(BaseModel):
+    items: List[BatchResponseItemSchema] = Field(
+        ...,
+        description="One classification per news article in the input"
+    )
+
+
+def _to_classification(
+        response: ResponseOutputSchema,
+        duplicate_of: Optional[str] = None,
+        prefilter_confidence: Optional[float] = None,
+) -> Classification:
+    """Builds the classification overlay of a news item from the LLM (or pre-filter) response."""
+    return Classification(
+        sentiment=response.sentiment,
+        importance=response.importance,
+        is_market_relevant=response.is_market_relevant,
+        duplicate_of=duplicate_of,
+        prefilter_confidence=prefilter_confidence,
+        classified_with=None if prefilter_confidence is not None else classification_version(),
+    )
+
+
+def _classification_of(classification: Classification) -> Dict[str, Any]:
+    """Extracts the LLM classification of a news item as a JSON-serializable dict."""
+    return {
+        "sentiment": classification.sentiment.value,
+        "importance": classification.importance.value,
+        "is_market_relevant": classification.is_market_relevant,
+    }
+
+
+def _format_batch_articles(news: List[NewsItem], prompt_texts: Dict[str, str]) -> str:
+    """Renders a batch of news items for the batched sentiment analysis prompt."""
+    return "\n\n".join(
+        f"Article id: {item.id}\nTitle: {item.title}\nText: {prompt_texts.get(item.id, item.text)}"
+        for item in news
+    )
+
+
+def _prompt_version() -> str:
+    """Identifies the prompt and the text compaction settings a classification was produced with."""
+    if config.text_compaction_enabled:
+        return f"{prompts.SENTIMENT_ANALYSIS_PROMPT_VERSION}:compact-{config.text_max_tokens}"
+    return prompts.SENTIMENT_ANALYSIS_PROMPT_VERSION
+
+
+def classification_version() -> str:
+    """Identifies the model and prompt an LLM classification was produced with; stored with every classified item."""
+    return f"{config.model_name}:{_prompt_version()}"
+
+
+def compact_news(news: List[NewsItem]) -> Tuple[Dict[str, str], Dict[str, int]]:
     """
-    This node performs sentiment analysis on the news items.
+    Compacts the text of news items to the configured token budget.
+
+    Args:
+        news: News items to compact
+
+    Returns:
+        Tuple of the compacted text per news id and the tokens saved per news id.
     """
-    # Check if raw news is empty
-    if len(state.unseen_news) == 0:
-        logger.error("No unseen news found in the state. Aborting.")
-        return {}
+    prompt_texts: Dict[str, str] = {}
+    tokens_saved: Dict[str, int] = {}
+    for item in news:
+        compacted = compact_text(item.text, item.title, config.model_name, config.text_max_tokens)
+        prompt_texts[item.id] = compacted.text
+        tokens_saved[item.id] = compacted.tokens_saved
+        logger.debug(
+            f"Compacted news item {item.id}: {compacted.original_tokens} -> {compacted.tokens} tokens"
+            f"{' (truncated)' if compacted.truncated else ''}."
+        )
 
-    news = state.unseen_news
-    model = ChatOpenAI(model=config.model_name, api_key=config.model_api_key.get_secret_value())
+    logger.info(f"Text compaction saved {sum(tokens_saved.values())} tokens over {len(news)} news items.")
+    return prompt_texts, tokens_saved
+
+
+def _analyze_news_item(
+        structured_model,
+        item: NewsItem,
+        text: str,
+        deadline: Optional[float] = None,
+) -> Optional[Classification]:
+    """
+    Classifies a single news item with the LLM.
 
-    # Add structured output to the model
-    structured_model = model.with_structured_output(ResponseOutputSchema)
+    Rate limits and transient provider errors are retried by the LLM call layer (src/utils/llm_calls.py). Remaining
+    failures are isolated to the item: they are logged and None is returned so the other items are still processed.
 
-    logger.info(f"Processing {len(news)} news items...")
+    Args:
+        structured_model: LLM with structured output bound to ResponseOutputSchema
+        item: News item to classify
+        text: Article text to put in the prompt
+        deadline: Unix time after which the request is not attempted or retried anymore
 
-    processed_news = []
+    Returns:
+        The classification of the item, or None if the LLM call failed.
+    """
+    try:
+        # Create prompt
+        prompt = prompts.sentiment_analysis_prompt.invoke({"title": item.title, "text": text})
+        response = invoke_llm(structured_model, prompt, deadline)
+
+        logger.info(f"Successfully processed news item: {item.id}")
+        return _to_classification(response)
+    except CircuitOpenError:
+        logger.warning(f"Skipped news item {item.id}: LLM circuit is open.")
+        return None
+    except DeadlineExceeded:
+        logger.warning(f"Skipped news item {item.id}: deadline exceeded.")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to process news item {item.id}: {e}")
+        return None
+
+
+def _analyze_news_batch(
+        batch_model,
+        structured_model,
+        news: List[NewsItem],
+        prompt_texts: Dict[str, str],
+        deadline: Optional[float] = None,
+) -> List[Optional[Classification]]:
+    """
+    Classifies several news items with a single LLM request.
+
+    Every article id must come back exactly once. Items that are missing from the response, returned more than
+    once, or belong to a response that could not be parsed at all are classified again with single-item calls.
+
+    Args:
+        batch_model: LLM with structured output bound to BatchResponseOutputSchema
+        structured_model: LLM with structured output bound to ResponseOutputSchema, used for the fallback
+        news: News items to classify in one request
+        prompt_texts: Article text to put in the prompt per news id
+        deadline: Unix time after which no request (including the fallback) is attempted or retried anymore
+
+    Returns:
+        Classifications in the order of `news`, with None for items that could not be classified.
+    """
+    responses: Dict[str, BatchResponseItemSchema] = {}
+    try:
+        articles = _format_batch_articles(news, prompt_texts)
+        prompt = prompts.batch_sentiment_analysis_prompt.invoke({"articles": articles})
+        batch_response = invoke_llm(batch_model, prompt, deadline)
+
+        expected_ids = {item.id for item in news}
+        duplicated_ids = set()
+        for entry in batch_response.items:
+            if entry.id not in expected_ids:
+                logger.warning(f"Batch response contains unknown article id: {entry.id}")
+            elif entry.id in responses:
+                duplicated_ids.add(entry.id)
+            else:
+                responses[entry.id] = entry
+
+        # Conflicting answers for the same id cannot be trusted, classify those items again
+        for news_id in duplicated_ids:
+            logger.warning(f"Batch response contains article id more than once: {news_id}")
+            responses.pop(news_id, None)
+
+    except Exception as e:
+        logger.error(f"Failed to process news batch of {len(news)} items: {e}")
+
+    classifications: List[Optional[Classification]] = []
+    missing = 0
+    for item in news:
+        response = responses.get(item.id)
+        if response is not None:
+            classifications.append(_to_classification(response))
+        else:
+            missing += 1
+            text = prompt_texts.get(item.id, item.text)
+            classifications.append(_analyze_news_item(structured_model, item, text, deadline))
+
+    if missing:
+        logger.warning(f"Fell back to single-item classification for {missing}/{len(news)} items of a batch.")
+    logger.info(f"Processed news batch of {len(news)} items.")
+
+    return classifications
+
+
+def classify_news(
+        news: List[NewsItem],
+        tracker: LLMUsageTracker,
+        prompt_texts: Dict[str, str],
+        rate_limiter: Optional[TokenBucket] = None,
+        deadline: Optional[float] = None,
+        deferred: Optional[Set[str]] = None,
+) -> Dict[str, Classification]:
+    """
+    Classifies news items with the LLM.
+
+    Items are classified concurrently with at most `config.llm_max_concurrency` requests in flight (fewer while the
+    adaptive limit of the LLM call layer is lower), each attempt bounded by `config.llm_timeout` seconds. When
+    `config.llm_batch_size` is greater than one, that many articles are classified per request.
+
+    With a deadline, requests still waiting for a worker when it passes are not started, and every request gets its
+    own deadline (`config.item_deadline_seconds`) that bounds its retries.
+
+    Args:
+        news: News items to classify
+        tracker: Records token usage and latency of every LLM call
+        prompt_texts: Article text to put in the prompt per news id; items without an entry use their own text
+        rate_limiter: Token bucket every request waits on before it is sent, if given
+        deadline: Unix time after which no request is started
+        deferred: Ids of the items whose request was not started because of the deadline, updated in place
+
+    Returns:
+        Classification per news id in the order of `news`, without the items that could not be classified.
+    """
+    model = get_chat_model()
+
+    # Add structured output to the model, keeping the raw message for its token usage
+    structured_model = tracker.track(model.with_structured_output(ResponseOutputSchema, include_raw=True))
+
+    if config.llm_batch_size > 1:
+        batch_model = tracker.track(model.with_structured_output(BatchResponseOutputSchema, include_raw=True))
+        batches = [news[i:i + config.llm_batch_size] for i in range(0, len(news), config.llm_batch_size)]
+
+        def task(batch):
+            return _analyze_news_batch(batch_model, structured_model, batch, prompt_texts, item_deadline(deadline))
+    else:
+        batches = [[item] for item in news]
+
+        def task(batch):
+            text = prompt_texts.get(batch[0].id, batch[0].text)
+            return [_analyze_news_item(structured_model, batch[0], text, item_deadline(deadline))]
+
+    if rate_limiter is not None:
+        unlimited_task = task
+
+        def task(batch):
+            rate_limiter.acquire()
+            return unlimited_task(batch)
+
+    if deadline is not None:
+        undeferred_task = task
+
+        def task(batch):
+            if time.time() >= deadline:
+                if deferred is not None:
+                    deferred.update(item.id for item in batch)
+                return []
+            return undeferred_task(batch)
+
+    max_workers = min(config.llm_max_concurrency, len(batches))
+    logger.info(
+        f"Processing {len(news)} news items in {len(batches)} requests with {max_workers} concurrent requests..."
+    )
+
+    # executor.map yields results in submission order, so the output order matches the input order
+    classifications: Dict[str, Classification] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sentiment") as executor:
+        for batch, results in zip(batches, executor.map(task, batches)):
+            classifications.update((item.id, result) for item, result in zip(batch, results) if result is not None)
+
+    return classifications
+
+
+def prefilter_news(
+        news: List[NewsItem],
+        classified: Dict[str, Classification],
+        shadow: Dict[str, Dict[str, Any]],
+        results: Dict[str, str],
+) -> List[NewsItem]:
+    """
+    Answers the news items the local pre-filter model classifies confidently.
+
+    Confident items are added to `classified`, except for the shadow sample (`config.prefilter_shadow_rate`), whose
+    local prediction is kept in `shadow` to be compared with the LLM's answer.
+
+    Args:
+        news: News items to pre-filter
+        classified: Classification per news id, updated in place with the local answers
+        shadow: Local prediction per shadow-sampled news id, updated in place
+        results: Pre-filter outcome per news id, updated in place
+
+    Returns:
+        News items that must be classified by the LLM.
+    """
+    model = get_prefilter()
+    if model is None:
+        return news
+
+    remaining = []
     for item in news:
         try:
-            # Create prompt
-            prompt = sentiment_analysis_prompt.invoke({"title": item.title, "text": item.text})
-            response = structured_model.invoke(prompt)
-
-            processed_news.append(ProcessedNewsItem(
-                id=item.id,
-                title=item.title,
-                text=item.text,
-                source_name=item.source_name,
-                news_url=item.news_url,
-                image_url=item.image_url,
-                sentiment=response.sentiment,  # New field
-                importance=response.importance,  # New field
-                is_market_relevant=response.is_market_relevant,  # New field
-                timestamp=item.timestamp,
-            ))
-
-            logger.info(f"Successfully processed news item: {item.id}")
+            classification, confidence = model.predict(item.title, item.text)
         except Exception as e:
-            logger.error(f"Failed to process news item: {e}")
+            logger.error(f"Pre-filter failed on news item {item.id}: {e}")
+            remaining.append(item)
             continue
 
+        if confidence < config.prefilter_confidence_threshold:
+            results[item.id] = PREFILTER_UNCERTAIN
+            remaining.append(item)
+        elif in_shadow_sample(item.id, config.prefilter_shadow_rate):
+            shadow[item.id] = {**classification, "confidence": confidence}
+            remaining.append(item)
+        else:
+            response = ResponseOutputSchema.model_validate(classification)
+            classified[item.id] = _to_classification(response, prefilter_confidence=round(confidence, 4))
+            results[item.id] = PREFILTER_LOCAL
+
+    logger.info(f"Pre-filter answered {len(news) - len(remaining)}/{len(news)} news items locally.")
+    return remaining
+
+
+def _resolve_duplicates(
+        state: GraphState,
+        classified: Dict[str, Classification],
+) -> List[NewsItem]:
+    """
+    Reuses the classification of the canonical item for each near-duplicate.
+
+    Args:
+        state: Graph state holding the near-duplicates and their canonical ids
+        classified: Classification per news id of this run, updated in place with the resolved duplicates
+
+    Returns:
+        Near-duplicates whose canonical classification is unknown and that must be classified by the LLM.
+    """
+    index = get_near_duplicate_index()
+    unresolved = []
+    for item in state.duplicate_news:
+        canonical_id = state.duplicate_of.get(item.id)
+        payload = index.get_payload(canonical_id) if canonical_id else None
+        try:
+            response = ResponseOutputSchema.model_validate(payload)
+            classified[item.id] = _to_classification(response, duplicate_of=canonical_id)
+        except Exception:
+            unresolved.append(item)
+
+    logger.info(f"Reused canonical classification for {len(state.duplicate_news) - len(unresolved)} near-duplicates.")
+    return unresolved
+
+
+def analyze_news_state(state: GraphState) -> Dict[str, Any]:
+    """
+    Classifies the unseen news and near-duplicates of a state.
+
+    Classifications of identical content (same normalized title and text, model and prompt version) are served from
+    the persistent LLM result cache, and near-duplicates reuse the classification of their canonical item. When the
+    pre-filter is enabled, items its local model classifies confidently are answered without the LLM. Only the
+    remaining items are sent to the LLM. The order of the classifications matches the order of the unseen items,
+    followed by the near-duplicates.
+
+    No LLM request is started past the classification deadline of the run (see src/utils/deadline.py); the items
+    left are reported as deferred.
+
+    Args:
+        state: Graph state holding the unseen news and near-duplicates
+
+    Returns:
+        State update with the classification per news id, the records of the LLM calls made, the tokens saved by
+        text compaction, the pre-filter outcome per item and the ids of the deferred items.
+    """
+    news = state.unseen_news + state.duplicate_news
+    classified: Dict[str, Classification] = {}
+    tracker = LLMUsageTracker(config.model_name)
+    prompt_version = _prompt_version()
+
+    # Serve already paid-for classifications from the cache
+    llm_cache = get_llm_cache() if config.llm_cache_enabled else None
+    cache_keys = {
+        item.id: make_cache_key(item.title, item.text, config.model_name, prompt_version)
+        for item in news
+    }
+    if llm_cache is not None:
+        try:
+            cached = llm_cache.get_many(cache_keys[item.id] for item in state.unseen_news)
+            for item in state.unseen_news:
+                if cache_keys[item.id] in cached:
+                    response = ResponseOutputSchema.model_validate(cached[cache_keys[item.id]])
+                    classified[item.id] = _to_classification(response)
+        except Exception as e:
+            logger.error(f"Failed to read LLM result cache: {e}")
+        logger.info(f"LLM result cache served {len(classified)}/{len(state.unseen_news)} news items.")
+
+    prompt_texts: Dict[str, str] = {}
+    tokens_saved: Dict[str, int] = {}
+    prefilter_results: Dict[str, str] = {}
+    shadow: Dict[str, Dict[str, Any]] = {}
+    deadline = classification_deadline(state.deadline)
+    deferred: Set[str] = set()
+
+    def classify(items: List[NewsItem]) -> Dict[str, Classification]:
+        if config.prefilter_enabled:
+            items = prefilter_news(items, classified, shadow, prefilter_results)
+            if not items:
+                return {}
+        if config.text_compaction_enabled:
+            texts, saved = compact_news(items)
+            prompt_texts.update(texts)
+            tokens_saved.update(saved)
+        return classify_news(items, tracker, prompt_texts, deadline=deadline, deferred=deferred)
+
+    newly_classified: Dict[str, Classification] = {}
+    pending = [item for item in state.unseen_news if item.id not in classified]
+    if pending:
+        newly_classified.update(classify(pending))
+        classified.update(newly_classified)
+
+    # Record canonical classifications so copies from this batch and from later runs can reuse them
+    if config.near_duplicate_enabled:
+        try:
+            index = get_near_duplicate_index()
+            for news_id, classification in classified.items():
+                index.set_payload(news_id, _classification_of(classification))
+        except Exception as e:
+            logger.error(f"Failed to record classifications in the near-duplicate index: {e}")
+
+    # Near-duplicates without a known canonical classification fall back to the LLM
+    if state.duplicate_news:
+        try:
+            unresolved = _resolve_duplicates(state, classified)
+        except Exception as e:
+            logger.error(f"Failed to resolve near-duplicates: {e}")
+            unresolved = [item for item in state.duplicate_news if item.id not in classified]
+        if unresolved:
+            resolved_by_llm = classify(unresolved)
+            newly_classified.update(resolved_by_llm)
+            classified.update(resolved_by_llm)
+
+    # Compare the shadow sample with the LLM; if the LLM failed, the confident local answer is used
+    for news_id, prediction in shadow.items():
+        if news_id in classified:
+            agrees = _classification_of(classified[news_id]) == {
+                field: prediction[field] for field in ("sentiment", "importance", "is_market_relevant")
+            }
+            prefilter_results[news_id] = PREFILTER_AGREE if agrees else PREFILTER_DISAGREE
+        else:
+            response = ResponseOutputSchema.model_validate(prediction)
+            classified[news_id] = _to_classification(response, prefilter_confidence=round(prediction["confidence"], 4))
+            prefilter_results[news_id] = PREFILTER_LOCAL
+
+    if llm_cache is not None:
+        if newly_classified:
+            try:
+                llm_cache.set_many({
+                    cache_keys[news_id]: _classification_of(classification)
+                    for news_id, classification in newly_classified.items()
+                })
+            except Exception as e:
+                logger.error(f"Failed to write LLM result cache: {e}")
+        logger.info(f"LLM result cache stats: {llm_cache.stats()}")
+
+    classifications = {item.id: classified[item.id] for item in news if item.id in classified}
+    deferred_ids = [item.id for item in news if item.id in deferred and item.id not in classified]
+    logger.info(f"Processed {len(classifications)}/{len(news)} news items.")
+    if deferred_ids:
+        logger.warning(f"Deadline reached, deferred {len(deferred_ids)} news items to the next run.")
+
+    return {
+        "classifications": classifications,
+        "llm_calls": tracker.calls,
+        "text_tokens_saved": tokens_saved,
+        "prefilter_results": prefilter_results,
+        "deferred_ids": deferred_ids,
+    }
+
+
+def sentiment_analysis_node(state: GraphState):
+    """
+    This node performs sentiment analysis on the news items.
+
+    Token usage, latency and estimated cost of the LLM calls, and the LLM-call reduction and agreement rates of the
+    pre-filter, are summarized into `llm_usage` and written as the metrics record of the run.
+    """
+    # Check if raw news is empty
+    if len(state.unseen_news) == 0 and len(state.duplicate_news) == 0:
+        logger.error("No unseen news found in the state. Aborting.")
+        return {}
+
+    update = analyze_news_state(state)
+
+    llm_usage = summarize_llm_calls(update["llm_calls"], config.model_name, update["text_tokens_saved"])
+    if config.prefilter_enabled:
+        llm_usage.update(summarize_prefilter(update["prefilter_results"]))
+    logger.info(f"LLM usage: {llm_usage}")
+    write_metrics_record({"graph": "batch", "news_items": len(update["classifications"]), **llm_usage})
+
     # Save processed news to state
-    return {"processed_news": processed_news}
+    return {**update, "llm_usage": llm_usage}
@@ -1,7 +1,9 @@
 """
 Telegram Notifier Node
 
-This module is responsible for sending news items to Telegram using the Telegram Bot API.
+This module is responsible for sending news items to Telegram using the Telegram Bot API. With the work queue enabled,
+every notification is claimed in the queue before it is sent, so an item is announced at most once across workers
+and retries. Items carried over from an earlier run that already sent them (`notified_ids`) are not sent again.
 
 Author: Peyman Kh
 Date: 2023-03-20
@@ -9,8 +11,9 @@ Date: 2023-03-20
 # Import libraries
 import logging
 
-from src.state import GraphState
-from src.utils.helpers import send_telegram_message
+from src.config.config import config
+from src.state import GraphState, TelegramDelivery
+from src.utils.telegram import get_telegram_sender
 
 logger = logging.getLogger(__name__)
 
@@ -25,16 +28,54 @@ def notification_node(state: GraphState):
         logger.info("No new items for Telegram notification")
         return {}
 
-    sent_count = 0
-    for news in processed_news:
-        try:
-            send_telegram_message(news)
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"Telegram failed for {news['_id']}: {str(e)}")
+    # Near-duplicates of an already announced story are stored but not sent again
+    to_send = [news for news in processed_news if not news.duplicate_of]
+
+    if state.notified_ids:
+        notified = set(state.notified_ids)
+        skipped = sum(1 for news in to_send if news.id in notified)
+        if skipped:
+            logger.info(f"Skipping {skipped} notifications already sent by an earlier run.")
+        to_send = [news for news in to_send if news.id not in notified]
+
+    queue = None
+    if config.work_queue_enabled and to_send:
+        from src.utils.work_queue import get_work_queue
+
+        queue = get_work_queue()
+        allowed = queue.claim_notifications([news.id for news in to_send])
+        if len(allowed) < len(to_send):
+            logger.info(f"Skipping {len(to_send) - len(allowed)} notifications already sent by an earlier attempt.")
+        to_send = [news for news in to_send if news.id in allowed]
+
+    try:
+        deliveries = get_telegram_sender().send_many(to_send, state.deadline)
+    except Exception as e:
+        logger.error(f"Telegram failed: {str(e)}")
+        if queue is not None:
+            queue.release_notifications([news.id for news in to_send])
+        # Failed deliveries let the pending queue carry the items over to the next run
+        return {
+            "telegram_notification_success": False,
+            "telegram_deliveries": [TelegramDelivery(id=news.id, error=str(e)) for news in to_send],
+        }
+
+    if queue is not None:
+        # Deliveries with an unknown outcome keep their claim, so no retry sends them again
+        queue.release_notifications([
+            delivery.id for delivery in deliveries if not delivery.success and not delivery.outcome_unknown
+        ])
+
+    sent_count = sum(1 for delivery in deliveries if delivery.success)
+    unknown_count = sum(1 for delivery in deliveries if delivery.outcome_unknown)
+    failed_count = len(deliveries) - sent_count - unknown_count
+    if unknown_count:
+        logger.warning(f"Outcome of {unknown_count}/{len(deliveries)} Telegram notifications is unknown, not resending")
+    if failed_count:
+        logger.error(f"Failed to send {failed_count}/{len(deliveries)} notifications to Telegram")
 
     if sent_count > 0:
         logger.info(f"Successfully sent {sent_count} notifications to Telegram")
-        return {"telegram_notification_success": True}
+        return {"telegram_notification_success": True, "telegram_deliveries": deliveries}
 
-    return {"telegram_notification_success": False}
+    return {"telegram_notification_success": False, "telegram_deliveries": deliveries}
@@ -0,0 +1,98 @@
+"""
+Work Queue Nodes
+
+This module connects the graph to the MongoDB work queue (see src/utils/work_queue.py) when `config.work_queue_enabled`
+is set. `claim_work` enqueues the unseen news items of the run and replaces them with the items this worker claimed,
+which also include items left over by earlier runs or by crashed workers. After an item was stored and notified, it is
+completed. An item deferred by the deadline is released right away without counting the attempt; any other item is
+released for a retry or moved to the dead letters.
+"""
+# Import libraries
+import logging
+from typing import Dict, Iterable, List
+
+from src.config.config import config
+from src.state import GraphState, NewsItem, TelegramDelivery
+from src.nodes.carry_over import run_outcomes
+from src.nodes.fetch_news import save_run_fetch_state
+from src.utils.work_queue import QUEUE_DONE, get_work_queue, queued_news_item
+
+logger = logging.getLogger(__name__)
+
+
+def claim_work_node(state: GraphState):
+    """
+    This node enqueues the unseen news items and claims the items this worker will process.
+    """
+    queue = get_work_queue()
+    enqueued = queue.enqueue(state.unseen_news + state.duplicate_news, state.duplicate_of)
+
+    news: Dict[str, NewsItem] = {}
+    unseen_ids: List[str] = []
+    duplicate_ids: List[str] = []
+    duplicate_of: Dict[str, str] = {}
+    for document in queue.claim(config.work_queue_claim_limit):
+        item = queued_news_item(document)
+        news[item.id] = item
+        if document.get("duplicate_of"):
+            duplicate_ids.append(item.id)
+            duplicate_of[item.id] = document["duplicate_of"]
+        else:
+            unseen_ids.append(item.id)
+
+    claimed_ids = unseen_ids + duplicate_ids
+    logger.info(f"Enqueued {enqueued} new news items, claimed {len(claimed_ids)} for this run.")
+
+    # Update state, the claimed items replace the unseen items of the run
+    return {
+        "news": news,
+        "unseen_ids": unseen_ids,
+        "duplicate_ids": duplicate_ids,
+        "duplicate_of": duplicate_of,
+        "claimed_ids": claimed_ids,
+    }
+
+
+def settle_work_items(
+    claimed_ids: List[str],
+    classified_ids: Iterable[str],
+    write_results: Dict[str, str],
+    deliveries: List[TelegramDelivery],
+    deferred_ids: List[str],
+) -> Dict[str, str]:
+    """
+    Completes the claimed items that were stored and notified and releases the others (see `run_outcomes`).
+
+    Returns:
+        New queue state per item: done, pending (retried later) or dead.
+    """
+    if not claimed_ids:
+        return {}
+
+    finished, errors, deferred = run_outcomes(claimed_ids, classified_ids, write_results, deliveries, deferred_ids)
+    queue = get_work_queue()
+    queue.complete(finished)
+    results = {news_id: QUEUE_DONE for news_id in finished}
+    results.update(queue.defer(deferred))
+    results.update(queue.fail(errors))
+    return results
+
+
+def complete_work_node(state: GraphState):
+    """
+    This node settles the claimed items of a batch run once they were written and notified, then saves the fetch
+    state of the run (its items were enqueued by `claim_work`).
+    """
+    results = settle_work_items(
+        state.claimed_ids,
+        state.classifications,
+        state.database_write_results,
+        state.telegram_deliveries,
+        state.deferred_ids,
+    )
+    if results:
+        completed = sum(1 for outcome in results.values() if outcome == QUEUE_DONE)
+        logger.info(f"Completed {completed}/{len(state.claimed_ids)} claimed news items.")
+    save_run_fetch_state(state)
+
+    return {"work_queue_results": results}
@@ -10,7 +10,7 @@ Date: 2023-03-20
 import logging
 
 from src.state import GraphState
-from src.utils.db_utils import add_bulk_news
+from src.utils.db_utils import upsert_bulk_news, WRITE_FAILED
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ logger = logging.getLogger(__name__)
 def write_to_database_node(state: GraphState):
     """
     This node is responsible for adding processed news items to the database.
-    **Note: Failure is handled by add_bulk_news function in utils/db_utils.**
+    **Note: Failure is handled by upsert_bulk_news function in utils/db_utils.**
     """
     processed_news = state.processed_news
 
@@ -26,10 +26,13 @@ def write_to_database_node(state: GraphState):
         logger.info("No new items for database write")
         return {}
 
-    result = add_bulk_news(processed_news)
+    outcomes = upsert_bulk_news(processed_news)
+    stored = [news_id for news_id, outcome in outcomes.items() if outcome != WRITE_FAILED]
 
-    if result:
-        logger.info(f"Successfully added {len(result)} news items to the database.")
-        return {"database_write_success": True}
+    if stored:
+        logger.info(f"Successfully stored {len(stored)}/{len(processed_news)} news items in the database.")
 
-    return {"database_write_success": False}
\ No newline at end of file
+    return {
+        "database_write_success": bool(stored) and len(stored) == len(outcomes),
+        "database_write_results": outcomes,
+    }
@@ -1,9 +1,7 @@
 # Import libraries
-from langchain_core.prompts import ChatPromptTemplate
+import hashlib
 
-sentiment_analysis_prompt = ChatPromptTemplate(
-    [
-        ("system", """You are a Senior Cryptocurrency Market Analyst specializing in real-time sentiment analysis and trading 
+SENTIMENT_ANALYSIS_SYSTEM_PROMPT = """You are a Senior Cryptocurrency Market Analyst specializing in real-time sentiment analysis and trading 
 intelligence. Your expertise encompasses fundamental analysis, market psychology, and regulatory impact assessment across digital asset markets.
 
 ## Primary Objectives
@@ -30,8 +28,36 @@ Input: {{"title": "Anonymous Trader Predicts Dogecoin Moon Mission", "body": "Un
 Output: {{"sentiment": "neutral", "importance": "low", "summary": "DOGE speculation from unverified source", "is_market_relevant": false}}
 
 Maintain professional objectivity and focus on quantifiable market impacts rather than speculative narratives.
-"""),
+"""
 
-        ("human", "Analyze the following news article: Title: {title} Text: {text}"),
-    ]
-)
\ No newline at end of file
+SENTIMENT_ANALYSIS_HUMAN_PROMPT = "Analyze the following news article: Title: {title} Text: {text}"
+
+# Batched variant: several articles share one system prompt and the model returns one classification per article id
+BATCH_SENTIMENT_ANALYSIS_HUMAN_PROMPT = """Analyze each of the following news articles independently. Return exactly \
+one classification per article and copy the article id unchanged into the `id` field.
+
+{articles}"""
+
+# Identifies the classification prompt; changing the prompt invalidates previously cached LLM results
+SENTIMENT_ANALYSIS_PROMPT_VERSION = hashlib.sha256(
+    (SENTIMENT_ANALYSIS_SYSTEM_PROMPT + SENTIMENT_ANALYSIS_HUMAN_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+_PROMPT_TEMPLATES = {
+    "sentiment_analysis_prompt": SENTIMENT_ANALYSIS_HUMAN_PROMPT,
+    "batch_sentiment_analysis_prompt": BATCH_SENTIMENT_ANALYSIS_HUMAN_PROMPT,
+}
+
+
+def __getattr__(name: str):
+    """
+    Builds `sentiment_analysis_prompt` and `batch_sentiment_analysis_prompt` on first access, so langchain_core is
+    only imported once an article is actually classified.
+    """
+    if name not in _PROMPT_TEMPLATES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt = ChatPromptTemplate([("system", SENTIMENT_ANALYSIS_SYSTEM_PROMPT), ("human", _PROMPT_TEMPLATES[name])])
+    globals()[name] = prompt
+    return prompt
@@ -3,13 +3,19 @@ Graph State Schema
 
 This module Defines schemas for news items at different processing stages and the overall graph state.
 
+The graph state holds every news item of a run once, in `news`, and refers to it by id everywhere else. The outcome
+of the classification is kept as a `Classification` overlay per id, and the processed item (news item plus its
+classification) is only built when it is stored or sent. The state therefore grows by a few fields per item rather
+than by a copy of every item per stage, which is what the checkpointer serializes at every step.
+
 Author: Peyman Kh
 Date: 2023-03-20
 """
 # Import libraries
+import operator
 import datetime
 from enum import Enum
-from typing import List
+from typing import Annotated, Any, Dict, List, Optional, Set
 from pydantic import BaseModel
 
 
@@ -38,6 +44,16 @@ class NewsItem(BaseModel):
     timestamp: datetime.datetime
 
 
+class Classification(BaseModel):
+    """Outcome of the classification of a news item, overlaid on the item by its id"""
+    sentiment: Sentiment
+    importance: Importance
+    is_market_relevant: bool
+    duplicate_of: Optional[str] = None  # Id of the canonical item if this is a near-duplicate
+    prefilter_confidence: Optional[float] = None  # Set if classified by the local pre-filter instead of the LLM
+    classified_with: Optional[str] = None  # Model and prompt version of the LLM classification
+
+
 class ProcessedNewsItem(BaseModel):
     """Single news item schema after processing the news with LLM"""
     id: str
@@ -50,14 +66,103 @@ class ProcessedNewsItem(BaseModel):
     importance: Importance  # New field
     is_market_relevant: bool  # New field
     timestamp: datetime.datetime
+    duplicate_of: Optional[str] = None  # Id of the canonical item if this is a near-duplicate
+    prefilter_confidence: Optional[float] = None  # Set if classified by the local pre-filter instead of the LLM
+    classified_with: Optional[str] = None  # Model and prompt version of the LLM classification
+
+
+def processed_news_item(news: NewsItem, classification: Classification) -> ProcessedNewsItem:
+    """Overlays a classification on its news item"""
+    return ProcessedNewsItem(**news.__dict__, **classification.__dict__)
+
+
+class TelegramDelivery(BaseModel):
+    """Delivery result of a single Telegram message"""
+    id: str  # Id of the news item
+    success: bool = False
+    status_code: Optional[int] = None  # Last HTTP status code returned by Telegram
+    attempts: int = 0
+    message_id: Optional[int] = None  # Telegram message id on success
+    error: Optional[str] = None  # Last error on failure
+    outcome_unknown: bool = False  # The request failed after it may have reached Telegram; never sent again
+
+
+class LLMCallRecord(BaseModel):
+    """Token usage and latency of a single LLM call"""
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    success: bool = True
+    estimated: bool = False  # True if token counts were estimated locally because the API returned no usage
 
 
 class GraphState(BaseModel):
     """Graph state schema"""
-    raw_news: List[NewsItem] = []  # Raw news items from the news API
-    cache: List[str] = []  # Unique id of cached news items
+    news: Dict[str, NewsItem] = {}  # News items of the run by id, held once; the fields below refer to them by id
+    raw_ids: List[str] = []  # Ids of the news items fetched from the news API
+    fetch_state: Dict[str, Any] = {}  # High-water marks and HTTP validators to save once the run finished its items
+    cache: Set[str] = set()  # Unique id of fetched news items that are already stored
     cache_hit: int = 0  # Number of news items that were found in the cache
-    unseen_news: List[NewsItem] = []  # Unseen news items that were not found in the cache
-    processed_news: List[ProcessedNewsItem] = []  # Processed news items
+    unseen_ids: List[str] = []  # Ids of the unseen news items that were not found in the cache
+    duplicate_ids: List[str] = []  # Ids of the unseen news items that are near-duplicates of another item
+    duplicate_of: Dict[str, str] = {}  # Maps the id of each near-duplicate to the id of its canonical item
+    classifications: Dict[str, Classification] = {}  # Classification of every processed item, by id
     database_write_success: bool = False  # Flag indicating if the news items were written to the database
-    telegram_notification_success: bool = False  # Flag indicating if the news items were sent to Telegram
\ No newline at end of file
+    database_write_results: Dict[str, str] = {}  # Per-item write outcome: inserted, existing or failed
+    telegram_notification_success: bool = False  # Flag indicating if the news items were sent to Telegram
+    telegram_deliveries: List[TelegramDelivery] = []  # Per-message Telegram delivery results
+    llm_calls: List[LLMCallRecord] = []  # Per-call LLM token usage and latency
+    llm_usage: Dict[str, Any] = {}  # Per-run LLM token, latency and cost summary
+    text_tokens_saved: Dict[str, int] = {}  # Per-item prompt tokens removed by text compaction
+    prefilter_results: Dict[str, str] = {}  # Per-item outcome of the local pre-filter classifier
+    deadline: Optional[float] = None  # Unix time by which the run should finish, None for no deadline
+    carried_over_ids: List[str] = []  # Ids of unfinished items of earlier runs processed again in this run
+    notified_ids: List[str] = []  # Ids of carried-over items an earlier run already sent to Telegram
+    deferred_ids: List[str] = []  # Ids of items not classified because the deadline was reached
+    claimed_ids: List[str] = []  # Ids of the work queue items claimed by this run
+    work_queue_results: Dict[str, str] = {}  # Per-item work queue state after the run: done, pending or dead
+
+    @property
+    def unseen_news(self) -> List[NewsItem]:
+        """Unseen news items, built from `unseen_ids` on every access"""
+        return [self.news[news_id] for news_id in self.unseen_ids]
+
+    @property
+    def duplicate_news(self) -> List[NewsItem]:
+        """Near-duplicate news items, built from `duplicate_ids` on every access"""
+        return [self.news[news_id] for news_id in self.duplicate_ids]
+
+    @property
+    def processed_news(self) -> List[ProcessedNewsItem]:
+        """Processed news items (news item plus classification), built from `classifications` on every access"""
+        return [
+            processed_news_item(self.news[news_id], classification)
+            for news_id, classification in self.classifications.items()
+        ]
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer merging per-item results written by parallel branches"""
+    return {**left, **right}
+
+
+class StreamingGraphState(GraphState):
+    """Graph state schema of the streaming graph, where every unseen item is processed by its own branch"""
+    classifications: Annotated[Dict[str, Classification], merge_dicts] = {}  # Collected from all item branches
+    database_write_results: Annotated[Dict[str, str], merge_dicts] = {}  # Collected from all item branches
+    telegram_deliveries: Annotated[List[TelegramDelivery], operator.add] = []  # Collected from all item branches
+    llm_calls: Annotated[List[LLMCallRecord], operator.add] = []  # Collected from all item branches
+    text_tokens_saved: Annotated[Dict[str, int], merge_dicts] = {}  # Collected from all item branches
+    prefilter_results: Annotated[Dict[str, str], merge_dicts] = {}  # Collected from all item branches
+    deferred_ids: Annotated[List[str], operator.add] = []  # Collected from all item branches
+    work_queue_results: Annotated[Dict[str, str], merge_dicts] = {}  # Collected from all item branches
+
+
+class ItemTaskState(BaseModel):
+    """Input of a single item branch in the streaming graph"""
+    item: NewsItem
+    duplicate_of: Optional[str] = None  # Id of the canonical item if the item is a near-duplicate
+    notified: bool = False  # Whether an earlier run already sent the item to Telegram
+    deadline: Optional[float] = None  # Deadline of the run
+
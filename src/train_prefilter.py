@@ -0,0 +1,116 @@
+"""
+Pre-filter Training
+
+Trains the local pre-filter classifier on the classifications the LLM stored in the `news` collection (or in a JSONL
+export) and writes it to PREFILTER_MODEL_PATH. The most recent share of the documents is held out: the model is
+evaluated on it against the LLM labels, reporting per field accuracy and, per confidence threshold, the share of items
+that would be answered locally (LLM-call reduction) and how often those answers agree with the LLM.
+
+Usage:
+    python -m src.train_prefilter --limit 50000 --holdout 0.2
+    python -m src.train_prefilter --input news.jsonl --min-agreement 0.97
+
+Exits with status 1, without replacing the current model, if the agreement at PREFILTER_CONFIDENCE_THRESHOLD is below
+--min-agreement.
+"""
+# Import libraries
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from typing import Any, Dict, List
+
+from src.config.config import config
+from src.utils.prefilter import FIELDS, PrefilterModel, evaluate_model
+
+logger = logging.getLogger(__name__)
+
+_THRESHOLDS = (0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99)
+
+
+def load_documents(args) -> List[Dict[str, Any]]:
+    """Loads labeled documents, oldest first, from a JSONL file or from the stored news."""
+    if args.input:
+        with open(args.input) as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+        documents = [
+            doc for doc in documents
+            if not doc.get("duplicate_of") and doc.get("prefilter_confidence") is None
+        ][-args.limit:]
+    else:
+        # Imported here so training from a file does not require a database connection
+        from src.utils.db_utils import fetch_labeled_news
+        documents = fetch_labeled_news(args.limit)
+
+    return [doc for doc in documents if all(doc.get(field) is not None for field in FIELDS)]
+
+
+def train(documents: List[Dict[str, Any]], holdout: float, n_features: int, epochs: int) -> PrefilterModel:
+    """
+    Trains a model on the older documents and evaluates it on the most recent `holdout` share.
+
+    Returns:
+        The trained model, with the held-out evaluation in its metadata.
+    """
+    split = len(documents) - max(1, int(len(documents) * holdout))
+    train_documents, test_documents = documents[:split], documents[split:]
+
+    started = time.perf_counter()
+    model = PrefilterModel(n_features=n_features)
+    model.fit(train_documents, epochs=epochs)
+    logger.info(f"Trained pre-filter on {len(train_documents)} documents in {time.perf_counter() - started:.1f}s.")
+
+    started = time.perf_counter()
+    evaluation = evaluate_model(model, test_documents, sorted({*_THRESHOLDS, config.prefilter_confidence_threshold}))
+    evaluation["predict_us"] = round((time.perf_counter() - started) / max(1, len(test_documents)) * 1e6, 1)
+
+    model.metadata = {
+        "trained_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "train_documents": len(train_documents),
+        "holdout": evaluation,
+    }
+    return model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the local pre-filter classifier on stored LLM labels")
+    parser.add_argument("--input", help="JSONL file of classified news items; defaults to stored news")
+    parser.add_argument("--limit", type=int, default=50_000, help="Maximum number of most recent documents to use")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of the most recent documents held out")
+    parser.add_argument("--features", type=int, default=1 << 18, help="Number of hash buckets")
+    parser.add_argument("--epochs", type=int, default=8, help="Training passes over the documents")
+    parser.add_argument(
+        "--min-agreement",
+        type=float,
+        default=0.0,
+        help="Minimum held-out agreement at PREFILTER_CONFIDENCE_THRESHOLD required to save the model",
+    )
+    parser.add_argument("--output", default=config.prefilter_model_path, help="Defaults to PREFILTER_MODEL_PATH")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    documents = load_documents(args)
+    if len(documents) < 2:
+        logger.error("Not enough labeled news items to train the pre-filter.")
+        sys.exit(1)
+
+    model = train(documents, args.holdout, args.features, args.epochs)
+    print(json.dumps(model.metadata, indent=2))
+
+    at_threshold = model.metadata["holdout"]["thresholds"][str(config.prefilter_confidence_threshold)]
+    if at_threshold["agreement"] < args.min_agreement:
+        logger.error(
+            f"Held-out agreement {at_threshold['agreement']:.1%} at threshold {config.prefilter_confidence_threshold} "
+            f"is below {args.min_agreement:.1%}; the model was not saved."
+        )
+        sys.exit(1)
+
+    model.save(args.output)
+    logger.info(
+        f"Saved pre-filter model to {args.output}: {at_threshold['llm_call_reduction']:.1%} of held-out items "
+        f"answered locally with {at_threshold['agreement']:.1%} agreement."
+    )
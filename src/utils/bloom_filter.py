@@ -0,0 +1,364 @@
+"""
+Seen-ID Index Module
+
+This module provides a scalable Bloom filter persisted in a memory-mapped file. It is used as a local index of the
+news ids already stored in the database, so the cache check only has to query MongoDB for ids the filter reports as
+"maybe seen". A Bloom filter never reports an id it holds as unseen, and its false-positive rate is tracked by
+confirming "maybe" answers against the database.
+
+The filter must hold every stored id, including ids stored by other processes (other workers sharing the database,
+`batch_inference ingest`) or by a run that crashed before updating it. The file records when it was last synced with
+the database; `sync_seen_index` adds the ids stored since then (minus `_SYNC_MARGIN_SECONDS` for clock skew between
+writers and slow writes) when the index is opened, and again once `config.seen_index_sync_interval_seconds` have
+passed. Writes of this process add their ids right away (`record_stored_ids`).
+
+The file has a single writer: it is locked while open, and a second process opening it fails instead of sharing
+it, since growing the filter remaps the file. Processes on one machine need their own `config.seen_index_path`.
+
+File layout: a fixed header followed by one or more slices. Each slice holds its own header and bit array; a new,
+larger and tighter slice is appended once the last one reaches its capacity (scalable Bloom filter).
+"""
+# Import libraries
+import os
+import math
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"CNPBLOOM"
+_VERSION = 2
+# magic, version, number of slices, initial capacity, error rate, time of the last sync with the database
+_HEADER = struct.Struct("<8sIIQdd")
+_SYNCED_AT_OFFSET = 32
+# capacity, count, number of bits, number of hash functions
+_SLICE_HEADER = struct.Struct("<QQQI4x")
+_GROWTH = 2
+_TIGHTENING = 0.5
+# Ids stored this long before the last sync are fetched again by the next one, covering writes that were in flight
+# during the sync and clock skew between the processes writing to the database
+_SYNC_MARGIN_SECONDS = 300
+
+# Module-level index (create once, reuse across function calls)
+_index: Optional["ScalableBloomFilter"] = None
+_index_lock = threading.Lock()
+
+
+def _hash_pair(key: str):
+    """Derives two independent 64-bit hashes of a key for double hashing."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class ScalableBloomFilter:
+    """
+    Scalable Bloom filter stored in a memory-mapped file.
+
+    The filter is safe to share between threads. Changes are written to the mapped file directly and flushed on
+    `flush`/`close`, so the filter survives process restarts. The file is locked (`flock`) while it is open, so only
+    one process uses it at a time; opening a file locked by another process raises a RuntimeError.
+    """
+
+    def __init__(self, path: str, initial_capacity: int, error_rate: float):
+        self.path = path
+        self.created = False
+        self.lookups = 0
+        self.maybe_hits = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Growing the file remaps it, which other processes would not see, so a file has a single owner at a time
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(
+                f"Seen-id index {path} is in use by another process; give each process its own SEEN_INDEX_PATH."
+            )
+        self._file = os.fdopen(fd, "r+b")
+
+        if os.fstat(fd).st_size >= _HEADER.size:
+            magic, version = struct.unpack("<8sI", self._file.read(12))
+            if magic == _MAGIC and version != _VERSION:
+                # Older files do not record their last sync, so they cannot be brought up to date incrementally
+                logger.warning(f"Seen-id index {path} has version {version}, rebuilding it.")
+                self._file.truncate(0)
+
+        if os.fstat(fd).st_size < _HEADER.size:
+            self._file.seek(0)
+            self._file.truncate(0)
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0, initial_capacity, error_rate, 0.0))
+            self._file.flush()
+            self.created = True
+
+        self._mmap = mmap.mmap(fd, 0)
+
+        magic, version, _, self.initial_capacity, self.error_rate, _ = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._mmap.close()
+            self._file.close()
+            raise ValueError(f"{path} is not a seen-id index file.")
+
+        self._slices: List[Dict[str, int]] = []
+        self._load_slices()
+        if not self._slices:
+            self._append_slice()
+
+    def _load_slices(self) -> None:
+        """Reads the slice headers from the mapped file."""
+        num_slices = _HEADER.unpack_from(self._mmap, 0)[2]
+        offset = _HEADER.size
+        for _ in range(num_slices):
+            capacity, count, num_bits, num_hashes = _SLICE_HEADER.unpack_from(self._mmap, offset)
+            self._slices.append({
+                "offset": offset,
+                "bits_offset": offset + _SLICE_HEADER.size,
+                "capacity": capacity,
+                "count": count,
+                "num_bits": num_bits,
+                "num_hashes": num_hashes,
+            })
+            offset += _SLICE_HEADER.size + num_bits // 8
+
+    def _append_slice(self) -> None:
+        """Appends a new slice sized for the next capacity and error rate, and remaps the file."""
+        index = len(self._slices)
+        capacity = self.initial_capacity * _GROWTH ** index
+        error_rate = self.error_rate * (1 - _TIGHTENING) * _TIGHTENING ** index
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_bits = (num_bits + 63) // 64 * 64
+        num_hashes = max(1, math.ceil(math.log2(1 / error_rate)))
+
+        offset = len(self._mmap)
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.seek(offset)
+        self._file.write(_SLICE_HEADER.pack(capacity, 0, num_bits, num_hashes))
+        self._file.truncate(offset + _SLICE_HEADER.size + num_bits // 8)
+        self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        struct.pack_into("<I", self._mmap, 12, index + 1)
+
+        self._slices.append({
+            "offset": offset,
+            "bits_offset": offset + _SLICE_HEADER.size,
+            "capacity": capacity,
+            "count": 0,
+            "num_bits": num_bits,
+            "num_hashes": num_hashes,
+        })
+        logger.info(f"Seen-id index grew to {index + 1} slices ({len(self._mmap)} bytes).")
+
+    def _slice_contains(self, slice_: Dict[str, int], h1: int, h2: int) -> bool:
+        mm, base, num_bits = self._mmap, slice_["bits_offset"], slice_["num_bits"]
+        for i in range(slice_["num_hashes"]):
+            bit = (h1 + i * h2) % num_bits
+            if not mm[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _contains(self, key: str) -> bool:
+        h1, h2 = _hash_pair(key)
+        return any(self._slice_contains(slice_, h1, h2) for slice_ in self._slices)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._contains(key)
+
+    def __len__(self) -> int:
+        return sum(slice_["count"] for slice_ in self._slices)
+
+    def add_many(self, keys: Iterable[str]) -> int:
+        """
+        Adds keys to the filter.
+
+        Args:
+            keys: Keys to add
+
+        Returns:
+            Number of keys that were not already present.
+        """
+        added = 0
+        with self._lock:
+            for key in keys:
+                h1, h2 = _hash_pair(key)
+                if any(self._slice_contains(slice_, h1, h2) for slice_ in self._slices):
+                    continue
+                if self._slices[-1]["count"] >= self._slices[-1]["capacity"]:
+                    self._append_slice()
+
+                slice_ = self._slices[-1]
+                mm, base, num_bits = self._mmap, slice_["bits_offset"], slice_["num_bits"]
+                for i in range(slice_["num_hashes"]):
+                    bit = (h1 + i * h2) % num_bits
+                    mm[base + (bit >> 3)] |= 1 << (bit & 7)
+                slice_["count"] += 1
+                struct.pack_into("<Q", mm, slice_["offset"] + 8, slice_["count"])
+                added += 1
+        return added
+
+    def filter_maybe_seen(self, keys: Iterable[str]) -> List[str]:
+        """
+        Returns the keys the filter reports as possibly seen. All other keys are definitely unseen.
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            List of the keys that may be present.
+        """
+        keys = list(keys)
+        with self._lock:
+            maybe = [key for key in keys if self._contains(key)]
+            self.lookups += len(keys)
+            self.maybe_hits += len(maybe)
+        return maybe
+
+    @property
+    def synced_at(self) -> float:
+        """Unix time at which the last sync with the database started; 0 if it was never synced."""
+        with self._lock:
+            return struct.unpack_from("<d", self._mmap, _SYNCED_AT_OFFSET)[0]
+
+    def mark_synced(self, synced_at: float) -> None:
+        """Records the start of a completed sync with the database and flushes the file."""
+        with self._lock:
+            struct.pack_into("<d", self._mmap, _SYNCED_AT_OFFSET, synced_at)
+            self._mmap.flush()
+
+    def record_false_positives(self, count: int) -> None:
+        """Records "maybe" answers that the database reported as unseen."""
+        with self._lock:
+            self.false_positives += count
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns size, memory footprint and observed/estimated false-positive rates."""
+        with self._lock:
+            estimated_fp = 1.0
+            for slice_ in self._slices:
+                k, n, m = slice_["num_hashes"], slice_["count"], slice_["num_bits"]
+                estimated_fp *= 1 - (1 - math.exp(-k * n / m)) ** k
+            negatives = self.lookups - (self.maybe_hits - self.false_positives)
+            return {
+                "items": len(self),
+                "slices": len(self._slices),
+                "bytes": len(self._mmap),
+                "lookups": self.lookups,
+                "maybe_hits": self.maybe_hits,
+                "false_positives": self.false_positives,
+                "observed_fp_rate": self.false_positives / negatives if negatives > 0 else 0.0,
+                "estimated_fp_rate": 1 - estimated_fp,
+            }
+
+    def flush(self) -> None:
+        """Writes pending changes of the mapped file to disk."""
+        with self._lock:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """Flushes and unmaps the file."""
+        with self._lock:
+            self._mmap.flush()
+            self._mmap.close()
+            self._file.close()
+
+
+def sync_seen_index(index: ScalableBloomFilter) -> int:
+    """
+    Adds the ids stored in the database since the last sync of the index.
+
+    All stored ids are added instead if the index was never synced, or if some documents have no `stored_at` time
+    (written before it was introduced or by other tools); those documents then get the start of the sync as their
+    `stored_at`, so the next syncs are incremental again. Errors are raised to the caller; the recorded sync time
+    only advances once all ids were added.
+
+    Args:
+        index: Seen-id index to bring up to date
+
+    Returns:
+        Number of ids that were not already in the index.
+    """
+    # Imported here to keep the filter usable without a database connection
+    from src.utils.db_utils import (
+        backfill_stored_at, count_news_without_stored_at, fetch_all_news_ids, fetch_news_ids_stored_since
+    )
+
+    started = time.time()
+    without_stored_at = count_news_without_stored_at()
+    if index.synced_at and not without_stored_at:
+        added = index.add_many(fetch_news_ids_stored_since(index.synced_at - _SYNC_MARGIN_SECONDS))
+    else:
+        added = index.add_many(fetch_all_news_ids())
+        if without_stored_at:
+            logger.info(f"Seen-id index synced in full, setting stored_at of {without_stored_at} news.")
+            backfill_stored_at(started)
+    index.mark_synced(started)
+    return added
+
+
+def get_seen_index() -> ScalableBloomFilter:
+    """
+    Returns the process-wide seen-id index, synced with the database when it is opened.
+
+    Returns:
+        The ScalableBloomFilter configured by `config.seen_index_*`.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = ScalableBloomFilter(
+                path=config.seen_index_path,
+                initial_capacity=config.seen_index_capacity,
+                error_rate=config.seen_index_error_rate,
+            )
+            try:
+                added = sync_seen_index(index)
+            except Exception:
+                index.close()
+                if index.created:
+                    # An incompletely warmed filter would report stored ids as unseen, so never keep it
+                    os.remove(config.seen_index_path)
+                raise
+            logger.info(f"Seen-id index synced with {added} new ids from the database.")
+            logger.info(f"Seen-id index opened at {config.seen_index_path}: {index.stats()}")
+            _index = index
+    return _index
+
+
+def record_stored_ids(news_ids: Iterable[str]) -> None:
+    """
+    Adds ids just stored by this process to the seen-id index, if it is open. Other processes pick them up with
+    their next sync.
+    """
+    with _index_lock:
+        index = _index
+    if index is None:
+        return
+    try:
+        index.add_many(news_ids)
+        index.flush()
+    except Exception as e:
+        logger.error(f"Failed to update seen-id index: {e}")
+
+
+def close_seen_index() -> None:
+    """Flushes and closes the process-wide seen-id index."""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
+            logger.info("Seen-id index closed.")
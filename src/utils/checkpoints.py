@@ -0,0 +1,190 @@
+"""
+Checkpoints Module
+
+This module creates the LangGraph checkpointer of the pipeline and bounds what it keeps. Every run executes on its
+own thread id; runs are registered when they start and the checkpoints of runs beyond the retention policy (the
+last `config.checkpoint_retention_runs` runs, and runs younger than `config.checkpoint_retention_seconds`) are
+deleted after each run. The SQLite store is compacted every `config.checkpoint_compaction_interval` runs, so the
+file shrinks back after pruning. Checkpointing can be disabled entirely for the hot path, in which case the LangGraph
+checkpoint savers are not imported at all. Checkpoints are encoded by the compact serializer of
+src/utils/state_serializer.py.
+"""
+# Import libraries
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional
+
+from src.config.config import config, CheckpointMode
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
+logger = logging.getLogger(__name__)
+
+
+def new_thread_id(prefix: str) -> str:
+    """Builds a thread id that is unique across runs and restarts, e.g. tick-20230320T101500-1a2b3c4d."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return f"{prefix}-{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+class CheckpointStore:
+    """
+    Owns the checkpointer and applies the retention policy to it.
+
+    Run threads are tracked in a `run_threads` table next to the checkpoints (SQLite) or in memory, so the policy
+    also covers runs of earlier processes sharing the same file.
+    """
+
+    def __init__(self, mode: CheckpointMode, path: str, retention_runs: int, retention_seconds: float,
+                 compaction_interval: int):
+        self.mode = mode
+        self.retention_runs = retention_runs
+        self.retention_seconds = retention_seconds
+        self.compaction_interval = compaction_interval
+        self._runs_since_compaction = 0
+        self._lock = threading.Lock()
+        self._memory_threads: "OrderedDict[str, float]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if mode == CheckpointMode.SQLITE:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            from src.utils.state_serializer import StateSerializer
+
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # The saver serializes access with its own lock, so the connection is shared between threads
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self.checkpointer: Optional["BaseCheckpointSaver"] = SqliteSaver(self._conn, serde=StateSerializer())
+            with self.checkpointer.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS run_threads (thread_id TEXT PRIMARY KEY, started_at REAL NOT NULL)"
+                )
+        elif mode == CheckpointMode.MEMORY:
+            from langgraph.checkpoint.memory import InMemorySaver
+            from src.utils.state_serializer import StateSerializer
+
+            self.checkpointer = InMemorySaver(serde=StateSerializer())
+        else:
+            self.checkpointer = None
+
+    def register_run(self, thread_id: str) -> None:
+        """Records the start of a run, so its checkpoints are covered by the retention policy."""
+        if self.checkpointer is None:
+            return
+        started_at = time.time()
+        if self._conn is not None:
+            with self.checkpointer.cursor() as cursor:
+                cursor.execute("INSERT OR REPLACE INTO run_threads VALUES (?, ?)", (thread_id, started_at))
+        else:
+            with self._lock:
+                self._memory_threads[thread_id] = started_at
+
+    def _expired_threads(self) -> List[str]:
+        """Returns the run threads outside the retention policy, oldest first."""
+        cutoff = time.time() - self.retention_seconds if self.retention_seconds else None
+        if self._conn is not None:
+            with self.checkpointer.cursor(transaction=False) as cursor:
+                rows = cursor.execute("SELECT thread_id, started_at FROM run_threads ORDER BY started_at DESC").fetchall()
+        else:
+            with self._lock:
+                rows = list(reversed(self._memory_threads.items()))
+
+        expired = [
+            thread_id for rank, (thread_id, started_at) in enumerate(rows)
+            if rank >= self.retention_runs or (cutoff is not None and started_at < cutoff)
+        ]
+        return list(reversed(expired))
+
+    def prune(self) -> int:
+        """
+        Deletes the checkpoints of runs outside the retention policy and compacts the store periodically.
+
+        Returns:
+            The number of runs whose checkpoints were deleted.
+        """
+        if self.checkpointer is None:
+            return 0
+
+        try:
+            expired = self._expired_threads()
+            for thread_id in expired:
+                self.checkpointer.delete_thread(thread_id)
+                if self._conn is not None:
+                    with self.checkpointer.cursor() as cursor:
+                        cursor.execute("DELETE FROM run_threads WHERE thread_id = ?", (thread_id,))
+                else:
+                    with self._lock:
+                        self._memory_threads.pop(thread_id, None)
+            if expired:
+                logger.info(f"Deleted checkpoints of {len(expired)} expired runs.")
+
+            self._runs_since_compaction += 1
+            if self._conn is not None and self._runs_since_compaction >= self.compaction_interval:
+                self.compact()
+            return len(expired)
+        except Exception as e:
+            logger.error(f"Failed to prune checkpoints: {e}")
+            return 0
+
+    def compact(self) -> None:
+        """Returns the space freed by deleted checkpoints to the file system."""
+        if self._conn is None:
+            return
+        started = time.monotonic()
+        with self.checkpointer.cursor() as cursor:
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with self.checkpointer.lock:
+            # VACUUM cannot run inside a transaction, so it bypasses the saver's cursor
+            self._conn.execute("VACUUM")
+        self._runs_since_compaction = 0
+        logger.info(f"Checkpoint store compacted in {time.monotonic() - started:.2f}s.")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self.checkpointer.lock:
+                self._conn.close()
+            self._conn = None
+
+
+# Module-level store (create once, reuse across function calls)
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """
+    Returns the process-wide checkpoint store, creating it on first use.
+
+    Returns:
+        The CheckpointStore configured by `config.checkpoint_*`.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(
+                mode=config.checkpoint_mode,
+                path=config.checkpoint_path,
+                retention_runs=config.checkpoint_retention_runs,
+                retention_seconds=config.checkpoint_retention_seconds,
+                compaction_interval=config.checkpoint_compaction_interval,
+            )
+            logger.info(f"Checkpointing mode: {config.checkpoint_mode.value}.")
+    return _store
+
+
+def close_checkpoint_store() -> None:
+    """Closes the process-wide checkpoint store."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+            logger.info("Checkpoint store closed.")
@@ -2,26 +2,32 @@
 Database Operations Module
 
 This module handles database connections and operations. It includes functions for establishing and closing database
-connections, fetching news from the database, and adding news to the database.
+connections, fetching news from the database, and adding news to the database. pymongo is imported on first use, so
+runs that never reach the database do not load it.
 
 Author: Peyman Kh
 Date: 2023-03-20
 """
 # Import libraries
+import time
 import logging
-from typing import Optional, List
-from pymongo import MongoClient
-from pymongo.database import Database
+import datetime
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterable, Iterator, Set
 
 from src.state import ProcessedNewsItem
 from src.config.config import config
+from src.utils.bloom_filter import record_stored_ids
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+    from pymongo.database import Database
 
 # Module-level connection (create once, reuse across function calls)
-_client: Optional[MongoClient] = None
-_db: Optional[Database] = None
+_client: Optional["MongoClient"] = None
+_db: Optional["Database"] = None
 
 
-def get_database() -> Database:
+def get_database() -> "Database":
     """
     Establishes and returns a MongoDB database connection.
 
@@ -34,13 +40,41 @@ def get_database() -> Database:
     """
     global _client, _db
     if _client is None or _db is None:
+        from pymongo import MongoClient
+
         logging.info("Initializing database connection...")
         _client = MongoClient(config.db_uri.get_secret_value())
         _db = _client[config.db_name]
         logging.info("Database connection initialized successfully.")
+        ensure_indexes(_db)
     return _db
 
 
+def ensure_indexes(db: "Database") -> None:
+    """
+    Creates the indexes required by the pipeline queries if they do not exist yet.
+
+    `create_index` is idempotent, so this is safe to call on every startup.
+
+    Args:
+        db: The MongoDB database object.
+    """
+    from pymongo import ASCENDING, DESCENDING
+
+    try:
+        db["news"].create_index([("timestamp", DESCENDING)], name="timestamp_desc")
+        db["news"].create_index([("duplicate_of", ASCENDING)], name="duplicate_of", sparse=True)
+        # Keyset pagination of the backfill: (timestamp, _id) gives a total order over the collection
+        db["news"].create_index([("timestamp", ASCENDING), ("_id", ASCENDING)], name="timestamp_id")
+        # Incremental sync of the seen-id index. Not sparse, so it also finds the documents without `stored_at`
+        if db["news"].index_information().get("stored_at", {}).get("sparse"):
+            db["news"].drop_index("stored_at")
+        db["news"].create_index([("stored_at", ASCENDING)], name="stored_at")
+        logging.info("Database indexes ensured.")
+    except Exception as e:
+        logging.error(f"Failed to ensure database indexes: {e}")
+
+
 def close_database() -> None:
     """
     Closes the database connection.
@@ -57,43 +91,395 @@ def close_database() -> None:
         logging.info("Database connection closed.")
 
 
-def fetch_cache() -> list[str]:
+def fetch_cache(news_ids: Iterable[str]) -> Set[str]:
     """
-    Finds last 20 news and return their _id. It is used to find the news that already processed.
+    Finds which of the given news ids are already stored. It is used to find the news that already processed.
 
-    Returns:
+    A single `_id: {$in: [...]}` query is issued for exactly the given ids, so the result does not depend on how
+    many news items were stored since and the lookup is served by the `_id` index.
 
+    Args:
+        news_ids: Ids of the fetched news items
+
+    Returns:
+        Set of the given ids that already exist in the database.
     """
+    news_ids = list(set(news_ids))
+    if not news_ids:
+        return set()
+
     db = get_database()
     collection = db["news"]
 
     try:
         cursor = collection.find(
-            {},
+            {"_id": {"$in": news_ids}},
             {"_id": 1}
-        ).sort("timestamp", -1).limit(20)
+        )
 
-        cache = [str(doc["_id"]) for doc in cursor]
+        cache = {str(doc["_id"]) for doc in cursor}
         return cache
 
     except Exception as e:
         logging.error(f"Failed to fetch cache: {e}")
+        return set()
+
+
+def fetch_all_news_ids(batch_size: int = 10_000) -> Iterator[str]:
+    """
+    Streams the ids of all stored news. It is used to warm the local seen-id index.
+
+    Unlike the other read helpers, errors are raised to the caller: an incomplete list of ids must not be mistaken
+    for a complete one.
+
+    Args:
+        batch_size: Number of ids fetched per server round-trip
+
+    Yields:
+        The id of every stored news item.
+    """
+    db = get_database()
+    collection = db["news"]
+
+    for doc in collection.find({}, {"_id": 1}, batch_size=batch_size):
+        yield str(doc["_id"])
+
+
+def fetch_news_ids_stored_since(since: float, batch_size: int = 10_000) -> Iterator[str]:
+    """
+    Streams the ids of the news stored since a given time. It is used to keep the local seen-id index in sync with
+    writes of other processes.
+
+    Like `fetch_all_news_ids`, errors are raised to the caller.
+
+    Args:
+        since: Unix time from which stored news are included
+        batch_size: Number of ids fetched per server round-trip
+
+    Yields:
+        The id of every news item stored since the given time.
+    """
+    db = get_database()
+    collection = db["news"]
+
+    stored_since = datetime.datetime.fromtimestamp(since, datetime.timezone.utc)
+    for doc in collection.find({"stored_at": {"$gte": stored_since}}, {"_id": 1}, batch_size=batch_size):
+        yield str(doc["_id"])
+
+
+def count_news_without_stored_at() -> int:
+    """
+    Counts the stored news without a `stored_at` time, which an incremental sync of the seen-id index cannot find:
+    documents written before `stored_at` was introduced or by other tools.
+
+    Returns:
+        Number of such documents.
+    """
+    db = get_database()
+    return db["news"].count_documents({"stored_at": None})
+
+
+def backfill_stored_at(stored_at: float) -> int:
+    """
+    Sets the `stored_at` time of the stored news that have none, so later syncs of the seen-id index can skip them.
+
+    Args:
+        stored_at: Unix time to record
+
+    Returns:
+        Number of documents updated.
+    """
+    db = get_database()
+    stored_at = datetime.datetime.fromtimestamp(stored_at, datetime.timezone.utc)
+    return db["news"].update_many({"stored_at": None}, {"$set": {"stored_at": stored_at}}).modified_count
+
+
+def fetch_recent_news(since: datetime.datetime) -> List[Dict[str, Any]]:
+    """
+    Finds news published since a given time. It is used to warm the near-duplicate index.
+
+    Args:
+        since: Earliest publication timestamp to include
+
+    Returns:
+        List of documents with their id, title, text, timestamp and classification fields.
+    """
+    db = get_database()
+    collection = db["news"]
+
+    try:
+        cursor = collection.find(
+            {"timestamp": {"$gte": since}},
+            {
+                "_id": 1,
+                "title": 1,
+                "text": 1,
+                "timestamp": 1,
+                "sentiment": 1,
+                "importance": 1,
+                "is_market_relevant": 1,
+                "duplicate_of": 1,
+            }
+        ).sort("timestamp", 1)
+
+        return list(cursor)
+
+    except Exception as e:
+        logging.error(f"Failed to fetch recent news: {e}")
         return []
 
 
-def add_bulk_news(news: List[ProcessedNewsItem]) -> List[str]:
+def fetch_labeled_news(limit: int) -> List[Dict[str, Any]]:
     """
-    Bulk insert processed news into the database.
+    Finds the most recent news classified by the LLM. It is used to train the local pre-filter classifier.
+
+    Near-duplicates (which copy the classification of their canonical item) and items answered by the pre-filter
+    itself are excluded, so the classifier only learns from LLM labels.
 
     Args:
-        news: List of documents to insert
+        limit: Maximum number of documents to return
+
+    Returns:
+        List of documents with their id, title, text, timestamp and classification fields, oldest first.
+    """
+    db = get_database()
+    collection = db["news"]
+
+    try:
+        cursor = collection.find(
+            {"duplicate_of": None, "prefilter_confidence": None, "sentiment": {"$exists": True}},
+            {
+                "_id": 1,
+                "title": 1,
+                "text": 1,
+                "timestamp": 1,
+                "sentiment": 1,
+                "importance": 1,
+                "is_market_relevant": 1,
+            }
+        ).sort("timestamp", -1).limit(limit)
+
+        return list(cursor)[::-1]
+
+    except Exception as e:
+        logging.error(f"Failed to fetch labeled news: {e}")
+        return []
+
+
+def stream_news_for_backfill(
+        classified_with: str,
+        after: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1_000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the stored news not yet classified with a given model and prompt, in (timestamp, _id) order.
+
+    Documents are read from a single server-side cursor, `batch_size` at a time. Like `fetch_all_news_ids`, errors are
+    raised to the caller so an interrupted stream is never mistaken for a complete one.
+
+    Args:
+        classified_with: Model and prompt version of the backfill; documents already carrying it are skipped
+        after: Sort key (timestamp and _id) of the last processed document; the stream resumes after it
+        batch_size: Number of documents fetched per server round-trip
+
+    Yields:
+        Documents with their id, title, text, timestamp and classification fields.
+    """
+    from pymongo import ASCENDING
+
+    db = get_database()
+    collection = db["news"]
+
+    query: Dict[str, Any] = {"classified_with": {"$ne": classified_with}}
+    if after is not None:
+        query["$or"] = [
+            {"timestamp": {"$gt": after["timestamp"]}},
+            {"timestamp": after["timestamp"], "_id": {"$gt": after["_id"]}},
+        ]
+
+    cursor = collection.find(
+        query,
+        {
+            "_id": 1,
+            "title": 1,
+            "text": 1,
+            "timestamp": 1,
+            "sentiment": 1,
+            "importance": 1,
+            "is_market_relevant": 1,
+        },
+        batch_size=batch_size,
+    ).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def count_news_for_backfill(classified_with: str) -> int:
+    """Counts the stored news not yet classified with a given model and prompt version."""
+    db = get_database()
+    return db["news"].count_documents({"classified_with": {"$ne": classified_with}})
+
+
+def update_bulk_classifications(updates: Dict[str, Dict[str, Any]]) -> Set[str]:
+    """
+    Overwrites the classification fields of stored news with unordered bulk writes.
+
+    Transient errors retry the chunk with exponential backoff; this is safe because the updates are idempotent.
+    A bulk write only reports how many documents it matched, so when that is fewer than the updates it applied, the
+    matched documents are looked up by id.
+
+    Args:
+        updates: Fields to set per news id
+
+    Returns:
+        Ids of the documents matched by the updates; the other updates failed or found no document.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    db = get_database()
+    collection = db["news"]
+
+    news_ids = list(updates)
+    operations = [UpdateOne({"_id": news_id}, {"$set": updates[news_id]}) for news_id in news_ids]
+    matched: Set[str] = set()
+    for i in range(0, len(operations), config.db_write_chunk_size):
+        chunk = operations[i:i + config.db_write_chunk_size]
+        chunk_ids = news_ids[i:i + config.db_write_chunk_size]
+        applied: List[str] = []
+        matched_count = 0
+        for attempt in range(1, config.db_write_max_attempts + 1):
+            try:
+                matched_count = collection.bulk_write(chunk, ordered=False).matched_count
+                applied = chunk_ids
+                break
+            except BulkWriteError as e:
+                # Unordered: every operation without a write error was applied
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                applied = [news_id for index, news_id in enumerate(chunk_ids) if index not in failed]
+                matched_count = e.details.get("nMatched", 0)
+                logging.error(f"Failed to update {len(failed)} classifications: {e}")
+                break
+            except Exception as e:
+                if not _is_transient(e) or attempt == config.db_write_max_attempts:
+                    logging.error(f"Failed to update {len(chunk)} classifications: {e}")
+                    break
+                delay = config.db_write_backoff_seconds * 2 ** (attempt - 1)
+                logging.warning(
+                    f"Transient error while updating classifications (attempt {attempt}), retrying in {delay:.1f}s: {e}"
+                )
+                time.sleep(delay)
+
+        if matched_count == len(applied):
+            matched.update(applied)
+        elif applied:
+            matched.update(fetch_cache(applied))
+
+    return matched
+
+
+# Per-item outcomes of upsert_bulk_news
+WRITE_INSERTED = "inserted"
+WRITE_EXISTING = "existing"
+WRITE_FAILED = "failed"
+
+# Duplicate key error, raised when two concurrent upserts of the same _id race
+_DUPLICATE_KEY_ERROR = 11000
+
+
+def _news_to_document(item: ProcessedNewsItem, stored_at: datetime.datetime) -> Dict[str, Any]:
+    """Converts a processed news item to a MongoDB document."""
+    # The model is flat, so its fields give the same document as model_dump() without its recursive conversion
+    item_dict = dict(item.__dict__)
+    # Rename the 'id' field to '_id' for MongoDB
+    item_dict['_id'] = item_dict.pop('id')
+    item_dict['stored_at'] = stored_at
+    return item_dict
+
+
+def _is_transient(error: Exception) -> bool:
+    """Checks whether a database error is worth retrying."""
+    from pymongo.errors import ConnectionFailure, OperationFailure
+
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, OperationFailure) and error.has_error_label("RetryableWriteError")
+
+
+def _upsert_chunk(collection, documents: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Upserts one chunk of documents with an unordered bulk write.
+
+    Transient errors (connection failures, retryable write errors) retry the whole chunk with exponential backoff;
+    this is safe because the upserts are idempotent. Items written by an attempt that was interrupted are reported
+    as "existing" by the retry.
 
     Returns:
-        List of inserted IDs (strings)
+        Dict mapping each document id to its outcome.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    operations = [
+        UpdateOne({"_id": doc["_id"]}, {"$setOnInsert": doc}, upsert=True)
+        for doc in documents
+    ]
+
+    for attempt in range(1, config.db_write_max_attempts + 1):
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+            return {
+                doc["_id"]: WRITE_INSERTED if index in upserted else WRITE_EXISTING
+                for index, doc in enumerate(documents)
+            }
+
+        except BulkWriteError as e:
+            # Unordered: every operation without a write error was applied
+            upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+            outcomes = {}
+            for error in e.details.get("writeErrors", []):
+                index = error["index"]
+                if error.get("code") == _DUPLICATE_KEY_ERROR:
+                    outcomes[documents[index]["_id"]] = WRITE_EXISTING
+                else:
+                    logging.error(f"Failed to write news {documents[index]['_id']}: {error.get('errmsg')}")
+                    outcomes[documents[index]["_id"]] = WRITE_FAILED
+            for index, doc in enumerate(documents):
+                outcomes.setdefault(doc["_id"], WRITE_INSERTED if index in upserted else WRITE_EXISTING)
+            return outcomes
+
+        except Exception as e:
+            if not _is_transient(e) or attempt == config.db_write_max_attempts:
+                logging.error(f"Failed to write {len(documents)} news: {e}")
+                break
+            delay = config.db_write_backoff_seconds * 2 ** (attempt - 1)
+            logging.warning(f"Transient error while writing news (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+    return {doc["_id"]: WRITE_FAILED for doc in documents}
+
+
+def upsert_bulk_news(news: List[ProcessedNewsItem]) -> Dict[str, str]:
+    """
+    Idempotently writes processed news into the database.
+
+    Each item is written with an `UpdateOne(..., upsert=True)` that only sets fields on insert, in unordered
+    `bulk_write` chunks of `config.db_write_chunk_size`. A duplicate or invalid document therefore never aborts the
+    rest of the batch, and re-running the same batch is a no-op. New documents get a `stored_at` time, from which
+    other processes sync their seen-id index; the stored ids are added to the index of this process right away.
+
+    Args:
+        news: List of processed news items to write
+
+    Returns:
+        Dict mapping each news id to its outcome: "inserted", "existing" (already stored) or "failed".
 
     Raises:
-        ValueError: If the news list is empty,
-        BulkWriteError: For batch insertion failures
+        ValueError: If the news list is empty or contains other objects than ProcessedNewsItem
     """
     # Validate news list
     if isinstance(news, list) and len(news) == 0:
@@ -104,22 +490,50 @@ def add_bulk_news(news: List[ProcessedNewsItem]) -> List[str]:
         if not isinstance(news_item, ProcessedNewsItem):
             raise ValueError("Each news item must be a ProcessedNewsItem object.")
 
-    # Insert news into the database
     db = get_database()
     collection = db["news"]
 
-    try:
-        news_dict = []
-        for item in news:
-            item_dict = item.model_dump()
-            # Rename the 'id' field to '_id' for MongoDB
-            item_dict['_id'] = item_dict.pop('id')
-            news_dict.append(item_dict)
+    stored_at = datetime.datetime.now(datetime.timezone.utc)
+    documents = [_news_to_document(item, stored_at) for item in news]
+    outcomes: Dict[str, str] = {}
+    for i in range(0, len(documents), config.db_write_chunk_size):
+        outcomes.update(_upsert_chunk(collection, documents[i:i + config.db_write_chunk_size]))
 
-        result = collection.insert_many(news_dict)
-        logging.info(f"Successfully inserted {len(result.inserted_ids)} news.")
-        return result.inserted_ids
+    record_stored_ids(news_id for news_id, outcome in outcomes.items() if outcome != WRITE_FAILED)
 
-    except Exception as e:
-        logging.error(f"Failed to insert news: {e}")
-        return []
\ No newline at end of file
+    counts = {outcome: 0 for outcome in (WRITE_INSERTED, WRITE_EXISTING, WRITE_FAILED)}
+    for outcome in outcomes.values():
+        counts[outcome] += 1
+    logging.info(
+        f"Wrote {len(outcomes)} news: {counts[WRITE_INSERTED]} inserted, "
+        f"{counts[WRITE_EXISTING]} already stored, {counts[WRITE_FAILED]} failed."
+    )
+    return outcomes
+
+
+def add_metrics_record(record: Dict[str, Any]) -> None:
+    """
+    Stores a per-run metrics record in the metrics collection.
+
+    Args:
+        record: Metrics of the run
+    """
+    db = get_database()
+    db["metrics"].insert_one(record)
+
+
+def add_bulk_news(news: List[ProcessedNewsItem]) -> List[str]:
+    """
+    Bulk insert processed news into the database.
+
+    Args:
+        news: List of documents to insert
+
+    Returns:
+        List of IDs (strings) that are stored after the call, whether inserted now or already present
+
+    Raises:
+        ValueError: If the news list is empty
+    """
+    outcomes = upsert_bulk_news(news)
+    return [news_id for news_id, outcome in outcomes.items() if outcome != WRITE_FAILED]
@@ -0,0 +1,67 @@
+"""
+Deadline Module
+
+This module holds the time budgets of a run. Every run gets a deadline, `config.tick_deadline_seconds` after it
+starts, carried in the graph state as a Unix timestamp so every node (and every streaming branch) sees the same one.
+Nodes derive their budgets from it:
+- The fetch node waits for slow sources at most until the deadline.
+- No LLM request is started within `config.deadline_reserve_seconds` of the deadline, which leaves time to store and
+  notify the items already classified.
+- Every item gets its own deadline, at most `config.item_deadline_seconds` after its classification starts, that
+  bounds the retries of its LLM request.
+- Telegram messages not sent by the deadline are not started anymore.
+
+Items that miss a deadline are carried over to the next run (see src/nodes/carry_over.py).
+"""
+# Import libraries
+import time
+from typing import Optional
+
+from src.config.config import config
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting work whose deadline has passed."""
+
+
+def run_deadline(budget_seconds: Optional[float] = None) -> Optional[float]:
+    """
+    Returns the deadline of a run starting now.
+
+    Args:
+        budget_seconds: Time budget of the run, defaults to `config.tick_deadline_seconds`
+
+    Returns:
+        The deadline as a Unix timestamp, or None if the budget is 0 (no deadline).
+    """
+    budget = config.tick_deadline_seconds if budget_seconds is None else budget_seconds
+    return time.time() + budget if budget > 0 else None
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Returns the seconds left until a deadline (0 once it passed), or None without a deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def expired(deadline: Optional[float]) -> bool:
+    """Returns whether a deadline has passed; never true without a deadline."""
+    return deadline is not None and time.time() >= deadline
+
+
+def classification_deadline(deadline: Optional[float]) -> Optional[float]:
+    """Returns the time after which no LLM request of the run is started anymore."""
+    if deadline is None:
+        return None
+    return deadline - config.deadline_reserve_seconds
+
+
+def item_deadline(deadline: Optional[float]) -> Optional[float]:
+    """
+    Returns the deadline of an item whose classification starts now: `config.item_deadline_seconds` from now, but
+    not past the classification deadline of the run. Work without a run deadline (e.g. backfills) gets none.
+    """
+    if deadline is None or not config.item_deadline_seconds:
+        return deadline
+    return min(deadline, time.time() + config.item_deadline_seconds)
@@ -4,12 +4,12 @@ Workflow Helper Functions
 # Import libraries
 import uuid
 import logging
-import requests
 import datetime
 from typing import Optional, Dict, Any
 
 from src.state import ProcessedNewsItem
 from src.config.config import config
+from src.utils.http import get_http_session
 logger = logging.getLogger(__name__)
 
 
@@ -136,7 +136,7 @@ def send_telegram_message(news: ProcessedNewsItem) -> Optional[Dict[str, Any]]:
         full_message = _build_telegram_message(news)
 
         # Prepare API request
-        send_message_url = f"https://api.telegram.org/bot{config.bot_token.get_secret_value()}/sendMessage"
+        send_message_url = f"{config.telegram_api_url}/bot{config.bot_token.get_secret_value()}/sendMessage"
 
         payload = {
             "chat_id": config.group_id.get_secret_value(),
@@ -147,10 +147,11 @@ def send_telegram_message(news: ProcessedNewsItem) -> Optional[Dict[str, Any]]:
 
         # Send request to telegram
         try:
-            response = requests.post(
+            response = get_http_session().post(
                 send_message_url,
                 json=payload,
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                timeout=config.http_timeout,
             )
         except Exception as e:
             logger.error(f"Failed to send message to Telegram: {str(e)}")
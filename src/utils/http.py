@@ -0,0 +1,67 @@
+"""
+HTTP Session Module
+
+This module provides a shared, pooled HTTP session for all outgoing requests (news API, Telegram). Reusing the session
+keeps TCP connections and TLS sessions alive across calls and pipeline runs instead of opening a new connection for
+every request.
+"""
+# Import libraries
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+# Module-level session (create once, reuse across function calls)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the process-wide pooled HTTP session, creating it on first use.
+
+    Returns:
+        A requests.Session with a connection pool of `config.http_pool_size` connections per host, retrying
+        transient failures of idempotent requests. Compressed responses (gzip, deflate and, when the optional
+        decoders are installed, br/zstd) are requested and decoded transparently.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Idempotent requests (GET) are retried with exponential backoff on connection errors and transient
+            # status codes, honoring Retry-After. POST requests are never retried here to avoid duplicate messages.
+            retry = Retry(
+                total=config.http_max_retries,
+                backoff_factor=config.http_backoff_factor,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=config.http_pool_size,
+                pool_maxsize=config.http_pool_size,
+                max_retries=retry,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            logger.info("HTTP session initialized.")
+    return _session
+
+
+def close_http_session() -> None:
+    """Closes the pooled HTTP session and its connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+            logger.info("HTTP session closed.")
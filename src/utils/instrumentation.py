@@ -0,0 +1,232 @@
+"""
+Instrumentation Module
+
+This module records Prometheus metrics for the pipeline: per-node duration histograms, run and error counters, item
+counts per stage (fetched, cache hits, unseen, carried over from earlier runs, canonical, near-duplicate, claimed from
+the work queue, answered by the pre-filter, deferred by the deadline, processed, written, sent), work queue outcomes,
+pre-filter outcomes, LLM tokens, LLM attempts and retries, the adaptive LLM concurrency limit, the LLM circuit breaker
+state and run durations. Every node registered in the graph is wrapped with `instrument_node`. The metrics are served on
+a local `/metrics` endpoint in daemon mode, or written to a textfile (for the node_exporter textfile collector) after a
+one-shot run.
+"""
+# Import libraries
+import os
+import time
+import logging
+import functools
+from typing import Any, Callable, Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server, write_to_textfile
+
+from src.utils.db_utils import WRITE_FAILED
+from src.utils.prefilter import PREFILTER_LOCAL
+
+logger = logging.getLogger(__name__)
+
+# Dedicated registry, so only pipeline metrics are exported
+REGISTRY = CollectorRegistry()
+
+NODE_DURATION = Histogram(
+    "crypto_news_node_duration_seconds",
+    "Duration of a graph node execution",
+    ["node"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    registry=REGISTRY,
+)
+NODE_RUNS = Counter("crypto_news_node_runs_total", "Graph node executions", ["node"], registry=REGISTRY)
+NODE_ERRORS = Counter(
+    "crypto_news_node_errors_total",
+    "Graph node executions that raised an exception",
+    ["node"],
+    registry=REGISTRY,
+)
+ITEMS = Counter(
+    "crypto_news_items_total",
+    "News items per pipeline stage: raw_news, cache_hit, unseen, carried_over, canonical, duplicate, claimed, "
+    "prefiltered, deferred, processed, written, sent",
+    ["stage"],
+    registry=REGISTRY,
+)
+WORK_QUEUE_OUTCOMES = Counter(
+    "crypto_news_work_queue_items_total",
+    "Claimed work queue items by state after processing: done, pending (retried later), dead",
+    ["outcome"],
+    registry=REGISTRY,
+)
+PREFILTER_OUTCOMES = Counter(
+    "crypto_news_prefilter_items_total",
+    "Items seen by the pre-filter by outcome: local, uncertain, shadow_agree, shadow_disagree",
+    ["outcome"],
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "crypto_news_llm_tokens_total",
+    "LLM tokens by kind: prompt, completion, saved (removed by text compaction)",
+    ["kind"],
+    registry=REGISTRY,
+)
+LLM_ATTEMPTS = Counter(
+    "crypto_news_llm_attempts_total",
+    "LLM request attempts by outcome: success, rate_limited, timeout, unavailable, rejected, circuit_open",
+    ["outcome"],
+    registry=REGISTRY,
+)
+LLM_RETRIES = Counter(
+    "crypto_news_llm_retries_total",
+    "LLM requests retried after a failed attempt, by the outcome of that attempt",
+    ["outcome"],
+    registry=REGISTRY,
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "crypto_news_llm_concurrency_limit",
+    "Current limit of in-flight LLM requests set by the adaptive (AIMD) controller",
+    registry=REGISTRY,
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "crypto_news_llm_circuit_open",
+    "State of the LLM circuit breaker: 0 closed, 0.5 half-open (probing), 1 open",
+    registry=REGISTRY,
+)
+RUN_DURATION = Histogram(
+    "crypto_news_run_duration_seconds",
+    "Duration of a complete pipeline run",
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+    registry=REGISTRY,
+)
+RUNS = Counter("crypto_news_runs_total", "Pipeline runs by status: success or failed", ["status"], registry=REGISTRY)
+LAST_RUN_TIMESTAMP = Gauge(
+    "crypto_news_last_run_timestamp_seconds",
+    "Unix time the last pipeline run finished",
+    registry=REGISTRY,
+)
+LAST_RUN_ITEMS = Gauge(
+    "crypto_news_last_run_items",
+    "News items per pipeline stage in the last run",
+    ["stage"],
+    registry=REGISTRY,
+)
+
+
+def _count_items(update: Dict[str, Any]) -> Dict[str, int]:
+    """Extracts item counts per stage from a node's state update."""
+    counts: Dict[str, int] = {}
+    if "raw_ids" in update:
+        counts["raw_news"] = len(update["raw_ids"])
+    if "cache_hit" in update:
+        counts["cache_hit"] = int(update["cache_hit"])
+    if "claimed_ids" in update:
+        counts["claimed"] = len(update["claimed_ids"])
+    if "carried_over_ids" in update:
+        counts["carried_over"] = len(update["carried_over_ids"])
+    if "deferred_ids" in update:
+        counts["deferred"] = len(update["deferred_ids"])
+    # The work queue claim and the pending queue drain replace the unseen items, which were already counted
+    is_claim = "raw_ids" not in update and ("claimed_ids" in update or "carried_over_ids" in update)
+    if "duplicate_ids" in update and not is_claim:
+        # After the near-duplicate check, unseen_ids only holds the canonical items
+        counts["canonical"] = len(update.get("unseen_ids", []))
+        counts["duplicate"] = len(update["duplicate_ids"])
+    elif "unseen_ids" in update and not is_claim:
+        counts["unseen"] = len(update["unseen_ids"])
+    if "prefilter_results" in update:
+        counts["prefiltered"] = sum(1 for outcome in update["prefilter_results"].values() if outcome == PREFILTER_LOCAL)
+    if "classifications" in update:
+        counts["processed"] = len(update["classifications"])
+    if "database_write_results" in update:
+        counts["written"] = sum(1 for outcome in update["database_write_results"].values() if outcome != WRITE_FAILED)
+    if "telegram_deliveries" in update:
+        counts["sent"] = sum(1 for delivery in update["telegram_deliveries"] if delivery.success)
+    return counts
+
+
+def record_items(update: Dict[str, Any]) -> None:
+    """Adds the item counts and LLM tokens of a node's state update to the counters."""
+    for stage, count in _count_items(update).items():
+        ITEMS.labels(stage=stage).inc(count)
+    for outcome in update.get("work_queue_results", {}).values():
+        WORK_QUEUE_OUTCOMES.labels(outcome=outcome).inc()
+    for outcome in update.get("prefilter_results", {}).values():
+        PREFILTER_OUTCOMES.labels(outcome=outcome).inc()
+
+    for call in update.get("llm_calls", []):
+        LLM_TOKENS.labels(kind="prompt").inc(call.prompt_tokens)
+        LLM_TOKENS.labels(kind="completion").inc(call.completion_tokens)
+    saved = sum(update.get("text_tokens_saved", {}).values())
+    if saved:
+        LLM_TOKENS.labels(kind="saved").inc(saved)
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """
+    Wraps a graph node to record its duration, executions, errors and the items in its state update.
+
+    Args:
+        name: Node name used as the metric label
+        node: Node function taking the graph state
+
+    Returns:
+        The wrapped node function.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        started = time.perf_counter()
+        NODE_RUNS.labels(node=name).inc()
+        try:
+            update = node(state)
+        except Exception:
+            NODE_ERRORS.labels(node=name).inc()
+            raise
+        finally:
+            NODE_DURATION.labels(node=name).observe(time.perf_counter() - started)
+
+        try:
+            if isinstance(update, dict):
+                record_items(update)
+        except Exception as e:
+            logger.error(f"Failed to record metrics of node {name}: {e}")
+        return update
+
+    return wrapper
+
+
+def record_run(duration: float, result: Any) -> None:
+    """
+    Records a completed pipeline run.
+
+    Args:
+        duration: Run duration in seconds
+        result: Final graph state, or None if the run failed
+    """
+    RUN_DURATION.observe(duration)
+    RUNS.labels(status="success" if result is not None else "failed").inc()
+    LAST_RUN_TIMESTAMP.set(time.time())
+
+    if isinstance(result, dict):
+        # Set every stage so a stage without items reads 0 instead of keeping the previous run's value
+        stages = (
+            "raw_news", "cache_hit", "unseen", "carried_over", "canonical", "duplicate", "claimed", "prefiltered",
+            "deferred", "processed", "written", "sent",
+        )
+        counts = {stage: 0 for stage in stages}
+        counts.update(_count_items(result))
+        counts["unseen"] = counts["canonical"] + counts["duplicate"]
+        for stage, count in counts.items():
+            LAST_RUN_ITEMS.labels(stage=stage).set(count)
+
+
+def start_metrics_server(port: int, addr: str) -> None:
+    """Serves the metrics on http://addr:port/metrics in a background thread."""
+    start_http_server(port, addr=addr, registry=REGISTRY)
+    logger.info(f"Serving metrics on http://{addr}:{port}/metrics")
+
+
+def write_metrics_textfile(path: str) -> None:
+    """Writes the metrics in the Prometheus text format to a file, replacing it atomically."""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_to_textfile(path, REGISTRY)
+        logger.info(f"Wrote metrics to {path}")
+    except Exception as e:
+        logger.error(f"Failed to write metrics textfile: {e}")
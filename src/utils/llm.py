@@ -0,0 +1,53 @@
+"""
+LLM Client Module
+
+This module provides the shared chat model client used for sentiment analysis. The client (and its underlying HTTP
+connection pool) is created once per process and reused across pipeline runs. langchain_openai is only imported when
+the client is first needed, so runs without new news never load it.
+"""
+# Import libraries
+import logging
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from src.config.config import config
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Module-level client (create once, reuse across function calls)
+_model: Optional["ChatOpenAI"] = None
+_model_lock = threading.Lock()
+
+
+def get_chat_model() -> "ChatOpenAI":
+    """
+    Returns the process-wide chat model client, creating it on first use.
+
+    Returns:
+        A ChatOpenAI client configured by `config.model_name`, `config.model_base_url` and `config.llm_timeout`.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            from langchain_openai import ChatOpenAI
+
+            _model = ChatOpenAI(
+                model=config.model_name,
+                api_key=config.model_api_key.get_secret_value(),
+                timeout=config.llm_timeout,
+                base_url=config.model_base_url,
+                # Retries, backoff and the circuit breaker are handled by src.utils.llm_calls
+                max_retries=0,
+            )
+            logger.info(f"Chat model client initialized for {config.model_name}.")
+    return _model
+
+
+def reset_chat_model() -> None:
+    """Drops the process-wide chat model client so the next call creates a new one."""
+    global _model
+    with _model_lock:
+        _model = None
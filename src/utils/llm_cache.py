@@ -0,0 +1,211 @@
+"""
+LLM Result Cache Module
+
+This module provides a persistent, content-addressed cache for LLM classifications. Entries are keyed by a hash of the
+normalized article title and text together with the model name and the prompt version, so re-timestamped or re-run
+articles never pay for the same classification twice. The cache is stored in SQLite so it survives process restarts
+and evicts entries by age (TTL) and by least recent use once it grows beyond its size limit.
+"""
+# Import libraries
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+# Module-level cache (create once, reuse across function calls)
+_cache: Optional["LLMResultCache"] = None
+_cache_lock = threading.Lock()
+
+
+def _normalize(value: str) -> str:
+    """Lowercases a string and collapses whitespace so trivial edits map to the same key."""
+    return " ".join((value or "").lower().split())
+
+
+def make_cache_key(title: str, text: str, model_name: str, prompt_version: str) -> str:
+    """
+    Builds the content address of a classification.
+
+    Args:
+        title: Title of the news article
+        text: Body of the news article
+        model_name: Name of the LLM producing the classification
+        prompt_version: Hash identifying the prompt used for the classification
+
+    Returns:
+        str: SHA-256 hex digest identifying the classification
+    """
+    composite_key = "\x1f".join([_normalize(title), _normalize(text), model_name, prompt_version])
+    return hashlib.sha256(composite_key.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """
+    SQLite-backed key/value store for LLM results with TTL and LRU eviction.
+
+    The cache is safe to share between threads. Hit and miss counters are kept for the lifetime of the instance.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Looks up several keys at once and refreshes the access time of the entries found.
+
+        Args:
+            keys: Cache keys produced by make_cache_key
+
+        Returns:
+            Dict mapping every key that was found (and is not expired) to its cached value.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        min_created_at = now - self.ttl_seconds
+        found: Dict[str, Any] = {}
+
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement, so query in chunks
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM llm_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*chunk, min_created_at),
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = json.loads(value)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        """
+        Stores several results at once and evicts expired and least recently used entries.
+
+        Args:
+            values: Dict mapping cache keys to JSON-serializable values
+        """
+        if not values:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in values.items()],
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Deletes expired entries, then the least recently used ones above max_entries. Caller holds the lock."""
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        ).rowcount
+
+        overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            evicted = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            ).rowcount
+
+        if expired or evicted:
+            self.evictions += expired + evicted
+            logger.info(f"Evicted {expired} expired and {evicted} least recently used LLM cache entries.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_llm_cache() -> LLMResultCache:
+    """
+    Returns the process-wide LLM result cache, opening it on first use.
+
+    Returns:
+        The LLMResultCache instance configured by `config.llm_cache_*`.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResultCache(
+                path=config.llm_cache_path,
+                max_entries=config.llm_cache_max_entries,
+                ttl_seconds=config.llm_cache_ttl_seconds,
+            )
+            logger.info(f"LLM result cache opened at {config.llm_cache_path}.")
+    return _cache
+
+
+def close_llm_cache() -> None:
+    """Closes the process-wide LLM result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+            logger.info("LLM result cache closed.")
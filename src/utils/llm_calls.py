@@ -0,0 +1,357 @@
+"""
+LLM Call Layer
+
+This module is the single path every classification request takes to the LLM provider. On top of the chat model
+client it adds:
+- Retries with exponential backoff and jitter (tenacity) on rate limits, timeouts, connection and server errors. The
+  wait honors the provider's `retry-after-ms` / `retry-after` headers and, once a quota is exhausted, its
+  `x-ratelimit-reset-*` headers.
+- A circuit breaker. After `config.llm_circuit_failure_threshold` consecutive provider failures every request fails
+  immediately for `config.llm_circuit_recovery_seconds`; then a single probe request decides whether it closes again.
+- An AIMD concurrency limiter. The number of requests in flight grows by one per window of healthy responses and is
+  halved on a rate limit, a timeout or a response slower than `config.llm_latency_target_seconds`, within
+  [`config.llm_min_concurrency`, `config.llm_max_concurrency`]. The layer lives for the whole process, so a resident
+  daemon keeps the limit it converged on across runs.
+- Deadlines. A request given a deadline is not attempted, and not retried, past it.
+"""
+# Import libraries
+import re
+import time
+import logging
+import datetime
+import threading
+from enum import Enum
+from typing import Any, Optional
+from email.utils import parsedate_to_datetime
+
+from tenacity import RetryCallState, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from src.config.config import config
+from src.utils.deadline import DeadlineExceeded
+from src.utils.instrumentation import LLM_ATTEMPTS, LLM_CIRCUIT_OPEN, LLM_CONCURRENCY_LIMIT, LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Durations of the x-ratelimit-reset-* headers, e.g. "20ms", "1s", "6m0s", "1h2m3.5s"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class LLMOutcome(str, Enum):
+    """Outcome of one attempt of an LLM request."""
+    SUCCESS = "success"
+    RATE_LIMITED = "rate_limited"
+    TIMEOUT = "timeout"
+    UNAVAILABLE = "unavailable"
+    REJECTED = "rejected"
+    CIRCUIT_OPEN = "circuit_open"
+
+
+# Worth another attempt
+_RETRYABLE = {LLMOutcome.RATE_LIMITED, LLMOutcome.TIMEOUT, LLMOutcome.UNAVAILABLE}
+# The provider did not answer: counted by the circuit breaker
+_PROVIDER_FAILURES = {LLMOutcome.TIMEOUT, LLMOutcome.UNAVAILABLE}
+# The provider is saturated: the concurrency limit is reduced
+_CONGESTION = {LLMOutcome.RATE_LIMITED, LLMOutcome.TIMEOUT}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitState(str, Enum):
+    """States of the circuit breaker."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+_CIRCUIT_GAUGE = {CircuitState.CLOSED: 0.0, CircuitState.HALF_OPEN: 0.5, CircuitState.OPEN: 1.0}
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one probe through after `recovery_seconds`."""
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        LLM_CIRCUIT_OPEN.set(_CIRCUIT_GAUGE[self.state])
+
+    def _transition(self, state: CircuitState) -> None:
+        self.state = state
+        LLM_CIRCUIT_OPEN.set(_CIRCUIT_GAUGE[state])
+
+    def allow(self) -> bool:
+        """Returns whether a request may be sent now; in the half-open state only one probe is in flight."""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_seconds:
+                    return False
+                self._transition(CircuitState.HALF_OPEN)
+                self._probing = False
+                logger.info("LLM circuit half-open, sending a probe request.")
+            if self.state == CircuitState.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, outcome: LLMOutcome) -> None:
+        """
+        Records the outcome of a request that was allowed through. Rate-limited requests neither count as failures
+        nor as answers; a rate-limited probe lets the next request probe again.
+        """
+        with self._lock:
+            self._probing = False
+            if outcome == LLMOutcome.RATE_LIMITED:
+                return
+            if outcome not in _PROVIDER_FAILURES:
+                if self.state != CircuitState.CLOSED:
+                    logger.info("LLM provider answered again, circuit closed.")
+                    self._transition(CircuitState.CLOSED)
+                self._failures = 0
+                return
+
+            self._failures += 1
+            if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != CircuitState.OPEN:
+                    logger.warning(
+                        f"LLM circuit open after {self._failures} consecutive provider failures, failing requests "
+                        f"for {self.recovery_seconds:.0f}s."
+                    )
+                self._transition(CircuitState.OPEN)
+                self._opened_at = time.monotonic()
+
+
+class AIMDLimiter:
+    """
+    Limits the requests in flight with additive increase / multiplicative decrease.
+
+    Every healthy response adds 1/limit to the limit (one more slot per window of `limit` responses) while the limit
+    is in use; congestion multiplies it by `decrease_factor`. Only one decrease is applied per congestion event:
+    responses to requests sent before the last decrease were issued under the old limit and are ignored.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float, decrease_factor: float = 0.5):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(self.maximum, max(minimum, initial)))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> float:
+        """Blocks until a slot is free and returns the time the request was started at."""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, outcome: LLMOutcome) -> None:
+        """Frees the slot of a request and adjusts the limit to its outcome and latency."""
+        now = time.monotonic()
+        with self._condition:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            previous = self.limit
+            congested = outcome in _CONGESTION or (
+                outcome == LLMOutcome.SUCCESS and now - started > self.latency_target
+            )
+            if congested:
+                if started >= self._last_decrease:
+                    self._limit = max(float(self.minimum), self._limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif outcome == LLMOutcome.SUCCESS and in_flight * 2 >= self.limit:
+                self._limit = min(float(self.maximum), self._limit + 1 / self._limit)
+
+            if self.limit != previous:
+                LLM_CONCURRENCY_LIMIT.set(self.limit)
+                log = logger.warning if self.limit < previous else logger.debug
+                log(f"LLM concurrency limit {previous} -> {self.limit} ({outcome.value}).")
+            self._condition.notify_all()
+
+
+def classify_error(error: BaseException) -> LLMOutcome:
+    """Maps an exception raised by an LLM request to its outcome."""
+    if isinstance(error, CircuitOpenError):
+        return LLMOutcome.CIRCUIT_OPEN
+
+    # The client is already loaded whenever a request failed
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        # An exhausted billing quota does not recover by waiting
+        if getattr(error, "code", None) == "insufficient_quota":
+            return LLMOutcome.UNAVAILABLE
+        return LLMOutcome.RATE_LIMITED
+    if isinstance(error, openai.APITimeoutError):
+        return LLMOutcome.TIMEOUT
+    if isinstance(error, openai.APIConnectionError):
+        return LLMOutcome.UNAVAILABLE
+    if isinstance(error, openai.APIStatusError) and (error.status_code >= 500 or error.status_code in (408, 409)):
+        return LLMOutcome.UNAVAILABLE
+    return LLMOutcome.REJECTED
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Reads how long the provider asked us to wait from the headers of a failed response.
+
+    Returns:
+        The wait in seconds, or None if the response carries no hint.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                at = parsedate_to_datetime(value)
+                return max(0.0, (at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except Exception:
+        pass
+
+    # The reset of an exhausted request or token quota
+    resets = [
+        _parse_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0"
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+class LLMCallLayer:
+    """Sends LLM requests through the circuit breaker and the concurrency limiter, retrying transient failures."""
+
+    def __init__(self, breaker: CircuitBreaker, limiter: AIMDLimiter, max_attempts: int, backoff_seconds: float,
+                 max_backoff_seconds: float):
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.max_backoff_seconds = max_backoff_seconds
+        self._backoff = wait_random_exponential(multiplier=backoff_seconds, max=max_backoff_seconds)
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        """Exponential backoff with jitter, or longer if the provider asked for it."""
+        backoff = self._backoff(retry_state)
+        hint = retry_after(retry_state.outcome.exception())
+        if hint is None:
+            return backoff
+        return min(self.max_backoff_seconds, max(backoff, hint))
+
+    def _log_retry(self, retry_state: RetryCallState) -> None:
+        error = retry_state.outcome.exception()
+        outcome = classify_error(error)
+        LLM_RETRIES.labels(outcome=outcome.value).inc()
+        logger.warning(
+            f"LLM request failed ({outcome.value}, attempt {retry_state.attempt_number}/{self.max_attempts}), "
+            f"retrying in {retry_state.next_action.sleep:.1f}s: {error}"
+        )
+
+    def _attempt(self, model, prompt, deadline: Optional[float]) -> Any:
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceeded("LLM request deadline exceeded, request not sent.")
+        if not self.breaker.allow():
+            LLM_ATTEMPTS.labels(outcome=LLMOutcome.CIRCUIT_OPEN.value).inc()
+            raise CircuitOpenError("LLM circuit is open, request not sent.")
+
+        started = self.limiter.acquire()
+        outcome = LLMOutcome.REJECTED
+        try:
+            result = model.invoke(prompt)
+            outcome = LLMOutcome.SUCCESS
+            return result
+        except Exception as e:
+            outcome = classify_error(e)
+            raise
+        finally:
+            self.limiter.release(started, outcome)
+            self.breaker.record(outcome)
+            LLM_ATTEMPTS.labels(outcome=outcome.value).inc()
+
+    def invoke(self, model, prompt, deadline: Optional[float] = None) -> Any:
+        """
+        Invokes a model (e.g. a TrackedModel) with a prompt.
+
+        Args:
+            model: Model to invoke
+            prompt: Prompt to send
+            deadline: Unix time after which no attempt is started; a retry whose wait would end past it is not made
+
+        Raises:
+            CircuitOpenError: If the circuit is open; no request is sent.
+            DeadlineExceeded: If the deadline passed before the first attempt.
+            Exception: The error of the last attempt if every attempt failed, or of the first non-retryable failure.
+        """
+        def past_deadline(retry_state: RetryCallState) -> bool:
+            return deadline is not None and time.time() + (retry_state.upcoming_sleep or 0) >= deadline
+
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_attempts) | past_deadline,
+            wait=self._wait,
+            retry=retry_if_exception(lambda error: classify_error(error) in _RETRYABLE),
+            before_sleep=self._log_retry,
+            reraise=True,
+        )
+        return retrying(self._attempt, model, prompt, deadline)
+
+
+# Module-level call layer (create once, reuse across function calls)
+_call_layer: Optional[LLMCallLayer] = None
+_call_layer_lock = threading.Lock()
+
+
+def get_llm_call_layer() -> LLMCallLayer:
+    """Returns the process-wide LLM call layer, creating it on first use."""
+    global _call_layer
+    with _call_layer_lock:
+        if _call_layer is None:
+            if config.llm_adaptive_concurrency:
+                initial, minimum = config.llm_initial_concurrency, config.llm_min_concurrency
+            else:
+                initial = minimum = config.llm_max_concurrency
+            _call_layer = LLMCallLayer(
+                breaker=CircuitBreaker(config.llm_circuit_failure_threshold, config.llm_circuit_recovery_seconds),
+                limiter=AIMDLimiter(
+                    initial=initial,
+                    minimum=minimum,
+                    maximum=config.llm_max_concurrency,
+                    latency_target=config.llm_latency_target_seconds,
+                ),
+                max_attempts=config.llm_max_attempts,
+                backoff_seconds=config.llm_retry_backoff_seconds,
+                max_backoff_seconds=config.llm_retry_max_backoff_seconds,
+            )
+    return _call_layer
+
+
+def invoke_llm(model, prompt, deadline: Optional[float] = None) -> Any:
+    """Invokes a model through the process-wide LLM call layer. See `LLMCallLayer.invoke`."""
+    return get_llm_call_layer().invoke(model, prompt, deadline)
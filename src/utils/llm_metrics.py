@@ -0,0 +1,195 @@
+"""
+LLM Metrics Module
+
+This module records token usage, latency and estimated cost of LLM calls. A tracker wraps a structured-output model
+and records one LLMCallRecord per call; the records of a run are summarized (token totals, latency percentiles,
+estimated cost for `config.model_name`) and written as one structured metrics record per run to a local JSONL file or
+to MongoDB, so regressions in prompt size and latency can be spotted from run to run.
+"""
+# Import libraries
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.config import config, MetricsSink
+from src.state import LLMCallRecord
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# USD per one million (input, output) tokens; override with LLM_PRICE_PER_MILLION_INPUT/OUTPUT for other models
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o4-mini": (1.10, 4.40),
+}
+
+
+class LLMUsageTracker:
+    """Thread-safe collector of LLM call records for one run."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.calls: List[LLMCallRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, call: LLMCallRecord) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def track(self, structured_model) -> "TrackedModel":
+        """Wraps a model built with `with_structured_output(..., include_raw=True)` so its calls are recorded."""
+        return TrackedModel(structured_model, self)
+
+
+class TrackedModel:
+    """Structured-output model wrapper that records token usage and latency and returns the parsed output."""
+
+    def __init__(self, structured_model, tracker: LLMUsageTracker):
+        self._model = structured_model
+        self._tracker = tracker
+
+    def invoke(self, prompt):
+        started = time.perf_counter()
+        try:
+            result = self._model.invoke(prompt)
+        except Exception:
+            self._tracker.record(LLMCallRecord(
+                model=self._tracker.model_name,
+                prompt_tokens=estimate_prompt_tokens(prompt, self._tracker.model_name),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                success=False,
+                estimated=True,
+            ))
+            raise
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        raw, parsed = result.get("raw"), result.get("parsed")
+        usage = getattr(raw, "usage_metadata", None)
+        if usage:
+            call = LLMCallRecord(
+                model=self._tracker.model_name,
+                prompt_tokens=usage.get("input_tokens", 0),
+                completion_tokens=usage.get("output_tokens", 0),
+                latency_ms=latency_ms,
+                success=parsed is not None,
+            )
+        else:
+            call = LLMCallRecord(
+                model=self._tracker.model_name,
+                prompt_tokens=estimate_prompt_tokens(prompt, self._tracker.model_name),
+                completion_tokens=count_tokens(str(getattr(raw, "content", "") or ""), self._tracker.model_name),
+                latency_ms=latency_ms,
+                success=parsed is not None,
+                estimated=True,
+            )
+        self._tracker.record(call)
+
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        if parsed is None:
+            raise ValueError("LLM returned no structured output.")
+        return parsed
+
+
+def estimate_prompt_tokens(prompt, model_name: str) -> int:
+    """Estimates the prompt tokens of a call with tiktoken when the API did not report usage."""
+    try:
+        messages = prompt.to_messages()
+        return sum(count_tokens(str(message.content), model_name) for message in messages)
+    except Exception:
+        return count_tokens(str(prompt), model_name)
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percentile / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def get_model_pricing(model_name: str) -> Optional[Tuple[float, float]]:
+    """Returns the (input, output) USD price per million tokens of a model, or None if unknown."""
+    if config.llm_price_per_million_input is not None and config.llm_price_per_million_output is not None:
+        return config.llm_price_per_million_input, config.llm_price_per_million_output
+    # Dated snapshots (e.g. gpt-4o-2024-08-06) are priced like their base model
+    for name in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model_name == name or model_name.startswith(f"{name}-"):
+            return MODEL_PRICING[name]
+    return None
+
+
+def summarize_llm_calls(
+        calls: List[LLMCallRecord],
+        model_name: str,
+        text_tokens_saved: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """
+    Summarizes the LLM calls of a run.
+
+    Args:
+        calls: Call records of the run
+        model_name: Model used for the cost estimate
+        text_tokens_saved: Prompt tokens removed by text compaction per news id
+
+    Returns:
+        Dict with call counts, token totals, tokens saved by text compaction, latency percentiles (ms) and the
+        estimated cost in USD (None if the model price is unknown).
+    """
+    latencies = sorted(call.latency_ms for call in calls)
+    prompt_tokens = sum(call.prompt_tokens for call in calls)
+    completion_tokens = sum(call.completion_tokens for call in calls)
+    pricing = get_model_pricing(model_name)
+
+    return {
+        "model": model_name,
+        "calls": len(calls),
+        "failed_calls": sum(1 for call in calls if not call.success),
+        "estimated_calls": sum(1 for call in calls if call.estimated),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "text_tokens_saved": sum((text_tokens_saved or {}).values()),
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p90": _percentile(latencies, 90),
+        "latency_ms_p99": _percentile(latencies, 99),
+        "latency_ms_max": latencies[-1] if latencies else 0.0,
+        "cost_usd": (
+            round((prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000, 6)
+            if pricing else None
+        ),
+    }
+
+
+def write_metrics_record(record: Dict[str, Any]) -> None:
+    """
+    Writes a per-run metrics record to the configured sink (`config.metrics_sink`).
+
+    Args:
+        record: JSON-serializable metrics of the run
+    """
+    if config.metrics_sink == MetricsSink.NONE:
+        return
+
+    record = {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(), **record}
+    try:
+        if config.metrics_sink == MetricsSink.MONGO:
+            # Imported here so the file sink does not require a database connection
+            from src.utils.db_utils import add_metrics_record
+            add_metrics_record(dict(record))
+        else:
+            directory = os.path.dirname(config.metrics_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(config.metrics_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        logger.error(f"Failed to write metrics record: {e}")
@@ -0,0 +1,279 @@
+"""
+Near-Duplicate Detection Module
+
+This module implements MinHash signatures over word shingles and a banded LSH index used to detect syndicated copies
+of the same story published by several sources. Signatures use one-permutation hashing: each shingle is hashed once
+instead of once per permutation, so a signature costs O(shingles) rather than O(shingles x permutations).
+The index only holds items from a sliding time window and links each near-duplicate to the canonical (first seen)
+item, together with that item's classification once it is known.
+"""
+# Import libraries
+import re
+import heapq
+import random
+import hashlib
+import logging
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASH = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+# Value of a bin no shingle fell into, larger than any hashed value
+_UNSET = 1 << 64
+_WORD_PATTERN = re.compile(r"[a-z0-9$%.]+")
+
+# Module-level hasher and index (create once, reuse across function calls)
+_hasher: Optional["MinHasher"] = None
+_index: Optional["MinHashLSH"] = None
+_index_lock = threading.Lock()
+
+
+def to_epoch(timestamp: datetime.datetime) -> float:
+    """Converts a datetime to epoch seconds, treating naive datetimes (as returned by MongoDB) as UTC."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp.timestamp()
+
+
+def shingle(text: str, size: int = 3) -> Set[int]:
+    """
+    Splits a text into hashed word shingles.
+
+    Args:
+        text: Text to shingle
+        size: Number of consecutive words per shingle
+
+    Returns:
+        Set of 64-bit shingle hashes. Texts shorter than `size` words are shingled word by word.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        for gram in grams
+    }
+
+
+class MinHasher:
+    """
+    Computes fixed-length MinHash signatures by one-permutation hashing.
+
+    Every shingle is hashed once with a seeded multiply-xorshift hash; the high bits pick one of `num_perm` bins and
+    the low bits are the value, of which each bin keeps the minimum. Bins no shingle fell into are filled from the
+    next non-empty bin, offset by their distance to it (rotation densification), so two similar sets still agree on
+    about as many bins as their Jaccard similarity.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._salt = rng.getrandbits(64)
+        self._multiplier = rng.getrandbits(64) | 1
+
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        """
+        Computes the MinHash signature of a shingle set.
+
+        Args:
+            shingles: Shingle hashes produced by `shingle`
+
+        Returns:
+            Tuple of `num_perm` minimum hash values. An empty set yields a signature that matches nothing.
+        """
+        num_perm = self.num_perm
+        if not shingles:
+            return tuple([_MAX_HASH + 1] * num_perm)
+
+        salt, multiplier = self._salt, self._multiplier
+        bins = [_UNSET] * num_perm
+        for h in shingles:
+            mixed = ((h ^ salt) * multiplier) & _MASK_64
+            mixed ^= mixed >> 29
+            slot = (mixed >> 32) % num_perm
+            value = mixed & _MAX_HASH
+            if value < bins[slot]:
+                bins[slot] = value
+
+        if _UNSET in bins:
+            # Walk the bins backwards twice, so every empty bin sees the next non-empty bin to its right
+            filled = bins[:]
+            next_value, distance = _UNSET, 0
+            for i in range(2 * num_perm - 1, -1, -1):
+                slot = i % num_perm
+                if filled[slot] != _UNSET:
+                    next_value, distance = filled[slot], 0
+                    continue
+                distance += 1
+                if i < num_perm:
+                    # Values stay below 2**32, so the offset never produces the empty-set value 2**32
+                    bins[slot] = next_value | (distance << 33)
+        return tuple(bins)
+
+
+class MinHashLSH:
+    """
+    Banded locality-sensitive hashing index over MinHash signatures with a sliding time window.
+
+    Each signature is split into `bands` bands; items sharing at least one identical band become candidates and are
+    confirmed by their estimated Jaccard similarity. Entries older than `window_seconds` are dropped on insertion.
+    """
+
+    def __init__(self, num_perm: int, bands: int, threshold: float, window_seconds: float):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(bands)]
+        self._entries: Dict[str, Tuple[Tuple[int, ...], float]] = {}
+        self._payloads: Dict[str, Any] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _bands_of(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def insert(self, key: str, signature: Tuple[int, ...], timestamp: float, payload: Any = None) -> None:
+        """
+        Adds an item to the index.
+
+        Args:
+            key: Unique id of the item
+            signature: MinHash signature of the item
+            timestamp: Publication time of the item in epoch seconds
+            payload: Optional data attached to the item, e.g. its classification
+        """
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (signature, timestamp)
+            if payload is not None:
+                self._payloads[key] = payload
+            for band, value in self._bands_of(signature):
+                self._buckets[band].setdefault(value, set()).add(key)
+            heapq.heappush(self._expiry_heap, (timestamp, key))
+            self._expire(timestamp)
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """
+        Finds the most similar indexed item above the similarity threshold.
+
+        Args:
+            signature: MinHash signature of the item to look up
+
+        Returns:
+            Tuple of (key, estimated Jaccard similarity) of the best match, or None if there is no match.
+        """
+        with self._lock:
+            candidates: Set[str] = set()
+            for band, value in self._bands_of(signature):
+                bucket = self._buckets[band].get(value)
+                if bucket:
+                    candidates.update(bucket)
+
+            best: Optional[Tuple[str, float]] = None
+            for key in candidates:
+                other = self._entries[key][0]
+                similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            return best
+
+    def get_payload(self, key: str) -> Any:
+        """Returns the payload attached to an item, or None."""
+        return self._payloads.get(key)
+
+    def set_payload(self, key: str, payload: Any) -> None:
+        """Attaches a payload to an indexed item. Unknown keys are ignored."""
+        with self._lock:
+            if key in self._entries:
+                self._payloads[key] = payload
+
+    def _expire(self, newest_timestamp: float) -> None:
+        """Removes entries that fell out of the time window. Caller holds the lock."""
+        cutoff = max(newest_timestamp, datetime.datetime.now(datetime.timezone.utc).timestamp()) - self.window_seconds
+        while self._expiry_heap and self._expiry_heap[0][0] < cutoff:
+            _, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                continue
+            self._payloads.pop(key, None)
+            for band, value in self._bands_of(entry[0]):
+                bucket = self._buckets[band].get(value)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][value]
+
+
+def _warm_index(index: MinHashLSH, hasher: MinHasher) -> None:
+    """Loads the items of the current time window from the database, with their classifications."""
+    # Imported here to keep the MinHash primitives usable without a database connection
+    from src.utils.db_utils import fetch_recent_news
+
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=index.window_seconds)
+    documents = fetch_recent_news(since)
+    for doc in documents:
+        if doc.get("duplicate_of"):
+            continue
+        signature = hasher.signature(shingle(f"{doc.get('title', '')} {doc.get('text', '')}"))
+        index.insert(
+            str(doc["_id"]),
+            signature,
+            to_epoch(doc["timestamp"]),
+            payload={
+                "sentiment": doc.get("sentiment"),
+                "importance": doc.get("importance"),
+                "is_market_relevant": doc.get("is_market_relevant"),
+            },
+        )
+    logger.info(f"Near-duplicate index warmed with {len(index)} items from the database.")
+
+
+def get_minhasher() -> MinHasher:
+    """Returns the process-wide MinHasher configured by `config.near_duplicate_num_perm`."""
+    global _hasher
+    if _hasher is None:
+        _hasher = MinHasher(num_perm=config.near_duplicate_num_perm)
+    return _hasher
+
+
+def get_near_duplicate_index() -> MinHashLSH:
+    """
+    Returns the process-wide near-duplicate index, warming it from the database on first use.
+
+    Returns:
+        The MinHashLSH index configured by `config.near_duplicate_*`.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = MinHashLSH(
+                num_perm=config.near_duplicate_num_perm,
+                bands=config.near_duplicate_bands,
+                threshold=config.near_duplicate_threshold,
+                window_seconds=config.near_duplicate_window_minutes * 60,
+            )
+            try:
+                _warm_index(index, get_minhasher())
+            except Exception as e:
+                logger.error(f"Failed to warm near-duplicate index: {e}")
+            _index = index
+    return _index
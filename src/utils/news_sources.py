@@ -0,0 +1,262 @@
+"""
+News Sources Module
+
+This module holds the registry of news providers and the implementation of the cryptonews-api.com provider. A
+provider fetches one configured source (NewsSourceConfig) incrementally: it receives the state it returned on the
+previous run (high-water mark, HTTP validators) and returns the parsed news items together with its new state.
+
+New providers are added with the `register_provider` decorator and selected per source with its `provider` field.
+"""
+# Import libraries
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from pydantic import BaseModel
+
+from src.config.config import config, NewsSourceConfig
+from src.state import NewsItem
+from src.utils.http import get_http_session
+from src.utils.rate_limit import TokenBucket
+from src.utils.helpers import generate_unique_id
+
+logger = logging.getLogger(__name__)
+
+
+class SourceFetchResult(BaseModel):
+    """Outcome of fetching one news source."""
+    news: List[NewsItem] = []  # Parsed news items
+    state: Dict[str, Any] = {}  # Provider state to pass to the next run
+    pages: int = 0  # Number of pages (requests) fetched
+    new_items: int = 0  # Number of items newer than the previous high-water mark
+    complete: bool = True  # Whether already-seen content (or the end of the feed) was reached
+    failed: bool = False  # Whether a request failed; the previous state is kept in that case
+
+
+NewsProvider = Callable[[NewsSourceConfig, Dict[str, Any], float], SourceFetchResult]
+
+# Provider registry: provider name -> fetch function
+_providers: Dict[str, NewsProvider] = {}
+
+# Per-source rate limiters, kept across runs of a long-lived process
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def register_provider(name: str) -> Callable[[NewsProvider], NewsProvider]:
+    """
+    Registers a news provider implementation.
+
+    The decorated function receives the source configuration, the state it returned on the previous run and the
+    monotonic deadline of the run, and returns a SourceFetchResult.
+    """
+    def decorator(func: NewsProvider) -> NewsProvider:
+        _providers[name] = func
+        return func
+    return decorator
+
+
+def get_provider(name: str) -> NewsProvider:
+    """Returns the provider registered under a name."""
+    try:
+        return _providers[name]
+    except KeyError:
+        raise ValueError(f"Unknown news provider: {name}") from None
+
+
+def get_rate_limiter(source: NewsSourceConfig) -> TokenBucket:
+    """Returns the token bucket limiting the request rate of a source."""
+    with _limiters_lock:
+        limiter = _limiters.get(source.name)
+        if limiter is None:
+            limiter = TokenBucket(rate=source.requests_per_second, capacity=source.burst)
+            _limiters[source.name] = limiter
+        return limiter
+
+
+def _rate_limited_get(source: NewsSourceConfig, url: str, deadline: float, **kwargs) -> requests.Response:
+    """Issues a GET request once the source's rate limit allows it, without waiting past the deadline."""
+    if not get_rate_limiter(source).acquire(max_wait=max(0.0, deadline - time.monotonic())):
+        raise requests.exceptions.Timeout(f"Rate limit of source {source.name} exceeds the latency budget.")
+    timeout = max(0.1, min(source.timeout, deadline - time.monotonic()))
+    return get_http_session().get(url, timeout=timeout, **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# cryptonews-api.com provider
+# -----------------------------------------------------------------------------
+def _page_url(source: NewsSourceConfig, page: int) -> str:
+    """Builds the url of a page, overriding the `items` and `page` parameters of the source url."""
+    parts = urlsplit(source.url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query["items"] = str(config.fetch_page_size)
+    query["page"] = str(page)
+    query["token"] = config.news_api_key.get_secret_value()
+    return urlunsplit(parts._replace(query=urlencode(query, safe=",+")))
+
+
+def parse_cryptonews_items(data: List[Dict[str, Any]]) -> List[NewsItem]:
+    """Parses raw cryptonews-api.com items into NewsItem objects, skipping malformed ones."""
+    news_list: List[NewsItem] = []
+
+    for item in data:
+        try:
+            # 1. Converting time string to a datetime object
+            timestamp_str = item.get("date")
+            timestamp = datetime.strptime(timestamp_str, "%a, %d %b %Y %H:%M:%S %z")
+
+            # 2. Generating a unique ID for each news item
+            news_id = generate_unique_id(item.get("title"), timestamp)
+
+            news = NewsItem(
+                id=news_id,
+                title=item.get("title"),
+                text=item.get("text"),
+                source_name=item.get("source_name"),
+                news_url = item.get("news_url"),
+                image_url=item.get("image_url"),
+                timestamp=timestamp,
+            )
+            news_list.append(news)
+        except Exception as e:
+            logger.error(f"Failed to parse news item: {e}")
+            continue
+
+    return news_list
+
+
+def _fetch_cryptonews_page(
+        source: NewsSourceConfig,
+        page: int,
+        deadline: float,
+        validators: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[List[NewsItem]], requests.Response]:
+    """
+    Fetches and parses one page of a cryptonews-api.com source.
+
+    Returns:
+        Tuple of (parsed news items or None if the server reported no change, raw response).
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = _rate_limited_get(source, _page_url(source, page), deadline, headers=headers)
+    if response.status_code == 304:
+        return None, response
+    response.raise_for_status()
+
+    return parse_cryptonews_items(response.json()["data"]), response
+
+
+def _reaches_high_water_mark(news: List[NewsItem], high_water_mark: Optional[Dict[str, Any]]) -> bool:
+    """Checks whether a page contains content at or below the high-water mark of the previous run."""
+    if high_water_mark is None:
+        return True
+    mark = datetime.fromisoformat(high_water_mark["timestamp"])
+    seen_ids = set(high_water_mark["ids"])
+    return any(item.timestamp < mark or item.id in seen_ids for item in news)
+
+
+def _new_high_water_mark(news: List[NewsItem], previous: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Computes the high-water mark after a run: the newest timestamp and the ids published at that time."""
+    if not news:
+        return previous
+    newest = max(item.timestamp for item in news)
+    if previous is not None and newest < datetime.fromisoformat(previous["timestamp"]):
+        return previous
+    return {
+        "timestamp": newest.isoformat(),
+        "ids": sorted({item.id for item in news if item.timestamp == newest}),
+    }
+
+
+@register_provider("cryptonews")
+def fetch_cryptonews(source: NewsSourceConfig, state: Dict[str, Any], deadline: float) -> SourceFetchResult:
+    """
+    Fetches a cryptonews-api.com endpoint incrementally.
+
+    The first page is requested conditionally (ETag / Last-Modified). While a page is full and newer than the
+    high-water mark of the previous run, the following pages are fetched `config.fetch_page_concurrency` at a time,
+    up to `config.fetch_max_pages` pages.
+    """
+    high_water_mark = state.get("high_water_mark")
+
+    try:
+        first_page, response = _fetch_cryptonews_page(source, 1, deadline, state.get("validators"))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to fetch news from source {source.name}: {e}")
+        return SourceFetchResult(state=state, pages=1, complete=False, failed=True)
+
+    if first_page is None:
+        logger.info(f"Source {source.name} reported no changes since the previous run.")
+        return SourceFetchResult(state=state, pages=1)
+
+    news_list: List[NewsItem] = list(first_page)
+    pages_fetched = 1
+    complete = _reaches_high_water_mark(first_page, high_water_mark) or len(first_page) < config.fetch_page_size
+    failed = False
+
+    # Walk the following pages until already-seen content (or the end of the feed) is reached
+    if not complete and config.fetch_max_pages > 1:
+        with ThreadPoolExecutor(max_workers=config.fetch_page_concurrency, thread_name_prefix="fetch") as executor:
+            next_page = 2
+            while not complete and next_page <= config.fetch_max_pages:
+                pages = range(next_page, min(next_page + config.fetch_page_concurrency, config.fetch_max_pages + 1))
+                try:
+                    results = list(executor.map(lambda page: _fetch_cryptonews_page(source, page, deadline), pages))
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Failed to fetch pages {pages.start}-{pages.stop - 1} of source {source.name}: {e}")
+                    failed = True
+                    break
+
+                for page_news, _ in results:
+                    pages_fetched += 1
+                    news_list.extend(page_news or [])
+                    if not page_news or _reaches_high_water_mark(page_news, high_water_mark) \
+                            or len(page_news) < config.fetch_page_size:
+                        complete = True
+                        break
+                next_page = pages.stop
+
+    # Drop copies of items that moved to the next page while paging
+    news_list = list({news.id: news for news in news_list}.values())
+
+    new_items = news_list
+    if high_water_mark is not None:
+        mark, seen_ids = datetime.fromisoformat(high_water_mark["timestamp"]), set(high_water_mark["ids"])
+        new_items = [news for news in news_list if news.timestamp >= mark and news.id not in seen_ids]
+
+    if not complete and not failed:
+        logger.warning(
+            f"High-water mark of source {source.name} not reached within {config.fetch_max_pages} pages, "
+            f"older items may have been missed."
+        )
+
+    # A failed walk keeps the previous state so the next run walks the same range again
+    new_state = state
+    if not failed:
+        new_state = {
+            "high_water_mark": _new_high_water_mark(news_list, high_water_mark),
+            "validators": {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            },
+        }
+
+    return SourceFetchResult(
+        news=news_list,
+        state=new_state,
+        pages=pages_fetched,
+        new_items=len(new_items),
+        complete=complete,
+        failed=failed,
+    )
@@ -0,0 +1,158 @@
+"""
+Pending Queue Module
+
+This module keeps the news items a run did not finish: items whose classification failed or was deferred by the
+deadline, items that could not be stored, and items whose Telegram message was not sent. They are saved to
+`config.pending_queue_path` with their attempt count and drained first by the next run, so a slow or failing run
+never drops news, even once the items left the news API's first page.
+
+Deferred items were not attempted and keep their attempt count. Failed items count one attempt per run and are
+dropped, with an error in the log, after `config.pending_max_attempts` attempts. Each entry also keeps the canonical
+item of a near-duplicate and whether the item was already announced on Telegram, so a retry neither classifies a
+near-duplicate as a new story nor posts an announced item again.
+
+The file is written atomically (temporary file and rename) with orjson. It is local to the process; instances sharing
+a database use the MongoDB work queue instead (src/utils/work_queue.py).
+"""
+# Import libraries
+import os
+import logging
+import datetime
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+from src.config.config import config
+from src.state import NewsItem
+
+logger = logging.getLogger(__name__)
+
+
+class PendingItem(BaseModel):
+    """News item carried over from an earlier run."""
+    item: NewsItem
+    duplicate_of: Optional[str] = None  # Id of the canonical item if the item is a near-duplicate
+    notified: bool = False  # Whether an earlier run already sent the item to Telegram
+
+
+def _item_fields(item: NewsItem) -> Dict[str, Any]:
+    """Fields of a news item without its id, which keys the entry; orjson encodes the timestamp."""
+    return {field: value for field, value in item.__dict__.items() if field != "id"}
+
+
+# Module-level queue (create once, reuse across function calls)
+_queue: Optional["PendingQueue"] = None
+_queue_lock = threading.Lock()
+
+
+class PendingQueue:
+    """Unfinished news items carried over between runs, persisted as a JSON file."""
+
+    def __init__(self, path: str, max_attempts: int):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Failed to load pending queue, starting empty: {e}")
+            return {}
+
+    def _save(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(self._entries))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save pending queue: {e}")
+
+    @staticmethod
+    def _update_entry(entry: Dict[str, Any], item: NewsItem, duplicate_of: Dict[str, str], notified: Set[str]) -> None:
+        """Stores the item of an entry with its canonical item and notification status; once notified, always so."""
+        entry["item"] = _item_fields(item)
+        entry["duplicate_of"] = duplicate_of.get(item.id)
+        entry["notified"] = entry.get("notified", False) or item.id in notified
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> List[PendingItem]:
+        """Returns the pending news items, oldest first."""
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda entry: entry[1]["queued_at"])
+        return [
+            PendingItem(
+                item=NewsItem.model_validate({"id": news_id, **entry["item"]}),
+                duplicate_of=entry.get("duplicate_of"),
+                notified=entry.get("notified", False),
+            )
+            for news_id, entry in entries
+        ]
+
+    def record(
+            self,
+            finished: Iterable[str],
+            failed: Dict[str, Tuple[NewsItem, str]],
+            deferred: Iterable[NewsItem],
+            duplicate_of: Optional[Dict[str, str]] = None,
+            notified: Iterable[str] = (),
+    ) -> None:
+        """
+        Records the outcome of a run and saves the queue.
+
+        Args:
+            finished: Ids of the items the run finished; they leave the queue
+            failed: Item and error per id of the items that failed; they are retried unless out of attempts
+            deferred: Items the run did not attempt; they are retried without counting an attempt
+            duplicate_of: Canonical item per id of the near-duplicates among the failed and deferred items
+            notified: Ids of the items sent to Telegram by this or an earlier run; retries do not send them again
+        """
+        duplicate_of = duplicate_of or {}
+        notified = set(notified)
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        dropped = []
+        with self._lock:
+            for news_id in finished:
+                self._entries.pop(news_id, None)
+
+            for news_id, (item, error) in failed.items():
+                entry = self._entries.setdefault(news_id, {"queued_at": now, "attempts": 0})
+                self._update_entry(entry, item, duplicate_of, notified)
+                entry["last_error"] = error
+                entry["attempts"] += 1
+                if entry["attempts"] >= self.max_attempts:
+                    dropped.append((news_id, error))
+                    del self._entries[news_id]
+
+            for item in deferred:
+                entry = self._entries.setdefault(item.id, {"queued_at": now, "attempts": 0})
+                self._update_entry(entry, item, duplicate_of, notified)
+
+            self._save()
+            size = len(self._entries)
+
+        for news_id, error in dropped:
+            logger.error(f"Dropped news item {news_id} after {self.max_attempts} failed attempts: {error}")
+        logger.info(f"Pending queue holds {size} news items.")
+
+
+def get_pending_queue() -> PendingQueue:
+    """Returns the pending queue of this process, loading it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = PendingQueue(config.pending_queue_path, config.pending_max_attempts)
+            logger.info(f"Pending queue loaded with {len(_queue)} news items.")
+    return _queue
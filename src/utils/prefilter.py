@@ -0,0 +1,366 @@
+"""
+Local Pre-filter Classifier Module
+
+This module implements a lightweight local classifier trained on the classifications the LLM already produced. Each
+article is turned into hashed TF-IDF features (title words, body unigrams and bigrams) and scored by one softmax
+regression per output field: sentiment, importance and market relevance. Items whose every field is predicted with a
+probability of at least `config.prefilter_confidence_threshold` are answered locally; the others are sent to the LLM.
+A small, deterministic share of the confident items is still sent to the LLM (shadow sample) to measure how often the
+local answer agrees with it in production.
+
+The model is trained with `python -m src.train_prefilter` and stored as JSON at `config.prefilter_model_path`.
+"""
+# Import libraries
+import os
+import re
+import json
+import math
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import xxhash
+
+from src.config.config import config
+from src.state import Sentiment, Importance
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"[a-z0-9$%]+")
+# Only the lead of the body is used; it carries the classification and bounds the per-item cost
+_MAX_BODY_WORDS = 300
+
+# Output fields and their classes, in the order the weights are stored
+FIELDS: Dict[str, Tuple[str, ...]] = {
+    "sentiment": tuple(sentiment.value for sentiment in Sentiment),
+    "importance": tuple(importance.value for importance in Importance),
+    "is_market_relevant": ("false", "true"),
+}
+
+# Per-item outcomes of the pre-filter stage
+PREFILTER_LOCAL = "local"  # Answered locally, no LLM call
+PREFILTER_UNCERTAIN = "uncertain"  # Below the confidence threshold, classified by the LLM
+PREFILTER_AGREE = "shadow_agree"  # Confident, sent to the LLM as shadow sample, same classification
+PREFILTER_DISAGREE = "shadow_disagree"  # Confident, sent to the LLM as shadow sample, different classification
+
+# Module-level model (load once, reuse across function calls)
+_model: Optional["PrefilterModel"] = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _encode_label(field: str, value: Any) -> str:
+    """Converts a stored field value to the class name used by the model."""
+    if field == "is_market_relevant":
+        return "true" if value else "false"
+    return getattr(value, "value", value)
+
+
+def _decode_label(field: str, label: str) -> Any:
+    """Converts a class name of the model to the field value of a classification."""
+    if field == "is_market_relevant":
+        return label == "true"
+    return label
+
+
+def extract_terms(title: str, text: str, n_features: int) -> Dict[int, int]:
+    """
+    Hashes the words of an article into feature buckets.
+
+    Title words are hashed separately from body words, and body bigrams are added to the unigrams.
+
+    Args:
+        title: Title of the article
+        text: Body of the article
+        n_features: Number of hash buckets
+
+    Returns:
+        Term count per feature bucket.
+    """
+    title_words = _WORD_PATTERN.findall((title or "").lower())
+    body_words = _WORD_PATTERN.findall((text or "").lower())[:_MAX_BODY_WORDS]
+
+    terms = [f"t:{word}" for word in title_words]
+    terms.extend(body_words)
+    terms.extend(f"{first} {second}" for first, second in zip(body_words, body_words[1:]))
+
+    counts: Dict[int, int] = {}
+    for term in terms:
+        bucket = xxhash.xxh64_intdigest(term) % n_features
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+
+class PrefilterModel:
+    """
+    Hashed TF-IDF features with one softmax regression per output field.
+
+    Args:
+        n_features: Number of hash buckets
+        idf: Inverse document frequency per bucket seen during training
+        weights: Per field, the class weights per bucket
+        biases: Per field, the class biases
+        metadata: Training details (date, sample sizes, held-out evaluation)
+    """
+
+    def __init__(
+            self,
+            n_features: int,
+            idf: Optional[Dict[int, float]] = None,
+            weights: Optional[Dict[str, Dict[int, List[float]]]] = None,
+            biases: Optional[Dict[str, List[float]]] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.n_features = n_features
+        self.idf = idf or {}
+        self.weights = weights or {field: {} for field in FIELDS}
+        self.biases = biases or {field: [0.0] * len(classes) for field, classes in FIELDS.items()}
+        self.metadata = metadata or {}
+
+    def vectorize(self, title: str, text: str) -> List[Tuple[int, float]]:
+        """Builds the L2-normalized, sublinear TF-IDF vector of an article; buckets unseen in training are dropped."""
+        return self._weigh(extract_terms(title, text, self.n_features))
+
+    def _weigh(self, counts: Dict[int, int]) -> List[Tuple[int, float]]:
+        vector = [
+            (bucket, (1 + math.log(count)) * self.idf[bucket])
+            for bucket, count in counts.items()
+            if bucket in self.idf
+        ]
+        norm = math.sqrt(sum(value * value for _, value in vector))
+        if norm == 0:
+            return []
+        return [(bucket, value / norm) for bucket, value in vector]
+
+    def _probabilities(self, field: str, vector: List[Tuple[int, float]]) -> List[float]:
+        scores = list(self.biases[field])
+        field_weights = self.weights[field]
+        for bucket, value in vector:
+            bucket_weights = field_weights.get(bucket)
+            if bucket_weights is not None:
+                for k, weight in enumerate(bucket_weights):
+                    scores[k] += weight * value
+        return _softmax(scores)
+
+    def predict(self, title: str, text: str) -> Tuple[Dict[str, Any], float]:
+        """
+        Classifies an article.
+
+        Returns:
+            Tuple of the classification (sentiment, importance, is_market_relevant) and its confidence, the lowest
+            top-class probability over the fields.
+        """
+        vector = self.vectorize(title, text)
+        classification: Dict[str, Any] = {}
+        confidence = 1.0
+        for field, classes in FIELDS.items():
+            probabilities = self._probabilities(field, vector)
+            best = max(range(len(classes)), key=probabilities.__getitem__)
+            classification[field] = _decode_label(field, classes[best])
+            confidence = min(confidence, probabilities[best])
+        return classification, confidence
+
+    def fit(
+            self,
+            documents: Sequence[Dict[str, Any]],
+            epochs: int = 8,
+            learning_rate: float = 0.5,
+            l2: float = 1e-5,
+            seed: int = 1,
+    ) -> None:
+        """
+        Trains the model with stochastic gradient descent on labeled documents.
+
+        Args:
+            documents: Documents with title, text, sentiment, importance and is_market_relevant
+            epochs: Passes over the training documents
+            learning_rate: Initial step size, decayed after every epoch
+            l2: L2 regularization strength
+            seed: Seed of the shuffling
+        """
+        terms = [extract_terms(doc.get("title", ""), doc.get("text", ""), self.n_features) for doc in documents]
+
+        document_frequency: Dict[int, int] = {}
+        for counts in terms:
+            for bucket in counts:
+                document_frequency[bucket] = document_frequency.get(bucket, 0) + 1
+        n_documents = len(documents)
+        self.idf = {
+            bucket: math.log((1 + n_documents) / (1 + frequency)) + 1
+            for bucket, frequency in document_frequency.items()
+        }
+
+        vectors = [self._weigh(counts) for counts in terms]
+        targets = [
+            {field: classes.index(_encode_label(field, doc[field])) for field, classes in FIELDS.items()}
+            for doc in documents
+        ]
+        self.weights = {field: {} for field in FIELDS}
+        self.biases = {field: [0.0] * len(classes) for field, classes in FIELDS.items()}
+
+        order = list(range(n_documents))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            step = learning_rate / (1 + epoch)
+            for i in order:
+                vector = vectors[i]
+                for field, classes in FIELDS.items():
+                    probabilities = self._probabilities(field, vector)
+                    gradient = [probabilities[k] - (k == targets[i][field]) for k in range(len(classes))]
+                    field_weights = self.weights[field]
+                    for bucket, value in vector:
+                        bucket_weights = field_weights.setdefault(bucket, [0.0] * len(classes))
+                        for k in range(len(classes)):
+                            bucket_weights[k] -= step * (gradient[k] * value + l2 * bucket_weights[k])
+                    bias = self.biases[field]
+                    for k in range(len(classes)):
+                        bias[k] -= step * gradient[k]
+
+    def save(self, path: str) -> None:
+        """Writes the model as JSON, replacing the file atomically."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "n_features": self.n_features,
+            "metadata": self.metadata,
+            "idf": {str(bucket): round(value, 5) for bucket, value in self.idf.items()},
+            "weights": {
+                field: {
+                    str(bucket): [round(weight, 5) for weight in bucket_weights]
+                    for bucket, bucket_weights in field_weights.items()
+                    if any(abs(weight) >= 1e-5 for weight in bucket_weights)
+                }
+                for field, field_weights in self.weights.items()
+            },
+            "biases": self.biases,
+        }
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PrefilterModel":
+        """Reads a model written by `save`."""
+        with open(path) as f:
+            payload = json.load(f)
+        return cls(
+            n_features=payload["n_features"],
+            idf={int(bucket): value for bucket, value in payload["idf"].items()},
+            weights={
+                field: {int(bucket): weights for bucket, weights in field_weights.items()}
+                for field, field_weights in payload["weights"].items()
+            },
+            biases=payload["biases"],
+            metadata=payload.get("metadata", {}),
+        )
+
+
+def evaluate_model(
+        model: PrefilterModel,
+        documents: Iterable[Dict[str, Any]],
+        thresholds: Iterable[float],
+) -> Dict[str, Any]:
+    """
+    Compares the model's predictions with the stored (LLM) labels.
+
+    Args:
+        model: Trained model
+        documents: Labeled held-out documents
+        thresholds: Confidence thresholds to report coverage and agreement for
+
+    Returns:
+        Dict with the number of documents, the accuracy per field and, per threshold, the share of documents answered
+        locally (LLM-call reduction) and the share of those whose full classification matches the label.
+    """
+    predictions = []
+    for doc in documents:
+        classification, confidence = model.predict(doc.get("title", ""), doc.get("text", ""))
+        matches = {field: classification[field] == _decode_label(field, _encode_label(field, doc[field]))
+                   for field in FIELDS}
+        predictions.append((confidence, matches))
+
+    total = len(predictions)
+    report: Dict[str, Any] = {
+        "documents": total,
+        "field_accuracy": {
+            field: round(sum(matches[field] for _, matches in predictions) / total, 4) if total else 0.0
+            for field in FIELDS
+        },
+        "thresholds": {},
+    }
+    for threshold in thresholds:
+        confident = [matches for confidence, matches in predictions if confidence >= threshold]
+        report["thresholds"][str(threshold)] = {
+            "llm_call_reduction": round(len(confident) / total, 4) if total else 0.0,
+            "agreement": (
+                round(sum(all(matches.values()) for matches in confident) / len(confident), 4) if confident else 1.0
+            ),
+        }
+    return report
+
+
+def in_shadow_sample(news_id: str, rate: float) -> bool:
+    """Deterministically selects a share `rate` of the news ids; the same id is always selected or not."""
+    return xxhash.xxh64_intdigest(f"shadow:{news_id}") % 10_000 < rate * 10_000
+
+
+def summarize_prefilter(results: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Summarizes the per-item outcomes of the pre-filter stage.
+
+    Args:
+        results: Outcome per news id (local, uncertain, shadow_agree or shadow_disagree)
+
+    Returns:
+        Dict with the items considered, the items answered locally, the LLM-call reduction rate and the agreement
+        rate with the LLM on the shadow sample (None without shadow items).
+    """
+    outcomes = list(results.values())
+    local = outcomes.count(PREFILTER_LOCAL)
+    agree, disagree = outcomes.count(PREFILTER_AGREE), outcomes.count(PREFILTER_DISAGREE)
+    return {
+        "prefilter_items": len(outcomes),
+        "prefilter_local": local,
+        "llm_call_reduction": round(local / len(outcomes), 4) if outcomes else 0.0,
+        "prefilter_shadow": agree + disagree,
+        "prefilter_agreement": round(agree / (agree + disagree), 4) if agree + disagree else None,
+    }
+
+
+def get_prefilter() -> Optional[PrefilterModel]:
+    """
+    Returns the process-wide pre-filter model, loading it on first use.
+
+    Returns:
+        The model stored at `config.prefilter_model_path`, or None if it does not exist or cannot be read, in which
+        case every item is sent to the LLM.
+    """
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            try:
+                _model = PrefilterModel.load(config.prefilter_model_path)
+                logger.info(
+                    f"Loaded pre-filter model trained at {_model.metadata.get('trained_at', 'unknown time')} "
+                    f"on {_model.metadata.get('train_documents', '?')} documents."
+                )
+            except FileNotFoundError:
+                logger.warning(
+                    f"No pre-filter model at {config.prefilter_model_path}; train one with "
+                    f"python -m src.train_prefilter. Sending every item to the LLM."
+                )
+            except Exception as e:
+                logger.error(f"Failed to load pre-filter model: {e}")
+    return _model
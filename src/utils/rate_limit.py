@@ -0,0 +1,75 @@
+"""
+Rate Limiting Module
+
+This module provides a thread-safe token bucket used to keep outgoing requests within provider rate limits. The
+bucket hands out reservations (the delay the caller must wait) instead of sleeping itself, so it can be used from
+both threads and asyncio coroutines.
+"""
+# Import libraries
+import time
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserves tokens, possibly in the future.
+
+        Args:
+            tokens: Number of tokens to take
+            max_wait: Maximum acceptable delay in seconds; None accepts any delay
+
+        Returns:
+            Seconds the caller must wait before proceeding, or None if that would exceed `max_wait`
+            (nothing is reserved in that case).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and delay > max_wait:
+                return None
+            # Tokens may go negative: later callers queue up behind this reservation
+            self._tokens -= tokens
+            return delay
+
+    def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> bool:
+        """
+        Blocks until tokens are available.
+
+        Args:
+            tokens: Number of tokens to take
+            max_wait: Maximum time to wait in seconds; None waits as long as needed
+
+        Returns:
+            True if the tokens were acquired, False if that would have taken longer than `max_wait`.
+        """
+        delay = self.reserve(tokens, max_wait)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def penalize(self, seconds: float) -> None:
+        """Empties the bucket so that no tokens are available for the given number of seconds (e.g. on HTTP 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, -seconds * self.rate)
@@ -0,0 +1,82 @@
+"""
+State Serializer Module
+
+This module holds the serializer of the LangGraph checkpoints. LangGraph's default serializer (JsonPlusSerializer)
+encodes every pydantic model in a generic way: its module and class name plus a `model_dump()`, packed separately for
+every model, and rebuilt by importing the class. The graph state holds hundreds of news items and classifications, so
+`StateSerializer` encodes the models of src/state.py, and the `Send` objects that carry them to the item branches of
+the streaming graph, as msgpack extension types instead: a one-byte type code and the fields of the model, packed by
+ormsgpack (datetimes and enums natively). They are rebuilt by validating the fields, which also restores the
+datetimes and enums.
+
+Any other value, and checkpoints written by the default serializer, are handled by JsonPlusSerializer unchanged.
+"""
+# Import libraries
+from typing import Any, Dict, Tuple, Type
+
+import ormsgpack
+from pydantic import BaseModel
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer, _msgpack_default, _msgpack_ext_hook
+from langgraph.types import Send
+
+from src.state import Classification, ItemTaskState, LLMCallRecord, NewsItem, ProcessedNewsItem, TelegramDelivery
+
+# Extension type code per model; JsonPlusSerializer uses the codes 0 to 6. Codes must never be reused for another
+# model, or checkpoints written before the change would be decoded as the wrong model.
+_MODEL_CODES: Dict[Type[BaseModel], int] = {
+    NewsItem: 64,
+    Classification: 65,
+    ProcessedNewsItem: 66,
+    TelegramDelivery: 67,
+    LLMCallRecord: 68,
+    ItemTaskState: 69,
+}
+_MODELS = {code: model for model, code in _MODEL_CODES.items()}
+# Extension type code of langgraph's Send, which carries an ItemTaskState to each item branch of the streaming graph
+_SEND_CODE = 96
+
+# Options of the checkpoint as a whole, the same as JsonPlusSerializer's so other values keep their encoding
+_OPTION = (
+    ormsgpack.OPT_NON_STR_KEYS
+    | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+    | ormsgpack.OPT_PASSTHROUGH_ENUM
+    | ormsgpack.OPT_PASSTHROUGH_UUID
+)
+
+
+def _default(obj: Any) -> Any:
+    """Encodes the models of the state as extension types and leaves anything else to JsonPlusSerializer."""
+    code = _MODEL_CODES.get(type(obj))
+    if code is not None:
+        # Fields are packed as they are, without model_dump(); nested models become extension types themselves
+        return ormsgpack.Ext(code, ormsgpack.packb(obj.__dict__, default=_default, option=ormsgpack.OPT_NON_STR_KEYS))
+    if type(obj) is Send:
+        return ormsgpack.Ext(_SEND_CODE, ormsgpack.packb((obj.node, obj.arg), default=_default, option=_OPTION))
+    return _msgpack_default(obj)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    """Rebuilds the models of the state and leaves the extension types of JsonPlusSerializer to it."""
+    model = _MODELS.get(code)
+    if model is not None:
+        return model.model_validate(ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS))
+    if code == _SEND_CODE:
+        return Send(*ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS))
+    return _msgpack_ext_hook(code, data)
+
+
+class StateSerializer(JsonPlusSerializer):
+    """Checkpoint serializer with a compact encoding of the models of the graph state."""
+
+    def __init__(self):
+        super().__init__(__unpack_ext_hook__=_ext_hook)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            return "msgpack", ormsgpack.packb(obj, default=_default, option=_OPTION)
+        except ormsgpack.MsgpackEncodeError:
+            # E.g. strings that are not valid UTF-8, which the fallbacks of the default serializer handle
+            return super().dumps_typed(obj)
@@ -0,0 +1,189 @@
+"""
+Telegram Sender Module
+
+This module sends Telegram messages asynchronously on a pooled HTTP client. Sending is bounded in concurrency and
+throttled by token buckets tuned to Telegram's limits (a global messages-per-second limit and a per-chat
+messages-per-minute limit). HTTP 429 responses are retried after the `retry_after` Telegram asks for, and transient
+errors are retried with exponential backoff, so bursts go out as fast as Telegram allows without losing messages.
+Only errors raised before the request reached Telegram (connecting, waiting for a pooled connection) are retried. After
+any other error, such as a read timeout, Telegram may already have posted the message. Such a delivery is reported
+with an unknown outcome and is neither resent nor carried over, so a message is never posted twice.
+Given a deadline, no attempt is started past it; the message is reported as failed so it can be carried over.
+
+The sender owns a background event loop, so the pooled client stays warm across pipeline runs while the graph itself
+remains synchronous.
+"""
+# Import libraries
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+
+import httpx
+
+from src.config.config import config
+from src.utils.rate_limit import TokenBucket
+from src.state import ProcessedNewsItem, TelegramDelivery
+from src.utils.helpers import _build_telegram_message
+
+logger = logging.getLogger(__name__)
+
+# Module-level sender (create once, reuse across function calls)
+_sender: Optional["TelegramSender"] = None
+_sender_lock = threading.Lock()
+
+# Errors raised before the request reached Telegram, the only ones that are safe to retry
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class TelegramSender:
+    """Asynchronous, rate-limited Telegram message sender running on its own event loop thread."""
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(rate=config.telegram_global_rate, capacity=config.telegram_global_rate)
+        self.chat_bucket = TokenBucket(
+            rate=config.telegram_chat_rate_per_minute / 60,
+            capacity=config.telegram_chat_rate_per_minute,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="telegram-sender", daemon=True)
+        self._thread.start()
+        self._client = self._run(self._create_client())
+
+    def _run(self, coroutine, timeout: Optional[float] = None):
+        """Runs a coroutine on the sender's event loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=config.http_timeout,
+            limits=httpx.Limits(
+                max_connections=config.telegram_max_concurrency,
+                max_keepalive_connections=config.telegram_max_concurrency,
+            ),
+        )
+
+    async def _wait_for_tokens(self) -> None:
+        """Waits until both the global and the per-chat rate limits allow one more message."""
+        delay = max(self.global_bucket.reserve(), self.chat_bucket.reserve())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send_one(
+            self,
+            news: ProcessedNewsItem,
+            semaphore: asyncio.Semaphore,
+            deadline: Optional[float] = None,
+    ) -> TelegramDelivery:
+        """Sends one message, retrying rate-limited and transient failures until the deadline, if any."""
+        url = f"{config.telegram_api_url}/bot{config.bot_token.get_secret_value()}/sendMessage"
+        payload = {
+            "chat_id": config.group_id.get_secret_value(),
+            "text": _build_telegram_message(news),
+            "parse_mode": "Markdown",
+            "disable_web_page_preview": True
+        }
+
+        delivery = TelegramDelivery(id=news.id)
+        backoff = 1.0
+        async with semaphore:
+            while delivery.attempts < config.telegram_max_attempts:
+                await self._wait_for_tokens()
+                if deadline is not None and time.time() >= deadline:
+                    delivery.error = delivery.error or "deadline exceeded"
+                    break
+                delivery.attempts += 1
+                try:
+                    response = await self._client.post(url, json=payload)
+                except _RETRYABLE_ERRORS as e:
+                    delivery.error = f"{type(e).__name__}: {e}"
+                    await asyncio.sleep(backoff)
+                    backoff *= 2
+                    continue
+                except httpx.HTTPError as e:
+                    delivery.error = f"{type(e).__name__}: {e}"
+                    delivery.outcome_unknown = True
+                    logger.warning(f"Telegram outcome unknown for {news.id}, not sending it again: {delivery.error}")
+                    return delivery
+
+                delivery.status_code = response.status_code
+                if response.status_code == 200:
+                    delivery.success = True
+                    delivery.error = None
+                    delivery.message_id = response.json().get("result", {}).get("message_id")
+                    return delivery
+
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                delivery.error = body.get("description") or response.text[:200]
+
+                if response.status_code == 429:
+                    # Telegram tells us how long to back off; stop every other send for that long as well
+                    retry_after = float(body.get("parameters", {}).get("retry_after", backoff))
+                    logger.warning(f"Telegram rate limit hit, retrying {news.id} after {retry_after}s.")
+                    self.global_bucket.penalize(retry_after)
+                    self.chat_bucket.penalize(retry_after)
+                    continue
+                if response.status_code >= 500:
+                    await asyncio.sleep(backoff)
+                    backoff *= 2
+                    continue
+
+                # Other client errors (bad request, forbidden...) will not succeed on retry
+                break
+
+        logger.error(f"Telegram failed for {news.id} after {delivery.attempts} attempts: {delivery.error}")
+        return delivery
+
+    async def _send_all(
+            self,
+            news_list: List[ProcessedNewsItem],
+            deadline: Optional[float] = None,
+    ) -> List[TelegramDelivery]:
+        semaphore = asyncio.Semaphore(config.telegram_max_concurrency)
+        return list(await asyncio.gather(*(self._send_one(news, semaphore, deadline) for news in news_list)))
+
+    def send_many(self, news_list: List[ProcessedNewsItem], deadline: Optional[float] = None) -> List[TelegramDelivery]:
+        """
+        Sends news items to the Telegram group.
+
+        Args:
+            news_list: Processed news items to send
+            deadline: Unix time after which no attempt is started; unsent messages are reported as failed
+
+        Returns:
+            One delivery result per news item, in the order of `news_list`.
+        """
+        if not news_list:
+            return []
+        return self._run(self._send_all(news_list, deadline))
+
+    def close(self) -> None:
+        """Closes the HTTP client and stops the event loop."""
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def get_telegram_sender() -> TelegramSender:
+    """Returns the process-wide Telegram sender, creating it on first use."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = TelegramSender()
+            logger.info("Telegram sender initialized.")
+    return _sender
+
+
+def close_telegram_sender() -> None:
+    """Closes the process-wide Telegram sender."""
+    global _sender
+    with _sender_lock:
+        if _sender is not None:
+            _sender.close()
+            _sender = None
+            logger.info("Telegram sender closed.")
@@ -0,0 +1,143 @@
+"""
+Text Compaction Module
+
+This module shrinks article bodies before they are sent to the LLM. It strips markup and publisher boilerplate
+(read-more links, subscription calls, disclaimers, "appeared first on" footers), collapses whitespace, and truncates
+the text to a token budget measured with tiktoken at a sentence boundary, so the lead of the article is kept. The
+headline is sent separately and is never truncated.
+"""
+# Import libraries
+import re
+import html
+import logging
+from typing import List
+
+from pydantic import BaseModel
+
+from src.utils.tokens import count_tokens, get_encoding
+
+logger = logging.getLogger(__name__)
+
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_MARKDOWN_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'A-Z0-9$])")
+
+# Sentences matching any of these carry no information about the news itself
+_BOILERPLATE_RE = re.compile(
+    r"^\s*(?:"
+    r"read (?:more|also|next)\b|also read\b|related\b\s*:|see also\b|"
+    r"subscribe\b|sign up\b|join (?:our|us)\b|follow us\b|click here\b|"
+    r"share (?:this|on)\b|advertisement\b|sponsored\b|"
+    r"(?:image|photo|featured image|cover image)\s*(?:source|credit|by)?\s*:|"
+    r"disclaimer\b|this article (?:is|does) not (?:constitute )?(?:financial|investment) advice\b|"
+    r"not (?:financial|investment) advice\b"
+    r")"
+    r"|\bappeared first on\b",
+    re.IGNORECASE,
+)
+
+
+class CompactedText(BaseModel):
+    """Article body prepared for the LLM prompt."""
+    text: str  # Compacted text
+    original_tokens: int  # Tokens of the original text
+    tokens: int  # Tokens of the compacted text
+    truncated: bool = False  # Whether the token budget cut off part of the text
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+def clean_text(text: str, title: str = "") -> str:
+    """
+    Removes markup, links and boilerplate sentences and collapses whitespace.
+
+    Args:
+        text: Raw article body
+        title: Article headline; a body that starts by repeating it has the repetition removed
+
+    Returns:
+        The cleaned text on a single line.
+    """
+    text = html.unescape(_TAG_RE.sub(" ", text))
+    text = _MARKDOWN_LINK_RE.sub(r"\1", text)
+    text = _URL_RE.sub(" ", text)
+
+    # Split per line first so a boilerplate line without terminal punctuation does not swallow the next sentence
+    sentences = [
+        sentence
+        for line in text.splitlines()
+        for sentence in split_sentences(_WHITESPACE_RE.sub(" ", line))
+        if not _BOILERPLATE_RE.search(sentence)
+    ]
+
+    # The headline is already part of the prompt
+    headline = _WHITESPACE_RE.sub(" ", title).strip().rstrip(".!?").lower()
+    if sentences and headline and sentences[0].rstrip(".!?").lower() == headline:
+        sentences = sentences[1:]
+
+    return " ".join(sentences)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text into sentences at terminal punctuation followed by a capital letter, digit or quote."""
+    return [sentence for sentence in _SENTENCE_END_RE.split(text.strip()) if sentence]
+
+
+def _truncate_tokens(text: str, max_tokens: int, model_name: str) -> str:
+    """Cuts text to at most `max_tokens` tokens at a word boundary."""
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        # Same four characters per token approximation as count_tokens
+        cut = text[:max_tokens * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    if len(cut) < len(text) and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip()
+
+
+def compact_text(text: str, title: str, model_name: str, max_tokens: int) -> CompactedText:
+    """
+    Cleans an article body and fits it into a token budget, keeping the lead.
+
+    Whole sentences are kept from the start of the cleaned text while they fit in the budget; if even the first
+    sentence does not fit, it is cut at a word boundary.
+
+    Args:
+        text: Raw article body
+        title: Article headline (not counted against the budget)
+        model_name: Model whose tokenizer measures the budget
+        max_tokens: Token budget of the compacted text
+
+    Returns:
+        CompactedText with the compacted text and its token counts.
+    """
+    original_tokens = count_tokens(text, model_name)
+    # A body that is nothing but boilerplate is sent as is rather than as an empty string
+    cleaned = clean_text(text, title) or _WHITESPACE_RE.sub(" ", text).strip()
+
+    tokens = count_tokens(cleaned, model_name)
+    if tokens <= max_tokens:
+        return CompactedText(text=cleaned, original_tokens=original_tokens, tokens=tokens)
+
+    kept: List[str] = []
+    used = 0
+    for sentence in split_sentences(cleaned):
+        # The joining space is counted with the sentence
+        sentence_tokens = count_tokens(f" {sentence}" if kept else sentence, model_name)
+        if used + sentence_tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += sentence_tokens
+
+    compacted = " ".join(kept) if kept else _truncate_tokens(cleaned, max_tokens, model_name)
+    return CompactedText(
+        text=compacted,
+        original_tokens=original_tokens,
+        tokens=count_tokens(compacted, model_name),
+        truncated=True,
+    )
@@ -0,0 +1,57 @@
+"""
+Token Counting Module
+
+This module counts tokens with tiktoken, using the encoding of the configured model. Encodings are loaded once per
+process; when an encoding cannot be loaded (e.g. no network access to download it), counts fall back to an
+approximation of four characters per token.
+"""
+# Import libraries
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = logging.getLogger(__name__)
+
+_FALLBACK_CHARS_PER_TOKEN = 4
+
+# Module-level encodings (load once, reuse across function calls); None marks an encoding that failed to load
+_encodings: Dict[str, Optional["tiktoken.Encoding"]] = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(model_name: str) -> Optional["tiktoken.Encoding"]:
+    """
+    Returns the tiktoken encoding of a model.
+
+    Args:
+        model_name: OpenAI model name, e.g. gpt-4o
+
+    Returns:
+        The encoding, or None if it could not be loaded.
+    """
+    with _encodings_lock:
+        if model_name not in _encodings:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(model_name)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"Failed to load tiktoken encoding for {model_name}, approximating token counts: {e}")
+                encoding = None
+            _encodings[model_name] = encoding
+        return _encodings[model_name]
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    """Counts the tokens of a text for a model."""
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return -(-len(text) // _FALLBACK_CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
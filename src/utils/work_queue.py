@@ -0,0 +1,461 @@
+"""
+Work Queue Module
+
+This module coordinates several pipeline instances (processes or nodes) sharing one MongoDB database. Unseen news
+items are enqueued in the `work_queue` collection, idempotently by `_id`, and each item is processed by exactly one
+worker at a time:
+
+- A worker claims items one by one with an atomic `find_one_and_update` that sets a lease (owner and expiry) and
+  counts the attempt. Claimable items are pending ones whose retry delay has passed, and leased ones whose lease
+  expired because their worker crashed or hung.
+- While the worker holds items, a background thread renews their leases every third of the lease duration. A lease
+  that could not be renewed was taken over by another worker and is dropped.
+- Every state change after the claim is fenced by the lease owner. A worker whose lease was taken over can neither
+  complete the item nor notify it.
+- An item is completed once it is stored and notified. An item deferred by the deadline of the run is released
+  right away without counting the attempt. A failed item is released for a retry after an exponential delay. After
+  `config.work_queue_max_attempts` attempts it is moved to the dead letter state, also when its worker keeps
+  crashing on it, and can be requeued with `python -m src.work_queue`.
+- Telegram notifications are claimed per item (`notified_at`) before they are sent and released again if sending
+  failed, so an item is never announced twice, even when it is processed again after a crash.
+
+Finished items are removed by a TTL index after `config.work_queue_retention_seconds`.
+"""
+# Import libraries
+import os
+import uuid
+import socket
+import logging
+import datetime
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config.config import config
+from src.state import NewsItem
+from src.utils.db_utils import get_database
+
+logger = logging.getLogger(__name__)
+
+# Item states
+QUEUE_PENDING = "pending"
+QUEUE_LEASED = "leased"
+QUEUE_DONE = "done"
+QUEUE_DEAD = "dead"
+QUEUE_STATES = (QUEUE_PENDING, QUEUE_LEASED, QUEUE_DONE, QUEUE_DEAD)
+
+# Longest delay before a failed item is retried
+_MAX_RETRY_DELAY_SECONDS = 3600
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def new_worker_id() -> str:
+    """Builds an id that is unique across processes and hosts, e.g. host-1234-1a2b3c4d."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class WorkQueue:
+    """MongoDB-backed work queue of news items with lease-based claiming. See the module docstring."""
+
+    def __init__(self, collection, worker_id: str, lease_seconds: float, max_attempts: int,
+                 retry_backoff_seconds: float):
+        self.collection = collection
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._held: Set[str] = set()
+        self._held_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def ensure_indexes(self, retention_seconds: float) -> None:
+        """Creates the indexes of the claim queries and the TTL index removing finished items."""
+        from pymongo import ASCENDING
+
+        try:
+            self.collection.create_index(
+                [("status", ASCENDING), ("available_at", ASCENDING), ("enqueued_at", ASCENDING)],
+                name="status_available",
+            )
+            self.collection.create_index(
+                [("status", ASCENDING), ("lease_expires_at", ASCENDING)],
+                name="status_lease",
+            )
+            self.collection.create_index(
+                "finished_at",
+                name="finished_ttl",
+                expireAfterSeconds=int(retention_seconds),
+            )
+        except Exception as e:
+            logger.error(f"Failed to ensure work queue indexes: {e}")
+
+    def _leased_by_me(self, news_ids: Iterable[str]) -> Dict[str, Any]:
+        return {"_id": {"$in": list(news_ids)}, "status": QUEUE_LEASED, "lease_owner": self.worker_id}
+
+    def _release(self, news_ids: Iterable[str]) -> None:
+        with self._held_lock:
+            self._held.difference_update(news_ids)
+
+    def enqueue(self, news: List[NewsItem], duplicate_of: Optional[Dict[str, str]] = None) -> int:
+        """
+        Adds news items to the queue. Items already queued, in any state, are left untouched.
+
+        Args:
+            news: News items to enqueue
+            duplicate_of: Id of the canonical item per near-duplicate
+
+        Returns:
+            Number of items that were not queued yet.
+        """
+        if not news:
+            return 0
+        from pymongo import UpdateOne
+
+        duplicate_of = duplicate_of or {}
+        now = _now()
+        operations = [
+            UpdateOne(
+                {"_id": item.id},
+                {"$setOnInsert": {
+                    "item": {field: value for field, value in item.__dict__.items() if field != "id"},
+                    "duplicate_of": duplicate_of.get(item.id),
+                    "status": QUEUE_PENDING,
+                    "attempts": 0,
+                    "enqueued_at": now,
+                    "available_at": now,
+                }},
+                upsert=True,
+            )
+            for item in news
+        ]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            return result.upserted_count
+        except Exception as e:
+            logger.error(f"Failed to enqueue {len(news)} news items: {e}")
+            return 0
+
+    def _dead_letter_expired(self, now: datetime.datetime) -> int:
+        """Moves items whose lease expired on their last attempt (their worker kept crashing) to the dead letters."""
+        result = self.collection.update_many(
+            {"status": QUEUE_LEASED, "lease_expires_at": {"$lte": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {
+                "status": QUEUE_DEAD,
+                "finished_at": now,
+                "last_error": "lease expired on the last attempt",
+            }, "$unset": {"lease_owner": "", "lease_expires_at": ""}},
+        )
+        if result.modified_count:
+            logger.warning(f"Moved {result.modified_count} news items with expired leases to the dead letters.")
+        return result.modified_count
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Claims up to `limit` items, oldest first.
+
+        Returns:
+            The claimed queue documents; `item` holds the news item fields and `attempts` counts this attempt.
+        """
+        from pymongo import ReturnDocument
+
+        claimed = []
+        try:
+            now = _now()
+            self._dead_letter_expired(now)
+            claimable = {"$or": [
+                {"status": QUEUE_PENDING, "available_at": {"$lte": now}},
+                {"status": QUEUE_LEASED, "lease_expires_at": {"$lte": now}, "attempts": {"$lt": self.max_attempts}},
+            ]}
+            lease = {
+                "$set": {
+                    "status": QUEUE_LEASED,
+                    "lease_owner": self.worker_id,
+                    "lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            }
+            while len(claimed) < limit:
+                document = self.collection.find_one_and_update(
+                    claimable,
+                    lease,
+                    sort=[("enqueued_at", 1)],
+                    return_document=ReturnDocument.AFTER,
+                )
+                if document is None:
+                    break
+                claimed.append(document)
+        except Exception as e:
+            logger.error(f"Failed to claim work queue items: {e}")
+
+        if claimed:
+            with self._held_lock:
+                self._held.update(document["_id"] for document in claimed)
+            self._start_renewer()
+            retried = sum(1 for document in claimed if document["attempts"] > 1)
+            logger.info(f"Claimed {len(claimed)} news items ({retried} retries) as {self.worker_id}.")
+        return claimed
+
+    def renew(self) -> int:
+        """
+        Extends the leases of all held items.
+
+        Returns:
+            Number of leases renewed. Items whose lease was taken over are no longer held.
+        """
+        with self._held_lock:
+            held = list(self._held)
+        if not held:
+            return 0
+
+        expires_at = _now() + datetime.timedelta(seconds=self.lease_seconds)
+        self.collection.update_many(self._leased_by_me(held), {"$set": {"lease_expires_at": expires_at}})
+        owned = {document["_id"] for document in self.collection.find(self._leased_by_me(held), {"_id": 1})}
+        with self._held_lock:
+            # Items settled in the meantime were released and are not lost
+            lost = (set(held) - owned) & self._held
+        if lost:
+            logger.warning(f"Lost the lease of {len(lost)} news items to another worker: {sorted(lost)[:5]}")
+            self._release(lost)
+        return len(owned)
+
+    def _renew_loop(self) -> None:
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                logger.error(f"Failed to renew work queue leases: {e}")
+
+    def _start_renewer(self) -> None:
+        if self._renewer is None or not self._renewer.is_alive():
+            self._stop_event.clear()
+            self._renewer = threading.Thread(target=self._renew_loop, name="work-queue-leases", daemon=True)
+            self._renewer.start()
+
+    def claim_notifications(self, news_ids: List[str]) -> Set[str]:
+        """
+        Claims the Telegram notification of held items.
+
+        Returns:
+            Ids of the items this worker may notify: still leased by it and not notified yet.
+        """
+        if not news_ids:
+            return set()
+        token = uuid.uuid4().hex
+        try:
+            self.collection.update_many(
+                {**self._leased_by_me(news_ids), "notified_at": None},
+                {"$set": {"notified_at": _now(), "notification_token": token}},
+            )
+            granted = self.collection.find({"_id": {"$in": news_ids}, "notification_token": token}, {"_id": 1})
+            return {document["_id"] for document in granted}
+        except Exception as e:
+            logger.error(f"Failed to claim notifications, not sending them: {e}")
+            return set()
+
+    def release_notifications(self, news_ids: List[str]) -> None:
+        """Releases the notification claims of items whose message could not be sent, so a retry sends them."""
+        if not news_ids:
+            return
+        try:
+            self.collection.update_many(
+                self._leased_by_me(news_ids),
+                {"$unset": {"notified_at": "", "notification_token": ""}},
+            )
+        except Exception as e:
+            logger.error(f"Failed to release notification claims: {e}")
+
+    def complete(self, news_ids: List[str]) -> int:
+        """
+        Marks held items as done.
+
+        Returns:
+            Number of items completed; items whose lease was taken over are not.
+        """
+        if not news_ids:
+            return 0
+        # Stop renewing first, so the renewal never mistakes a settled item for a lost lease
+        self._release(news_ids)
+        try:
+            now = _now()
+            result = self.collection.update_many(
+                self._leased_by_me(news_ids),
+                {"$set": {"status": QUEUE_DONE, "finished_at": now},
+                 "$unset": {"lease_owner": "", "lease_expires_at": "", "last_error": ""}},
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Failed to complete {len(news_ids)} work queue items: {e}")
+            return 0
+
+    def fail(self, errors: Dict[str, str]) -> Dict[str, str]:
+        """
+        Releases held items that could not be processed. Items on their last attempt go to the dead letters, the
+        others are retried after `retry_backoff_seconds * 2 ** (attempts - 1)`.
+
+        Args:
+            errors: Error message per news id
+
+        Returns:
+            New state per released item: QUEUE_PENDING or QUEUE_DEAD. Items whose lease was taken over are missing.
+        """
+        if not errors:
+            return {}
+        from pymongo import UpdateOne
+
+        self._release(errors)
+        states: Dict[str, str] = {}
+        try:
+            now = _now()
+            operations = []
+            for document in self.collection.find(self._leased_by_me(errors), {"_id": 1, "attempts": 1}):
+                news_id, attempts = document["_id"], document["attempts"]
+                update = {"last_error": errors[news_id]}
+                if attempts >= self.max_attempts:
+                    update.update(status=QUEUE_DEAD, finished_at=now)
+                else:
+                    delay = min(_MAX_RETRY_DELAY_SECONDS, self.retry_backoff_seconds * 2 ** (attempts - 1))
+                    update.update(status=QUEUE_PENDING, available_at=now + datetime.timedelta(seconds=delay))
+                states[news_id] = update["status"]
+                operations.append(UpdateOne(
+                    {"_id": news_id, "status": QUEUE_LEASED, "lease_owner": self.worker_id},
+                    {"$set": update, "$unset": {"lease_owner": "", "lease_expires_at": ""}},
+                ))
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to release {len(errors)} work queue items, their leases will expire: {e}")
+            states = {}
+
+        dead = sum(1 for state in states.values() if state == QUEUE_DEAD)
+        if dead:
+            logger.warning(f"Moved {dead} news items to the dead letters after {self.max_attempts} attempts.")
+        return states
+
+    def defer(self, news_ids: List[str]) -> Dict[str, str]:
+        """
+        Releases held items that were not attempted, e.g. because the run reached its deadline. They are available
+        again immediately and the claim does not count as an attempt.
+
+        Returns:
+            QUEUE_PENDING per released item; items whose lease was taken over are missing.
+        """
+        if not news_ids:
+            return {}
+        self._release(news_ids)
+        try:
+            released = [
+                document["_id"] for document in self.collection.find(self._leased_by_me(news_ids), {"_id": 1})
+            ]
+            self.collection.update_many(
+                self._leased_by_me(released),
+                {"$set": {"status": QUEUE_PENDING, "available_at": _now()},
+                 "$inc": {"attempts": -1},
+                 "$unset": {"lease_owner": "", "lease_expires_at": ""}},
+            )
+            return {news_id: QUEUE_PENDING for news_id in released}
+        except Exception as e:
+            logger.error(f"Failed to release {len(news_ids)} deferred work queue items, their leases will expire: {e}")
+            return {}
+
+    def release_unsettled(self, reason: str) -> Dict[str, str]:
+        """
+        Releases the items still held after a run, e.g. because the run failed before they were completed, so they
+        are retried instead of being renewed forever by a long-lived process.
+
+        Returns:
+            New state per released item, as returned by `fail`.
+        """
+        with self._held_lock:
+            held = list(self._held)
+        if not held:
+            return {}
+        logger.warning(f"Releasing {len(held)} work queue items that were not settled by the run.")
+        return self.fail({news_id: reason for news_id in held})
+
+    def stats(self) -> Dict[str, int]:
+        """Counts the queued items per state."""
+        counts = {state: 0 for state in QUEUE_STATES}
+        for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Lists dead-lettered items, most recent first."""
+        return list(self.collection.find(
+            {"status": QUEUE_DEAD},
+            {"_id": 1, "attempts": 1, "last_error": 1, "finished_at": 1, "item.title": 1},
+            sort=[("finished_at", -1)],
+            limit=limit,
+        ))
+
+    def requeue_dead(self, news_ids: Optional[List[str]] = None) -> int:
+        """
+        Moves dead-lettered items (all, or the given ids) back to pending with a fresh attempt count.
+
+        Returns:
+            Number of items requeued.
+        """
+        query: Dict[str, Any] = {"status": QUEUE_DEAD}
+        if news_ids:
+            query["_id"] = {"$in": news_ids}
+        result = self.collection.update_many(
+            query,
+            {"$set": {"status": QUEUE_PENDING, "attempts": 0, "available_at": _now()},
+             "$unset": {"finished_at": "", "notified_at": "", "notification_token": ""}},
+        )
+        return result.modified_count
+
+    def close(self) -> None:
+        """Stops renewing leases. Items still held are picked up by another worker once their lease expires."""
+        self._stop_event.set()
+        if self._renewer is not None:
+            self._renewer.join(timeout=5)
+            self._renewer = None
+
+
+def queued_news_item(document: Dict[str, Any]) -> NewsItem:
+    """Rebuilds the news item of a queue document."""
+    return NewsItem(id=document["_id"], **document["item"])
+
+
+# Module-level queue (create once, reuse across function calls)
+_queue: Optional[WorkQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> WorkQueue:
+    """Returns the work queue of this process, creating it (and its indexes) on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            queue = WorkQueue(
+                collection=get_database()["work_queue"],
+                worker_id=new_worker_id(),
+                lease_seconds=config.work_queue_lease_seconds,
+                max_attempts=config.work_queue_max_attempts,
+                retry_backoff_seconds=config.work_queue_retry_backoff_seconds,
+            )
+            queue.ensure_indexes(config.work_queue_retention_seconds)
+            _queue = queue
+            logger.info(f"Work queue initialized for worker {queue.worker_id}.")
+    return _queue
+
+
+def close_work_queue() -> None:
+    """Stops the lease renewal of the process-wide work queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.close()
+            _queue = None
+
+
+def release_unsettled_work(reason: str = "run ended before the item was settled") -> None:
+    """Releases the items still held by this process at the end of a run; does nothing if the queue is unused."""
+    with _queue_lock:
+        queue = _queue
+    if queue is not None:
+        queue.release_unsettled(reason)
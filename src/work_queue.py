@@ -0,0 +1,55 @@
+"""
+Work Queue Administration
+
+Inspects the MongoDB work queue shared by the pipeline instances (WORK_QUEUE_ENABLED) and requeues dead letters,
+i.e. items that failed WORK_QUEUE_MAX_ATTEMPTS times. Requeued items start over with a fresh attempt count and are
+picked up by the next run of any instance.
+
+Usage:
+    python -m src.work_queue status
+    python -m src.work_queue dead --limit 20
+    python -m src.work_queue requeue                 # all dead letters
+    python -m src.work_queue requeue --ids id1 id2
+"""
+# Import libraries
+import json
+import argparse
+
+from src.utils.db_utils import close_database
+from src.utils.work_queue import get_work_queue, close_work_queue
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect the work queue and requeue dead letters")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("status", help="Print the number of queued items per state")
+
+    dead_parser = subparsers.add_parser("dead", help="List dead-lettered items, most recent first")
+    dead_parser.add_argument("--limit", type=int, default=100, help="Maximum number of items listed")
+
+    requeue_parser = subparsers.add_parser("requeue", help="Move dead-lettered items back to pending")
+    requeue_parser.add_argument("--ids", nargs="+", default=None, help="News ids to requeue (defaults to all)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    queue = get_work_queue()
+
+    try:
+        if args.command == "status":
+            print(json.dumps(queue.stats(), indent=2))
+
+        elif args.command == "dead":
+            for document in queue.dead_letters(args.limit):
+                print(
+                    f"{document['_id']:<40} {document['attempts']:>3} attempts  {document.get('finished_at')}  "
+                    f"{document.get('last_error')}"
+                )
+
+        else:
+            print(f"Requeued {queue.requeue_dead(args.ids)} dead-lettered news items.")
+    finally:
+        close_work_queue()
+        close_database()
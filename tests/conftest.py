@@ -0,0 +1,61 @@
+"""
+Test Fixtures
+
+Placeholder credentials are set before the configuration is first loaded, so the tests run without a .env file, and
+MongoDB is replaced by an in-memory mongomock database. Settings a test depends on are set with `monkeypatch` on
+`config`, which forwards them to the loaded configuration.
+"""
+# Import libraries
+import os
+import datetime
+
+import pytest
+
+_PLACEHOLDER_ENVIRONMENT = {
+    "DB_URI": "mongodb://127.0.0.1:1",
+    "DB_NAME": "tests",
+    "MODEL_API_KEY": "test",
+    "BOT_TOKEN": "test",
+    "GROUP_ID": "-100",
+    "NEWS_API_KEY": "test",
+    "NEWS_URL": "http://127.0.0.1:1/api/v1/category?section=general&items=10&page=1",
+    "LANGSMITH_API_KEY": "test",
+    "LANGCHAIN_TRACING_V2": "false",
+}
+for name, value in _PLACEHOLDER_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def mongo_db():
+    """Points the database module at a fresh mongomock database and restores it afterwards."""
+    import src.utils.db_utils as db_utils
+    from benchmarks.fakes import install_mongomock
+
+    client, db = db_utils._client, db_utils._db
+    yield install_mongomock("tests")
+    db_utils._client, db_utils._db = client, db
+
+
+def make_news(news_id: str, text: str = "Bitcoin rallied after the approval of a spot ETF.", **fields):
+    """Builds a NewsItem with placeholder fields."""
+    from src.state import NewsItem
+
+    return NewsItem(**{
+        "id": news_id,
+        "title": f"Headline {news_id}",
+        "text": text,
+        "source_name": "Test",
+        "news_url": f"https://example.com/{news_id}",
+        "image_url": f"https://example.com/{news_id}.png",
+        "timestamp": datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+        **fields,
+    })
+
+
+def make_processed_news(news_id: str, **fields):
+    """Builds a ProcessedNewsItem with a placeholder classification."""
+    from src.state import Classification, processed_news_item
+
+    classification = Classification(sentiment="POSITIVE", importance="HIGH", is_market_relevant=True)
+    return processed_news_item(make_news(news_id, **fields), classification)
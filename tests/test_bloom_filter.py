@@ -0,0 +1,150 @@
+"""Tests of the seen-id index (src/utils/bloom_filter.py)."""
+# Import libraries
+import time
+import datetime
+
+import pytest
+
+from conftest import make_processed_news
+from src.config.config import config
+from src.utils import bloom_filter
+from src.utils.bloom_filter import ScalableBloomFilter, get_seen_index, sync_seen_index
+from src.utils.db_utils import upsert_bulk_news
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "seen.bloom")
+
+
+@pytest.fixture
+def seen_index(mongo_db, index_path, monkeypatch):
+    """Process-wide seen-id index backed by a temporary file, closed after the test."""
+    monkeypatch.setattr(config, "seen_index_path", index_path)
+    monkeypatch.setattr(config, "seen_index_capacity", 100)
+    monkeypatch.setattr(config, "seen_index_error_rate", 0.01)
+    yield
+    bloom_filter.close_seen_index()
+
+
+def test_has_no_false_negatives_while_growing(index_path):
+    index = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+    keys = [f"news-{i}" for i in range(1000)]
+
+    added = index.add_many(keys)
+
+    assert index.stats()["slices"] > 1
+    assert all(key in index for key in keys)
+    assert index.filter_maybe_seen(keys) == keys
+    assert added == len(index)
+    # A few keys may be reported as present before they were added, so they are not counted
+    assert added >= 990
+    index.close()
+
+
+def test_false_positive_rate_stays_near_target(index_path):
+    index = ScalableBloomFilter(index_path, initial_capacity=1000, error_rate=0.01)
+    index.add_many(f"news-{i}" for i in range(5000))
+
+    unseen = [f"other-{i}" for i in range(10000)]
+    false_positives = len(index.filter_maybe_seen(unseen))
+
+    assert false_positives / len(unseen) < 0.02
+    assert index.stats()["estimated_fp_rate"] < 0.02
+    index.close()
+
+
+def test_persists_across_reopening(index_path):
+    index = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+    index.add_many(f"news-{i}" for i in range(500))
+    index.mark_synced(1234.5)
+    slices, items = index.stats()["slices"], len(index)
+    index.close()
+
+    reopened = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+
+    assert not reopened.created
+    assert reopened.synced_at == 1234.5
+    assert (reopened.stats()["slices"], len(reopened)) == (slices, items)
+    assert all(f"news-{i}" in reopened for i in range(500))
+    reopened.close()
+
+
+def test_file_is_used_by_one_owner_at_a_time(index_path):
+    index = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+
+    with pytest.raises(RuntimeError, match="SEEN_INDEX_PATH"):
+        ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+
+    index.close()
+    ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01).close()
+
+
+def test_files_of_other_versions_are_rebuilt(index_path):
+    index = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+    index.add_many(["a"])
+    index.close()
+    with open(index_path, "r+b") as f:
+        f.seek(8)
+        f.write((1).to_bytes(4, "little"))
+
+    rebuilt = ScalableBloomFilter(index_path, initial_capacity=100, error_rate=0.01)
+
+    assert rebuilt.created
+    assert len(rebuilt) == 0 and rebuilt.synced_at == 0
+    rebuilt.close()
+
+
+def test_opening_warms_the_index_from_the_database(seen_index, mongo_db):
+    upsert_bulk_news([make_processed_news(f"stored-{i}") for i in range(50)])
+
+    index = get_seen_index()
+
+    assert all(f"stored-{i}" in index for i in range(50))
+    assert index.synced_at > 0
+
+
+def test_sync_adds_ids_stored_by_other_processes(seen_index, mongo_db):
+    index = get_seen_index()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # Written by another process: only the database knows about it
+    mongo_db["news"].insert_one({"_id": "elsewhere", "stored_at": now})
+
+    assert "elsewhere" not in index
+    assert sync_seen_index(index) == 1
+    assert "elsewhere" in index
+
+
+def test_sync_falls_back_to_a_full_sync_for_documents_without_stored_at(seen_index, mongo_db):
+    index = get_seen_index()
+    mongo_db["news"].insert_one({"_id": "legacy"})
+
+    sync_seen_index(index)
+
+    assert "legacy" in index
+    assert mongo_db["news"].count_documents({"stored_at": None}) == 0
+
+
+def test_writes_of_this_process_are_added_right_away(seen_index, mongo_db):
+    index = get_seen_index()
+    synced_at = index.synced_at
+
+    upsert_bulk_news([make_processed_news("fresh")])
+
+    assert "fresh" in index
+    assert index.synced_at == synced_at
+
+
+def test_cache_check_syncs_only_after_the_interval(seen_index, mongo_db, monkeypatch):
+    from src.nodes.check_cache import _lookup_seen_ids
+
+    monkeypatch.setattr(config, "seen_index_enabled", True)
+    monkeypatch.setattr(config, "seen_index_sync_interval_seconds", 60)
+    index = get_seen_index()
+    mongo_db["news"].insert_one({"_id": "elsewhere", "stored_at": datetime.datetime.now(datetime.timezone.utc)})
+
+    # Within the interval the index is not synced, so the id is taken as unseen without a database lookup
+    assert _lookup_seen_ids(["elsewhere"]) == set()
+
+    index.mark_synced(time.time() - 61)
+    assert _lookup_seen_ids(["elsewhere"]) == {"elsewhere"}
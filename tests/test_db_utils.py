@@ -0,0 +1,119 @@
+"""Tests of the idempotent bulk writes of src/utils/db_utils.py against mongomock."""
+# Import libraries
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError, OperationFailure
+
+from conftest import make_processed_news
+from src.config.config import config
+from src.utils.db_utils import (
+    WRITE_EXISTING, WRITE_FAILED, WRITE_INSERTED, fetch_cache, update_bulk_classifications, upsert_bulk_news
+)
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(config, "db_write_backoff_seconds", 0.0)
+    monkeypatch.setattr(config, "db_write_max_attempts", 3)
+
+
+def test_upsert_reports_inserted_and_existing(mongo_db):
+    assert upsert_bulk_news([make_processed_news("a"), make_processed_news("b")]) == {
+        "a": WRITE_INSERTED, "b": WRITE_INSERTED,
+    }
+
+    outcomes = upsert_bulk_news([make_processed_news("b", title="Edited"), make_processed_news("c")])
+
+    assert outcomes == {"b": WRITE_EXISTING, "c": WRITE_INSERTED}
+    # Existing documents are left untouched
+    assert mongo_db["news"].find_one({"_id": "b"})["title"] == "Headline b"
+    assert fetch_cache(["a", "b", "c", "d"]) == {"a", "b", "c"}
+
+
+def test_upsert_sets_stored_at_and_renames_id(mongo_db):
+    upsert_bulk_news([make_processed_news("a")])
+
+    document = mongo_db["news"].find_one({"_id": "a"})
+    assert "id" not in document
+    assert document["stored_at"] is not None
+    assert document["sentiment"] == "POSITIVE"
+
+
+def test_upsert_writes_in_chunks(mongo_db, monkeypatch):
+    monkeypatch.setattr(config, "db_write_chunk_size", 2)
+
+    outcomes = upsert_bulk_news([make_processed_news(str(i)) for i in range(5)])
+
+    assert outcomes == {str(i): WRITE_INSERTED for i in range(5)}
+    assert mongo_db["news"].count_documents({}) == 5
+
+
+def test_upsert_reports_per_item_write_errors(mongo_db, monkeypatch):
+    collection_type = type(mongo_db["news"])
+
+    def bulk_write(self, operations, ordered=True):
+        raise BulkWriteError({
+            "writeErrors": [
+                {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+                {"index": 1, "code": 121, "errmsg": "document failed validation"},
+            ],
+            "upserted": [{"index": 2, "_id": "c"}],
+        })
+
+    monkeypatch.setattr(collection_type, "bulk_write", bulk_write)
+
+    outcomes = upsert_bulk_news([make_processed_news(news_id) for news_id in ("a", "b", "c", "d")])
+
+    assert outcomes == {"a": WRITE_EXISTING, "b": WRITE_FAILED, "c": WRITE_INSERTED, "d": WRITE_EXISTING}
+
+
+def test_upsert_retries_transient_errors(mongo_db, monkeypatch, fast_retries):
+    collection_type = type(mongo_db["news"])
+    bulk_write = collection_type.bulk_write
+    calls = []
+
+    def flaky_bulk_write(self, operations, ordered=True):
+        calls.append(len(operations))
+        if len(calls) == 1:
+            raise AutoReconnect("connection reset")
+        return bulk_write(self, operations, ordered=ordered)
+
+    monkeypatch.setattr(collection_type, "bulk_write", flaky_bulk_write)
+
+    assert upsert_bulk_news([make_processed_news("a")]) == {"a": WRITE_INSERTED}
+    assert calls == [1, 1]
+
+
+def test_upsert_reports_failed_chunks(mongo_db, monkeypatch, fast_retries):
+    calls = []
+
+    def failing_bulk_write(self, operations, ordered=True):
+        calls.append(len(operations))
+        raise OperationFailure("not authorized")
+
+    monkeypatch.setattr(type(mongo_db["news"]), "bulk_write", failing_bulk_write)
+
+    assert upsert_bulk_news([make_processed_news("a"), make_processed_news("b")]) == {
+        "a": WRITE_FAILED, "b": WRITE_FAILED,
+    }
+    # Errors that are not transient are not retried
+    assert calls == [2]
+
+
+def test_upsert_rejects_invalid_input(mongo_db):
+    with pytest.raises(ValueError):
+        upsert_bulk_news([])
+    with pytest.raises(ValueError):
+        upsert_bulk_news([{"id": "a"}])
+
+
+def test_update_classifications_returns_matched_ids(mongo_db):
+    upsert_bulk_news([make_processed_news("a"), make_processed_news("b")])
+
+    matched = update_bulk_classifications({
+        "a": {"sentiment": "NEGATIVE"},
+        "missing": {"sentiment": "NEGATIVE"},
+    })
+
+    assert matched == {"a"}
+    assert mongo_db["news"].find_one({"_id": "a"})["sentiment"] == "NEGATIVE"
+    assert mongo_db["news"].find_one({"_id": "b"})["sentiment"] == "POSITIVE"
@@ -0,0 +1,115 @@
+"""Tests of the persistent LLM result cache (src/utils/llm_cache.py)."""
+# Import libraries
+import time
+import threading
+
+import pytest
+
+from src.config.config import config
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMResultCache, make_cache_key
+
+
+class _Clock:
+    """Replaces time.time in the LLM cache module."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite3")
+
+
+def test_key_ignores_case_and_whitespace_but_not_model_or_prompt():
+    key = make_cache_key("Bitcoin  Rallies", "ETF approved.\n", "gpt-4o", "v1")
+
+    assert key == make_cache_key("bitcoin rallies", " ETF   APPROVED.", "gpt-4o", "v1")
+    assert key != make_cache_key("bitcoin rallies", "ETF approved.", "gpt-4o-mini", "v1")
+    assert key != make_cache_key("bitcoin rallies", "ETF approved.", "gpt-4o", "v2")
+
+
+def test_stores_and_persists_results(cache_path, clock):
+    cache = LLMResultCache(cache_path, max_entries=10, ttl_seconds=60)
+    cache.set_many({"a": {"sentiment": "POSITIVE"}, "b": {"sentiment": "NEGATIVE"}})
+
+    assert cache.get_many(["a", "c"]) == {"a": {"sentiment": "POSITIVE"}}
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    reopened = LLMResultCache(cache_path, max_entries=10, ttl_seconds=60)
+    assert reopened.get_many(["a", "b"]) == {"a": {"sentiment": "POSITIVE"}, "b": {"sentiment": "NEGATIVE"}}
+    reopened.close()
+
+
+def test_entries_expire_after_ttl(cache_path, clock):
+    cache = LLMResultCache(cache_path, max_entries=10, ttl_seconds=60)
+    cache.set_many({"a": 1})
+
+    clock.now += 59
+    assert cache.get_many(["a"]) == {"a": 1}
+
+    # Reading an entry does not extend its lifetime
+    clock.now += 2
+    assert cache.get_many(["a"]) == {}
+
+    cache.set_many({"b": 2})
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(cache_path, clock):
+    cache = LLMResultCache(cache_path, max_entries=3, ttl_seconds=3600)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set_many({key: key})
+
+    clock.now += 1
+    cache.get_many(["a"])
+    clock.now += 1
+    cache.set_many({"d": "d"})
+
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": "a", "c": "c", "d": "d"}
+    assert cache.evictions == 1
+    cache.close()
+
+
+def test_process_wide_cache_is_opened_once(cache_path, monkeypatch):
+    monkeypatch.setattr(config, "llm_cache_path", cache_path)
+    opened = []
+    cache_type = llm_cache.LLMResultCache
+
+    def counting_cache(*args, **kwargs):
+        opened.append(1)
+        # Widens the window in which concurrent first calls could each open a cache
+        time.sleep(0.05)
+        return cache_type(*args, **kwargs)
+
+    monkeypatch.setattr(llm_cache, "LLMResultCache", counting_cache)
+    barrier = threading.Barrier(8)
+    caches = []
+
+    def open_cache():
+        barrier.wait()
+        caches.append(llm_cache.get_llm_cache())
+
+    threads = [threading.Thread(target=open_cache) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    llm_cache.close_llm_cache()
+
+    assert len(opened) == 1
+    assert all(cache is caches[0] for cache in caches)
@@ -0,0 +1,188 @@
+"""Tests of the adaptive concurrency limit and the circuit breaker of the LLM call layer (src/utils/llm_calls.py)."""
+# Import libraries
+import pytest
+
+from src.utils import llm_calls
+from src.utils.llm_calls import AIMDLimiter, CircuitBreaker, CircuitState, LLMOutcome
+
+
+class _Clock:
+    """Replaces time.monotonic in the LLM call module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_calls.time, "monotonic", clock)
+    return clock
+
+
+def _limiter(initial: int, minimum: int = 1, maximum: int = 16) -> AIMDLimiter:
+    return AIMDLimiter(initial=initial, minimum=minimum, maximum=maximum, latency_target=10.0)
+
+
+def test_initial_limit_is_clamped_to_bounds():
+    assert _limiter(initial=32, maximum=8).limit == 8
+    assert _limiter(initial=1, minimum=3).limit == 3
+
+
+def test_healthy_responses_increase_the_limit_additively(clock):
+    limiter = _limiter(initial=2)
+
+    for expected in (2, 3):
+        started = [limiter.acquire(), limiter.acquire()]
+        clock.now += 1
+        for start in started:
+            limiter.release(start, LLMOutcome.SUCCESS)
+        assert limiter.limit == expected
+
+
+def test_limit_does_not_grow_while_unused(clock):
+    limiter = _limiter(initial=4)
+
+    for _ in range(20):
+        limiter.release(limiter.acquire(), LLMOutcome.SUCCESS)
+
+    assert limiter.limit == 4
+
+
+def test_limit_does_not_grow_above_maximum(clock):
+    limiter = _limiter(initial=2, maximum=2)
+
+    for _ in range(20):
+        started = [limiter.acquire(), limiter.acquire()]
+        for start in started:
+            limiter.release(start, LLMOutcome.SUCCESS)
+
+    assert limiter.limit == 2
+
+
+def test_congestion_halves_the_limit_once_per_event(clock):
+    limiter = _limiter(initial=8)
+    started = [limiter.acquire() for _ in range(4)]
+
+    clock.now += 1
+    for start in started:
+        limiter.release(start, LLMOutcome.RATE_LIMITED)
+    # The other responses were sent under the old limit
+    assert limiter.limit == 4
+
+    clock.now += 1
+    limiter.release(limiter.acquire(), LLMOutcome.TIMEOUT)
+    assert limiter.limit == 2
+
+
+def test_slow_responses_count_as_congestion(clock):
+    limiter = _limiter(initial=8)
+
+    start = limiter.acquire()
+    clock.now += 11
+    limiter.release(start, LLMOutcome.SUCCESS)
+
+    assert limiter.limit == 4
+
+
+def test_limit_does_not_drop_below_minimum(clock):
+    limiter = _limiter(initial=4, minimum=3)
+
+    for _ in range(5):
+        start = limiter.acquire()
+        clock.now += 1
+        limiter.release(start, LLMOutcome.RATE_LIMITED)
+
+    assert limiter.limit == 3
+
+
+def test_rejected_requests_leave_the_limit_unchanged(clock):
+    limiter = _limiter(initial=4)
+
+    limiter.release(limiter.acquire(), LLMOutcome.REJECTED)
+
+    assert limiter.limit == 4
+
+
+def _open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record(LLMOutcome.UNAVAILABLE)
+
+
+def test_breaker_opens_after_consecutive_provider_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=30)
+
+    for _ in range(2):
+        breaker.record(LLMOutcome.TIMEOUT)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record(LLMOutcome.UNAVAILABLE)
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+
+def test_answers_reset_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=30)
+
+    for outcome in (LLMOutcome.TIMEOUT, LLMOutcome.TIMEOUT, LLMOutcome.REJECTED, LLMOutcome.TIMEOUT,
+                    LLMOutcome.RATE_LIMITED, LLMOutcome.TIMEOUT):
+        breaker.record(outcome)
+
+    # Rate limits are neither failures nor answers, so only the last two timeouts count
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_breaker_lets_one_probe_through_after_recovery(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+    _open_breaker(breaker)
+
+    clock.now += 29
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+    _open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record(LLMOutcome.SUCCESS)
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+    _open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record(LLMOutcome.TIMEOUT)
+
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_rate_limited_probe_lets_the_next_request_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+    _open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record(LLMOutcome.RATE_LIMITED)
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
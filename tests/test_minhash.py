@@ -0,0 +1,119 @@
+"""Tests of the MinHash signatures and the LSH index of the near-duplicate check (src/utils/minhash.py)."""
+# Import libraries
+import random
+
+import pytest
+
+from src.utils.minhash import MinHasher, MinHashLSH, shingle
+
+_VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def _article(rng: random.Random, words: int = 150) -> str:
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _edited(article: str, rng: random.Random, edits: int) -> str:
+    words = article.split()
+    for position in rng.sample(range(len(words)), edits):
+        words[position] = f"edit{rng.randrange(1_000_000)}"
+    return " ".join(words)
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b)
+
+
+def _estimate(hasher: MinHasher, a: set, b: set) -> float:
+    first, second = hasher.signature(a), hasher.signature(b)
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingle("Bitcoin hits a new high!") == shingle("bitcoin, hits a NEW high")
+    assert len(shingle("one two three four")) == 2
+
+
+def test_signature_estimates_jaccard_similarity():
+    rng = random.Random(1)
+    hasher = MinHasher(num_perm=128)
+
+    errors = []
+    for edits in (2, 10, 30, 60):
+        for _ in range(20):
+            article = _article(rng)
+            a, b = shingle(article), shingle(_edited(article, rng, edits))
+            errors.append(abs(_estimate(hasher, a, b) - _jaccard(a, b)))
+
+    assert sum(errors) / len(errors) < 0.05
+
+
+def test_signatures_are_deterministic_and_handle_short_texts():
+    hasher = MinHasher(num_perm=64)
+    short = shingle("ETF approved")
+
+    assert hasher.signature(short) == MinHasher(num_perm=64).signature(short)
+    assert len(hasher.signature(short)) == 64
+    assert hasher.signature(set()) != hasher.signature(short)
+    assert _estimate(hasher, short, shingle("ETF approved")) == 1.0
+
+
+def test_index_finds_lightly_edited_copies():
+    rng = random.Random(2)
+    hasher = MinHasher(num_perm=64)
+    index = MinHashLSH(num_perm=64, bands=16, threshold=0.7, window_seconds=float("inf"))
+    articles = [_article(rng) for _ in range(500)]
+    for i, article in enumerate(articles):
+        index.insert(str(i), hasher.signature(shingle(article)), 0.0)
+
+    copies = rng.sample(range(len(articles)), 100)
+    found = 0
+    for i in copies:
+        match = index.query(hasher.signature(shingle(_edited(articles[i], rng, 2))))
+        found += match is not None and match[0] == str(i)
+
+    assert found / len(copies) >= 0.95
+
+
+def test_index_ignores_unrelated_articles():
+    rng = random.Random(3)
+    hasher = MinHasher(num_perm=64)
+    index = MinHashLSH(num_perm=64, bands=16, threshold=0.7, window_seconds=float("inf"))
+    for i in range(500):
+        index.insert(str(i), hasher.signature(shingle(_article(rng))), 0.0)
+
+    matches = [index.query(hasher.signature(shingle(_article(rng)))) for _ in range(200)]
+
+    assert matches.count(None) == len(matches)
+
+
+def test_index_drops_items_outside_the_window():
+    hasher = MinHasher(num_perm=64)
+    index = MinHashLSH(num_perm=64, bands=16, threshold=0.7, window_seconds=3600)
+    signature = hasher.signature(shingle("spot bitcoin etf approved by the sec"))
+
+    index.insert("old", signature, 1_000_000.0, payload={"sentiment": "POSITIVE"})
+    # Expiry is relative to the newest item and to the current time
+    index.insert("new", hasher.signature(shingle("something else entirely happened today")), 2e10)
+
+    assert "old" not in index and index.get_payload("old") is None
+    assert index.query(signature) is None
+
+
+def test_index_keeps_payloads_of_canonical_items():
+    hasher = MinHasher(num_perm=64)
+    index = MinHashLSH(num_perm=64, bands=16, threshold=0.7, window_seconds=float("inf"))
+    signature = hasher.signature(shingle("spot bitcoin etf approved by the sec after a long review"))
+
+    index.insert("canonical", signature, 0.0)
+    index.set_payload("canonical", {"sentiment": "POSITIVE"})
+    index.set_payload("unknown", {"sentiment": "NEGATIVE"})
+
+    assert index.query(signature) == ("canonical", 1.0)
+    assert index.get_payload("canonical") == {"sentiment": "POSITIVE"}
+    assert index.get_payload("unknown") is None
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=64, bands=10, threshold=0.7, window_seconds=60)
@@ -0,0 +1,126 @@
+"""Tests of the carry-over of unfinished items (src/utils/pending.py, src/nodes/carry_over.py) and of the run deadlines
+(src/utils/deadline.py)."""
+# Import libraries
+import time
+
+import pytest
+
+from conftest import make_news
+from src.config.config import config
+from src.nodes.carry_over import run_outcomes
+from src.state import TelegramDelivery
+from src.utils.db_utils import WRITE_EXISTING, WRITE_FAILED, WRITE_INSERTED
+from src.utils.deadline import classification_deadline, expired, item_deadline, remaining, run_deadline
+from src.utils.pending import PendingQueue
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "pending.json")
+
+
+def test_failed_items_are_carried_over_until_out_of_attempts(queue_path):
+    queue = PendingQueue(queue_path, max_attempts=2)
+    item = make_news("1")
+
+    queue.record([], {"1": (item, "not classified")}, [])
+    assert [pending.item for pending in queue.items()] == [item]
+
+    queue.record([], {"1": (item, "not classified")}, [])
+    assert queue.items() == []
+
+
+def test_deferred_items_keep_their_attempts(queue_path):
+    queue = PendingQueue(queue_path, max_attempts=2)
+    item = make_news("1")
+
+    queue.record([], {"1": (item, "database write failed")}, [])
+    for _ in range(5):
+        queue.record([], {}, [item])
+
+    assert len(queue) == 1
+    queue.record([], {"1": (item, "database write failed")}, [])
+    assert len(queue) == 0
+
+
+def test_finished_items_leave_the_queue(queue_path):
+    queue = PendingQueue(queue_path, max_attempts=5)
+    queue.record([], {}, [make_news("1"), make_news("2")])
+
+    queue.record(["1"], {}, [])
+
+    assert [pending.item.id for pending in queue.items()] == ["2"]
+
+
+def test_queue_survives_a_restart(queue_path):
+    item = make_news("1")
+    PendingQueue(queue_path, max_attempts=5).record([], {"1": (item, "telegram delivery failed")}, [])
+
+    reloaded = PendingQueue(queue_path, max_attempts=5)
+
+    assert [pending.item for pending in reloaded.items()] == [item]
+
+
+def test_notified_and_duplicate_items_keep_their_state(queue_path):
+    queue = PendingQueue(queue_path, max_attempts=5)
+    canonical, copy = make_news("1"), make_news("2")
+
+    queue.record([], {"1": (canonical, "database write failed")}, [copy], duplicate_of={"2": "1"}, notified=["1"])
+    # A later run that does not know about the earlier notification keeps it
+    queue.record([], {"1": (canonical, "database write failed")}, [copy], duplicate_of={"2": "1"})
+
+    pending = {entry.item.id: entry for entry in queue.items()}
+    assert pending["1"].notified and pending["1"].duplicate_of is None
+    assert not pending["2"].notified and pending["2"].duplicate_of == "1"
+
+
+def test_corrupt_file_starts_an_empty_queue(queue_path):
+    with open(queue_path, "w") as f:
+        f.write("{not json")
+
+    assert len(PendingQueue(queue_path, max_attempts=5)) == 0
+
+
+def test_run_outcomes_sort_items_by_what_is_left_to_do():
+    finished, errors, deferred = run_outcomes(
+        ["done", "unsent", "unknown", "unstored", "failed", "deferred"],
+        ["done", "unsent", "unknown", "unstored"],
+        {"done": WRITE_INSERTED, "unsent": WRITE_EXISTING, "unknown": WRITE_INSERTED, "unstored": WRITE_FAILED},
+        [
+            TelegramDelivery(id="done", success=True),
+            TelegramDelivery(id="unsent", error="chat not found"),
+            TelegramDelivery(id="unknown", error="read timeout", outcome_unknown=True),
+        ],
+        ["deferred"],
+    )
+
+    # A notification whose outcome is unknown may have been posted, so it is not sent again
+    assert finished == ["done", "unknown"]
+    assert errors == {
+        "unsent": "telegram delivery failed: chat not found",
+        "unstored": "database write failed",
+        "failed": "not classified",
+    }
+    assert deferred == ["deferred"]
+
+
+def test_deadlines_derive_from_the_run_deadline(monkeypatch):
+    monkeypatch.setattr(config, "deadline_reserve_seconds", 5.0)
+    monkeypatch.setattr(config, "item_deadline_seconds", 10.0)
+    deadline = run_deadline(60)
+
+    assert remaining(deadline) == pytest.approx(60, abs=1)
+    assert not expired(deadline)
+    assert classification_deadline(deadline) == deadline - 5
+    assert item_deadline(deadline) == pytest.approx(time.time() + 10, abs=1)
+    # An item never gets more time than the run
+    assert item_deadline(time.time() + 3) <= time.time() + 3
+
+
+def test_expired_and_missing_deadlines():
+    past = time.time() - 1
+
+    assert expired(past) and remaining(past) == 0.0
+    assert run_deadline(0) is None
+    assert not expired(None) and remaining(None) is None
+    assert classification_deadline(None) is None and item_deadline(None) is None
@@ -0,0 +1,72 @@
+"""Tests of the token bucket (src/utils/rate_limit.py)."""
+# Import libraries
+import pytest
+
+from src.utils import rate_limit
+from src.utils.rate_limit import TokenBucket
+
+
+class _Clock:
+    """Replaces time.monotonic in the rate limit module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_up_to_capacity_then_waits(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Later callers queue up behind the earlier reservations
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.reserve()
+
+    clock.now += 1.0
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+    clock.now += 60.0
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0
+
+
+def test_max_wait_reserves_nothing(clock):
+    bucket = TokenBucket(rate=1.0, capacity=1)
+    bucket.reserve()
+
+    assert bucket.reserve(max_wait=0.5) is None
+    assert bucket.acquire(max_wait=0.5) is False
+    # The rejected reservations did not take tokens
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_penalize_blocks_for_the_given_time(clock):
+    bucket = TokenBucket(rate=2.0, capacity=5)
+
+    bucket.penalize(3.0)
+    assert bucket.reserve() == pytest.approx(3.5)
+
+    clock.now += 10.0
+    assert bucket.reserve() == 0.0
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 1), (1, 0), (-1, 1)])
+def test_rejects_non_positive_settings(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=capacity)
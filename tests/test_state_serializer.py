@@ -0,0 +1,76 @@
+"""Tests of the checkpoint serializer of the graph state (src/utils/state_serializer.py)."""
+# Import libraries
+import datetime
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.types import Send
+
+from conftest import make_news
+from src.state import Classification, ItemTaskState, LLMCallRecord, TelegramDelivery
+from src.utils.state_serializer import StateSerializer
+
+
+def _channel_values() -> dict:
+    classification = Classification(
+        sentiment="NEGATIVE", importance="MEDIUM", is_market_relevant=False, prefilter_confidence=0.93,
+    )
+    return {
+        "news": {"1": make_news("1"), "2": make_news("2", text="Ünïcode 📉")},
+        "cache": {"0"},
+        "classifications": {"1": classification},
+        "telegram_deliveries": [TelegramDelivery(id="1", success=True, status_code=200, attempts=1, message_id=7)],
+        "llm_calls": [LLMCallRecord(model="gpt-4o", prompt_tokens=120, completion_tokens=20, latency_ms=812.5)],
+        "deadline": 1_700_000_000.5,
+        "fetch_state": {"general": {"newest": datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)}},
+    }
+
+
+def test_round_trip_restores_models_and_values():
+    serializer = StateSerializer()
+    values = _channel_values()
+
+    kind, data = serializer.dumps_typed(values)
+    restored = serializer.loads_typed((kind, data))
+
+    assert kind == "msgpack"
+    assert restored == values
+    assert restored["news"]["1"].timestamp.tzinfo is not None
+    assert restored["classifications"]["1"].sentiment.value == "NEGATIVE"
+
+
+def test_round_trip_restores_sends_of_the_streaming_graph():
+    serializer = StateSerializer()
+    sends = [Send("process_item", ItemTaskState(item=make_news("1"), duplicate_of="0", notified=True, deadline=1.5))]
+
+    restored = serializer.loads_typed(serializer.dumps_typed(sends))
+
+    assert restored == sends
+    assert isinstance(restored[0].arg, ItemTaskState)
+
+
+def test_encoding_is_smaller_than_the_default_serializer():
+    values = _channel_values()
+    values["news"] = {str(i): make_news(str(i)) for i in range(100)}
+
+    compact = StateSerializer().dumps_typed(values)[1]
+    default = JsonPlusSerializer().dumps_typed(values)[1]
+
+    assert len(compact) < len(default)
+
+
+def test_reads_checkpoints_of_the_default_serializer():
+    values = _channel_values()
+
+    restored = StateSerializer().loads_typed(JsonPlusSerializer().dumps_typed(values))
+
+    assert restored == values
+
+
+def test_values_msgpack_cannot_encode_fall_back_to_the_default_serializer():
+    serializer, default = StateSerializer(), JsonPlusSerializer()
+    value = {"text": "broken \ud800 surrogate"}
+
+    assert serializer.dumps_typed(value) == default.dumps_typed(value)
+    assert serializer.loads_typed(serializer.dumps_typed(value)) == default.loads_typed(default.dumps_typed(value))
+    assert serializer.loads_typed(serializer.dumps_typed(None)) is None
+    assert serializer.loads_typed(serializer.dumps_typed(b"raw")) == b"raw"
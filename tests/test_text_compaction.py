@@ -0,0 +1,74 @@
+"""Tests of the compaction of article text before classification (src/utils/text_compaction.py)."""
+# Import libraries
+from src.utils.text_compaction import clean_text, compact_text, split_sentences
+from src.utils.tokens import count_tokens
+
+_MODEL = "gpt-4o"
+_LEAD = "Bitcoin rose 5% after the SEC approved the first spot ETF. Analysts expect further inflows."
+
+
+def test_removes_markup_links_and_boilerplate():
+    text = (
+        "<p>Bitcoin rose 5% after the <b>SEC</b> approved the first spot ETF.</p>\n"
+        "Read more: [Ether ETF odds](https://example.com/ether) https://t.co/abc\n"
+        "Analysts expect   further inflows.\n"
+        "Subscribe to our newsletter for daily updates.\n"
+        "The post Bitcoin rallies appeared first on Example News.\n"
+        "Disclaimer: This article is not financial advice."
+    )
+
+    assert clean_text(text) == _LEAD
+
+
+def test_drops_a_body_that_repeats_the_headline():
+    text = "Bitcoin hits a record. Bitcoin rose 5% after the SEC approved the first spot ETF."
+
+    assert clean_text(text, title="Bitcoin hits a record") == (
+        "Bitcoin rose 5% after the SEC approved the first spot ETF."
+    )
+
+
+def test_splits_sentences_at_terminal_punctuation():
+    assert split_sentences("Price is $1.5 million. It rose! Why? 2024 was \"good\".") == [
+        "Price is $1.5 million.", "It rose!", "Why?", "2024 was \"good\".",
+    ]
+
+
+def test_text_within_budget_is_only_cleaned():
+    compacted = compact_text(f"<div>{_LEAD}</div>", "Headline", _MODEL, max_tokens=400)
+
+    assert compacted.text == _LEAD
+    assert not compacted.truncated
+    assert compacted.tokens == count_tokens(_LEAD, _MODEL)
+    assert compacted.tokens_saved == compacted.original_tokens - compacted.tokens
+
+
+def test_long_text_keeps_whole_sentences_of_the_lead():
+    sentences = [f"Sentence number {i} describes the market in some detail." for i in range(100)]
+    text = " ".join(sentences)
+
+    compacted = compact_text(text, "Headline", _MODEL, max_tokens=60)
+
+    assert compacted.truncated
+    assert compacted.tokens <= 60
+    assert compacted.text.startswith(sentences[0])
+    assert compacted.text.endswith(".")
+    assert compacted.text in text
+    assert compacted.tokens_saved > 0
+
+
+def test_first_sentence_over_budget_is_cut_at_a_word_boundary():
+    text = " ".join(f"word{i}" for i in range(500))
+
+    compacted = compact_text(text, "Headline", _MODEL, max_tokens=20)
+
+    assert compacted.truncated
+    assert 0 < compacted.tokens <= 20
+    assert text.startswith(compacted.text)
+    assert compacted.text.split()[-1] in text.split()
+
+
+def test_boilerplate_only_body_is_kept():
+    compacted = compact_text("Subscribe to our newsletter.", "Headline", _MODEL, max_tokens=400)
+
+    assert compacted.text == "Subscribe to our newsletter."
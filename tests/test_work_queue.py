@@ -0,0 +1,164 @@
+"""Tests of the lease-based work queue shared by several workers (src/utils/work_queue.py)."""
+# Import libraries
+import datetime
+
+import pytest
+
+from conftest import make_news
+from src.utils.work_queue import QUEUE_DEAD, QUEUE_DONE, QUEUE_LEASED, QUEUE_PENDING, WorkQueue
+
+
+@pytest.fixture
+def collection(mongo_db):
+    return mongo_db["work_queue"]
+
+
+@pytest.fixture
+def make_worker(collection):
+    """Builds workers on the same queue and stops their lease renewal afterwards."""
+    workers = []
+
+    def make_worker(worker_id: str, max_attempts: int = 3, retry_backoff_seconds: float = 0.0) -> WorkQueue:
+        # Leases long enough that the background renewal does not run during a test
+        worker = WorkQueue(collection, worker_id, lease_seconds=600, max_attempts=max_attempts,
+                           retry_backoff_seconds=retry_backoff_seconds)
+        workers.append(worker)
+        return worker
+
+    yield make_worker
+    for worker in workers:
+        worker.close()
+
+
+def _expire_leases(collection) -> None:
+    """Lets the leases of all items expire, as if their worker crashed."""
+    past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+    collection.update_many({"status": QUEUE_LEASED}, {"$set": {"lease_expires_at": past}})
+
+
+def _ids(documents) -> list:
+    return [document["_id"] for document in documents]
+
+
+def test_enqueue_is_idempotent(make_worker, collection):
+    worker = make_worker("a")
+    news = [make_news("1"), make_news("2")]
+
+    assert worker.enqueue(news, duplicate_of={"2": "1"}) == 2
+    assert make_worker("b").enqueue(news) == 0
+    assert collection.count_documents({}) == 2
+    assert collection.find_one({"_id": "2"})["duplicate_of"] == "1"
+
+
+def test_each_item_is_claimed_by_one_worker(make_worker):
+    a, b = make_worker("a"), make_worker("b")
+    a.enqueue([make_news(str(i)) for i in range(3)])
+
+    claimed_by_a = a.claim(2)
+    claimed_by_b = b.claim(5)
+
+    assert _ids(claimed_by_a) == ["0", "1"]
+    assert _ids(claimed_by_b) == ["2"]
+    assert a.claim(5) == []
+    assert all(document["attempts"] == 1 for document in claimed_by_a + claimed_by_b)
+
+
+def test_expired_lease_is_taken_over_and_fences_the_old_owner(make_worker, collection):
+    a, b = make_worker("a"), make_worker("b")
+    a.enqueue([make_news("1")])
+    a.claim(1)
+
+    _expire_leases(collection)
+    taken_over = b.claim(1)
+
+    assert _ids(taken_over) == ["1"] and taken_over[0]["attempts"] == 2
+    # The old owner can neither notify nor complete the item
+    assert a.claim_notifications(["1"]) == set()
+    assert a.complete(["1"]) == 0
+    assert a.renew() == 0
+    assert b.renew() == 1
+    assert b.complete(["1"]) == 1
+    assert collection.find_one({"_id": "1"})["status"] == QUEUE_DONE
+
+
+def test_notification_is_claimed_once(make_worker):
+    a = make_worker("a")
+    a.enqueue([make_news("1"), make_news("2")])
+    a.claim(2)
+
+    assert a.claim_notifications(["1", "2"]) == {"1", "2"}
+    assert a.claim_notifications(["1", "2"]) == set()
+
+    # A message that could not be sent is released for a retry
+    a.release_notifications(["2"])
+    assert a.claim_notifications(["1", "2"]) == {"2"}
+
+
+def test_notification_claim_survives_a_retry(make_worker, collection):
+    a, b = make_worker("a"), make_worker("b")
+    a.enqueue([make_news("1")])
+    a.claim(1)
+    assert a.claim_notifications(["1"]) == {"1"}
+
+    _expire_leases(collection)
+    b.claim(1)
+
+    assert b.claim_notifications(["1"]) == set()
+
+
+def test_failed_items_are_retried_then_dead_lettered(make_worker, collection):
+    a = make_worker("a", max_attempts=2)
+    a.enqueue([make_news("1")])
+
+    a.claim(1)
+    assert a.fail({"1": "timeout"}) == {"1": QUEUE_PENDING}
+    assert collection.find_one({"_id": "1"})["last_error"] == "timeout"
+
+    assert _ids(a.claim(1)) == ["1"]
+    assert a.fail({"1": "timeout"}) == {"1": QUEUE_DEAD}
+    assert a.claim(1) == []
+    assert _ids(a.dead_letters()) == ["1"]
+
+    assert a.requeue_dead() == 1
+    assert a.claim(1)[0]["attempts"] == 1
+
+
+def test_failed_items_wait_for_their_backoff(make_worker):
+    a = make_worker("a", retry_backoff_seconds=60)
+    a.enqueue([make_news("1")])
+    a.claim(1)
+
+    a.fail({"1": "timeout"})
+
+    assert a.claim(1) == []
+
+
+def test_deferred_items_do_not_count_an_attempt(make_worker):
+    a = make_worker("a")
+    a.enqueue([make_news("1")])
+    a.claim(1)
+
+    assert a.defer(["1"]) == {"1": QUEUE_PENDING}
+    assert a.claim(1)[0]["attempts"] == 1
+
+
+def test_expired_lease_on_the_last_attempt_is_dead_lettered(make_worker, collection):
+    a, b = make_worker("a", max_attempts=1), make_worker("b", max_attempts=1)
+    a.enqueue([make_news("1")])
+    a.claim(1)
+
+    _expire_leases(collection)
+
+    assert b.claim(1) == []
+    assert collection.find_one({"_id": "1"})["status"] == QUEUE_DEAD
+    assert a.stats()[QUEUE_DEAD] == 1
+
+
+def test_unsettled_items_are_released_after_a_run(make_worker, collection):
+    a = make_worker("a")
+    a.enqueue([make_news("1"), make_news("2")])
+    a.claim(2)
+    a.complete(["1"])
+
+    assert a.release_unsettled("run failed") == {"2": QUEUE_PENDING}
+    assert collection.find_one({"_id": "2"})["last_error"] == "run failed"